@@ -20,5 +20,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 from .gravity import GravityModel, TwoStepFCA, ThreeStepFCA  # noqa
+from .incremental import IncrementalGravityModel  # noqa
+from .loaders import load_distance_matrix  # noqa
+from .network import Network  # noqa
+from .optimize import GreedyFacilitySelector  # noqa
+from .sparse import SparseDistanceMatrix  # noqa
 
 __version__ = '0.1.0'
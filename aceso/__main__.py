@@ -0,0 +1,6 @@
+"""Run the ``aceso`` command with ``python -m aceso``."""
+import sys
+
+from aceso.cli import main
+
+sys.exit(main())
@@ -0,0 +1,193 @@
+"""Gravity models bound to a fixed distance matrix.
+
+Evaluating the decay function (and, for 3SFCA, the interaction probabilities) dominates the cost of
+scoring. When the distance matrix stays fixed and only the demand or supply changes, these weights
+can be evaluated once and cached. Each subsequent calculation then consists of two matrix-vector
+products, with no transcendental functions.
+"""
+import numpy as np
+
+from aceso import sparse
+
+
+class BoundGravityModel(object):
+    """Represents a gravity model whose weights for a fixed distance matrix have been cached.
+
+    Instances are usually created through ``GravityModel.bind``.
+    """
+
+    def __init__(self, model, distance_matrix, keep_nonzero=False):
+        """Bind a gravity model to a distance matrix.
+
+        Parameters
+        ----------
+        model : GravityModel
+            The model whose decay function and normalization are used.
+        distance_matrix : np.ndarray(float) or SparseDistanceMatrix
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        keep_nonzero : bool
+            If True, only the nonzero weights are cached, together with their coordinates.
+            This saves memory for compact-support decay functions. Sparse distance matrices are
+            always cached in this way.
+        """
+        self.model = model
+        self.distance_matrix = distance_matrix
+        self.shape = distance_matrix.shape
+        self.keep_nonzero = keep_nonzero or sparse.is_sparse(distance_matrix)
+        self._weights = None
+
+    def calculate_accessibility_scores(self, demand_array=None, supply_array=None):
+        """Calculate accessibility scores using the cached weights.
+
+        Parameters
+        ----------
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+            A 2D-array is treated as a stack of scenarios, one per row.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+            A 2D-array is treated as a stack of scenarios, one per row.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location, with a leading scenario axis if
+            either input was two-dimensional.
+        """
+        if demand_array is None:
+            demand_array = np.ones(self.shape[0])
+        if supply_array is None:
+            supply_array = np.ones(self.shape[1])
+        demand_potentials = self._calculate_demand_potentials(demand_array)
+        inverse_demands = self.model._invert_demand_potentials(demand_potentials)
+        supply_ratios = self.model._as_compute_dtype(supply_array * inverse_demands)
+        return self._apply(supply_ratios, weight_index=1, transpose=False)
+
+    def _calculate_demand_potentials(self, demand_array):
+        """Calculate the demand potential at each supply location using the cached weights.
+
+        Returns
+        -------
+        array
+            An array of demand at each supply location.
+        """
+        demand_array = self.model._as_compute_dtype(np.asarray(demand_array))
+        return self._apply(demand_array, weight_index=0, transpose=True)
+
+    def _apply(self, array, weight_index, transpose):
+        """Multiply the given array (or stack of arrays) by one of the cached weight matrices.
+
+        Returns
+        -------
+        array
+            The product of the weight matrix, transposed if requested, and each input array.
+        """
+        weights = self._get_weights()
+        if not self.keep_nonzero:
+            if transpose:
+                return np.dot(array, weights[weight_index])
+            return np.dot(array, weights[weight_index].T)
+
+        rows, cols = weights[2], weights[3]
+        source, target = (rows, cols) if transpose else (cols, rows)
+        length = self.shape[1] if transpose else self.shape[0]
+        products = [
+            np.bincount(target, weights=vector[source] * weights[weight_index], minlength=length)
+            for vector in np.atleast_2d(array)
+        ]
+        if np.ndim(array) == 1:
+            return self.model._as_compute_dtype(products[0])
+        return self.model._as_compute_dtype(np.array(products))
+
+    def _get_weights(self):
+        """Return the cached weights, evaluating them first if necessary.
+
+        Returns
+        -------
+        tuple
+            The weights used to calculate demand potentials and the weights used to calculate
+            access scores. If only nonzero weights are kept, these are followed by their row and
+            column indices.
+        """
+        if self._weights is None:
+            if self.distance_matrix is None:
+                raise ValueError('The distance matrix of this model has been released!')
+            if sparse.is_sparse(self.distance_matrix):
+                self._weights = self._evaluate_sparse_weights()
+            else:
+                self._weights = self._evaluate_dense_weights()
+        return self._weights
+
+    def _evaluate_dense_weights(self):
+        """Evaluate the weight matrices for a dense distance matrix."""
+        decay_weights, interaction_probabilities = self.model._calculate_weights(
+            self.distance_matrix
+        )
+        demand_weights, access_weights = _combine_weights(
+            decay_weights, interaction_probabilities, self.model.suboptimality_exponent
+        )
+        if not self.keep_nonzero:
+            return demand_weights, access_weights
+
+        rows, cols = np.nonzero((demand_weights != 0) | (access_weights != 0))
+        return demand_weights[rows, cols], access_weights[rows, cols], rows, cols
+
+    def _evaluate_sparse_weights(self):
+        """Evaluate the weights of each stored pair of a sparse distance matrix."""
+        distance_matrix = sparse.as_sparse_distance_matrix(self.distance_matrix)
+        decay_weights, interaction_probabilities = self.model._calculate_sparse_weights(
+            distance_matrix
+        )
+        demand_weights, access_weights = _combine_weights(
+            np.array(decay_weights), interaction_probabilities, self.model.suboptimality_exponent
+        )
+        return demand_weights, access_weights, distance_matrix.rows, distance_matrix.cols
+
+    @property
+    def nbytes(self):
+        """Return the number of bytes used by the cached weights."""
+        if self._weights is None:
+            return 0
+        unique_arrays = {id(array): array for array in self._weights}
+        return sum(array.nbytes for array in unique_arrays.values())
+
+    def invalidate(self):
+        """Discard the cached weights. They are evaluated again when next needed.
+
+        Call this method after changing the decay function or other parameters of the model.
+        """
+        self._weights = None
+
+    def release(self):
+        """Discard the cached weights and the reference to the distance matrix."""
+        self._weights = None
+        self.distance_matrix = None
+
+
+def _combine_weights(decay_weights, interaction_probabilities, suboptimality_exponent):
+    """Combine the decay weights and interaction probabilities for each step of the calculation.
+
+    NaN weights are replaced by zeros, matching the treatment of NaNs in ``GravityModel``.
+    The decay weights are modified in place.
+
+    Returns
+    -------
+    tuple
+        The weights used to calculate demand potentials and the weights used to calculate
+        access scores. These are the same array if the suboptimality exponent is 1.
+    """
+    access_weights = None
+    if suboptimality_exponent != 1.0:
+        access_weights = np.power(decay_weights, suboptimality_exponent)
+        if interaction_probabilities is not None:
+            access_weights *= interaction_probabilities
+        access_weights[np.isnan(access_weights)] = 0
+
+    demand_weights = decay_weights
+    if interaction_probabilities is not None:
+        demand_weights *= interaction_probabilities
+    demand_weights[np.isnan(demand_weights)] = 0
+    if access_weights is None:
+        access_weights = demand_weights
+    return demand_weights, access_weights
@@ -0,0 +1,442 @@
+"""Command-line interface to calculate access scores from origin-destination tables on disk.
+
+The ``aceso`` command reads a long-format table with one row per pair of demand and supply
+locations, holding their ids and the distance between them. The table is streamed from disk in
+chunks of rows and never held in memory as a whole, so tables with billions of rows can be scored.
+Pairs that do not appear in the table are treated as infinitely far apart.
+
+The table is read twice (three times with Huff normalization); see
+``GravityModel.calculate_accessibility_scores_from_records``. Unless files listing the demand and
+supply locations are given, the table is read once more beforehand to collect their ids. Rows whose
+ids are missing from these files are skipped.
+
+CSV files are read with ``pandas`` if it is installed, which is much faster, or else with the
+standard library. Parquet files require ``pyarrow``.
+
+Model parameters may be given as flags or in a JSON configuration file whose keys are the long
+names of the flags, such as::
+
+    {"model": "gravity", "decay_function": "gaussian", "decay_params": {"sigma": 15.0}}
+
+Flags given on the command line take precedence over the configuration file.
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+from aceso import gravity
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    pd = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pq = None
+
+# Default number of rows of a table read from disk at a time.
+CHUNK_SIZE = 2**20
+
+MODEL_NAMES = ('gravity', '2sfca', '3sfca')
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+# The flags that may be given in a configuration file, by their long names.
+CONFIG_KEYS = (
+    'output', 'demand', 'supply', 'id_column', 'demand_column', 'supply_column', 'origin_column',
+    'destination_column', 'distance_column', 'format', 'chunk_size', 'model', 'decay_function',
+    'decay_params', 'radius', 'huff_normalization', 'suboptimality_exponent', 'dtype',
+    'decay_tolerance', 'lookup_tolerance', 'distance_resolution', 'quiet',
+)
+
+
+def main(argv=None):
+    """Run the ``aceso`` command with the given arguments. Defaults to ``sys.argv[1:]``."""
+    args = parse_args(argv)
+    model = build_model(args)
+    started = time.time()
+
+    # The last column of each table holds the distances, demand, or supply, which are floats.
+    def read(path, columns):
+        return read_table(
+            path, columns, chunk_size=args.chunk_size, file_format=args.format,
+            float_columns=columns[-1:]
+        )
+
+    od_columns = [args.origin_column, args.destination_column, args.distance_column]
+    demand_index, demand_array = _read_locations(
+        args.demand, args.id_column, args.demand_column, read
+    )
+    supply_index, supply_array = _read_locations(
+        args.supply, args.id_column, args.supply_column, read
+    )
+
+    if demand_index is None or supply_index is None:
+        collect_demand, collect_supply = demand_index is None, supply_index is None
+        if collect_demand:
+            demand_index = _IdIndex()
+        if collect_supply:
+            supply_index = _IdIndex()
+        progress = _Progress('index', args.quiet)
+        for origins, destinations, _ in progress.wrap(read(args.od_path, od_columns)):
+            if collect_demand:
+                demand_index.add(origins)
+            if collect_supply:
+                supply_index.add(destinations)
+        progress.report()
+
+    pass_numbers = itertools.count(1)
+
+    def record_blocks():
+        progress = _Progress('pass {}'.format(next(pass_numbers)), args.quiet)
+        for origins, destinations, distances in progress.wrap(read(args.od_path, od_columns)):
+            rows = demand_index.get_indices(origins)
+            cols = supply_index.get_indices(destinations)
+            known = (rows >= 0) & (cols >= 0)
+            yield rows[known], cols[known], distances[known]
+        progress.report()
+
+    access_scores = model.calculate_accessibility_scores_from_records(
+        record_blocks,
+        shape=(len(demand_index), len(supply_index)),
+        demand_array=demand_array,
+        supply_array=supply_array,
+    )
+    write_scores(args.output, demand_index.ids, access_scores, id_column=args.id_column)
+    if not args.quiet:
+        _log('scored {:,} demand locations in {:.2f} s'.format(
+            len(demand_index), time.time() - started
+        ))
+    return 0
+
+
+def parse_args(argv=None):
+    """Parse the command-line arguments, filling in defaults from any configuration file."""
+    parser = _get_parser()
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument('--config')
+    config_path = config_parser.parse_known_args(argv)[0].config
+    if config_path is not None:
+        with open(config_path) as f:
+            config = json.load(f)
+        unknown = sorted(set(config) - set(CONFIG_KEYS))
+        if unknown:
+            parser.error('Unknown configuration keys: {}'.format(', '.join(unknown)))
+        if isinstance(config.get('decay_params'), dict):
+            config['decay_params'] = list(config['decay_params'].items())
+        parser.set_defaults(**config)
+
+    args = parser.parse_args(argv)
+    if args.model == '2sfca' and args.radius is None:
+        parser.error('The 2sfca model requires a radius.')
+    if args.model != '2sfca' and args.decay_function is None:
+        parser.error('The {} model requires a decay function.'.format(args.model))
+    return args
+
+
+def build_model(args):
+    """Create the model described by the parsed command-line arguments."""
+    dtype = None if args.dtype is None else np.dtype(args.dtype)
+    if args.model == '2sfca':
+        return gravity.TwoStepFCA(radius=args.radius, dtype=dtype)
+    kwargs = dict(
+        decay_function=args.decay_function,
+        decay_params=dict(args.decay_params or []),
+        dtype=dtype,
+        decay_tolerance=args.decay_tolerance,
+        lookup_tolerance=args.lookup_tolerance,
+        distance_resolution=args.distance_resolution,
+    )
+    if args.model == '3sfca':
+        return gravity.ThreeStepFCA(**kwargs)
+    return gravity.GravityModel(
+        huff_normalization=args.huff_normalization,
+        suboptimality_exponent=args.suboptimality_exponent,
+        **kwargs
+    )
+
+
+def read_table(path, columns, chunk_size=None, file_format='auto', float_columns=()):
+    """Read the given columns of a CSV or Parquet file in chunks of rows.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+    columns : list(str)
+        The names of the columns to read.
+    chunk_size : int or None
+        The number of rows in each chunk. Defaults to ``CHUNK_SIZE``.
+    file_format : str
+        Either 'csv', 'parquet', or 'auto' to infer the format from the extension of the path.
+    float_columns : list(str)
+        The names of the columns read as floats, such as distances.
+
+    Yields
+    ------
+    list(np.array)
+        The values of each column in a chunk of rows. Values of other columns read from CSV files
+        are strings.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    if file_format == 'auto':
+        file_format = 'parquet' if str(path).lower().endswith(PARQUET_EXTENSIONS) else 'csv'
+    if file_format == 'csv':
+        return _read_csv(path, columns, chunk_size, float_columns)
+    if file_format == 'parquet':
+        return _read_parquet(path, columns, chunk_size, float_columns)
+    raise ValueError('Unknown file format "{}"!'.format(file_format))
+
+
+def write_scores(path, ids, access_scores, id_column='id'):
+    """Write the access score of each demand location to a CSV file, or to stdout if '-'."""
+    if path == '-':
+        _write_scores(sys.stdout, ids, access_scores, id_column)
+    else:
+        with open(path, 'w') as f:
+            _write_scores(f, ids, access_scores, id_column)
+
+
+def _write_scores(f, ids, access_scores, id_column):
+    """Write the access score of each demand location to an open file."""
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow([id_column, 'score'])
+    writer.writerows(zip(ids, (repr(float(score)) for score in access_scores)))
+
+
+def _read_csv(path, columns, chunk_size, float_columns=()):
+    """Read the given columns of a CSV file with a header row, in chunks of rows."""
+    if pd is not None:
+        # Ids such as 'NA' are kept as strings, while empty floats are read as NaN.
+        chunks = pd.read_csv(
+            path,
+            usecols=columns,
+            dtype={column: float if column in float_columns else str for column in columns},
+            keep_default_na=False,
+            na_values={column: [''] for column in float_columns},
+            chunksize=chunk_size,
+        )
+        for chunk in chunks:
+            yield [chunk[column].to_numpy() for column in columns]
+        return
+    with open(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = []
+        for column in columns:
+            if column not in header:
+                raise ValueError('File {} has no column "{}"!'.format(path, column))
+            positions.append(header.index(column))
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            yield [
+                np.array(
+                    [row[position] or 'nan' for row in rows], dtype=float
+                ) if column in float_columns else np.array([row[position] for row in rows])
+                for column, position in zip(columns, positions)
+            ]
+
+
+def _read_parquet(path, columns, chunk_size, float_columns=()):
+    """Read the given columns of a Parquet file, in chunks of rows."""
+    if pq is None:
+        raise ImportError('Reading Parquet files requires pyarrow to be installed!')
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        values = [
+            batch.column(batch.schema.get_field_index(column)).to_numpy(zero_copy_only=False)
+            for column in columns
+        ]
+        yield [
+            np.asarray(value, dtype=float) if column in float_columns else value
+            for column, value in zip(columns, values)
+        ]
+
+
+def _read_locations(path, id_column, value_column, read):
+    """Read the id and demand or supply of each location from a file, if provided.
+
+    Returns
+    -------
+    tuple
+        The index of the location ids and the array of values, or (None, None) if no path is given.
+    """
+    if path is None:
+        return None, None
+    ids, values = [], []
+    for chunk_ids, chunk_values in read(path, [id_column, value_column]):
+        ids.append(chunk_ids)
+        values.append(chunk_values)
+    ids = np.concatenate(ids) if ids else np.array([], dtype=str)
+    index = _IdIndex()
+    index.add(ids)
+    if len(index) != len(ids):
+        raise ValueError('File {} contains duplicate ids!'.format(path))
+    return index, np.concatenate(values) if values else np.zeros(0)
+
+
+class _IdIndex(object):
+    """Assigns consecutive indices to location ids, in the order in which they are first added.
+
+    Ids are looked up in bulk, with a hash table if ``pandas`` is installed or else by binary
+    search. Ids that are not strings are converted to strings, so that ids read from files of
+    different formats match.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._ids = np.array([], dtype=str)
+        self._added = []
+        self._lookup = None
+
+    def __len__(self):
+        """Return the number of ids."""
+        return len(self.ids)
+
+    @property
+    def ids(self):
+        """The array of ids, in order of their indices."""
+        if self._added:
+            self._ids = _unique_in_order(np.concatenate([self._ids] + self._added))
+            self._added = []
+            self._lookup = None
+        return self._ids
+
+    def add(self, ids):
+        """Add the given ids to the index, skipping those already in it."""
+        self._added.append(_unique_in_order(_as_ids(ids)))
+
+    def get_indices(self, ids):
+        """Return the index of each id, or -1 for unknown ids."""
+        ids = _as_ids(ids)
+        if self._lookup is None or self._added:
+            known_ids = self.ids
+            if pd is not None:
+                self._lookup = pd.Index(known_ids)
+            else:
+                order = np.argsort(known_ids, kind='mergesort')
+                self._lookup = (known_ids[order], order)
+        if pd is not None:
+            return self._lookup.get_indexer(ids)
+        sorted_ids, order = self._lookup
+        if not len(sorted_ids):
+            return np.full(len(ids), -1, dtype=np.intp)
+        positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == ids, order[positions], -1)
+
+
+def _as_ids(ids):
+    """Return an array of ids, converting ids that are not strings to strings."""
+    ids = np.asarray(ids)
+    if ids.dtype.kind not in 'OU':
+        ids = ids.astype(str)
+    return ids
+
+
+def _unique_in_order(ids):
+    """Return the distinct ids in the order in which they first appear."""
+    if pd is not None:
+        return np.asarray(pd.unique(ids))
+    unique_ids, first_positions = np.unique(ids, return_index=True)
+    return unique_ids[np.argsort(first_positions)]
+
+
+class _Progress(object):
+    """Counts the rows read in a pass over a table and reports the throughput to stderr."""
+
+    def __init__(self, name, quiet=False):
+        """Initialize a counter for the pass with the given name."""
+        self.name = name
+        self.quiet = quiet
+        self.n_rows = 0
+        self.started = time.time()
+
+    def wrap(self, chunks):
+        """Yield the given chunks of columns, counting their rows."""
+        for chunk in chunks:
+            self.n_rows += len(chunk[0])
+            yield chunk
+
+    def report(self):
+        """Report the number of rows read and the rate at which they were processed."""
+        if self.quiet:
+            return
+        elapsed = time.time() - self.started
+        _log('{}: {:,} rows in {:.2f} s ({:,.0f} rows/s)'.format(
+            self.name, self.n_rows, elapsed, self.n_rows / max(elapsed, 1e-9)
+        ))
+
+
+def _log(message):
+    """Write a progress message to stderr."""
+    sys.stderr.write('aceso: {}\n'.format(message))
+
+
+def _parse_param(text):
+    """Parse a decay parameter of the form KEY=VALUE, reading the value as JSON if possible."""
+    key, separator, value = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError('Expected KEY=VALUE, not "{}".'.format(text))
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return key, value
+
+
+def _get_parser():
+    """Return the parser of the command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='aceso',
+        description='Calculate access scores from a long-format origin-destination table.',
+    )
+    parser.add_argument(
+        'od_path', help='CSV or Parquet file with one row per pair of demand and supply locations.'
+    )
+    parser.add_argument('--config', help='JSON file of default values for the flags below.')
+    parser.add_argument(
+        '-o', '--output', default='-', help='CSV file to write scores to (default: stdout).'
+    )
+
+    inputs = parser.add_argument_group('input')
+    inputs.add_argument('--demand', help='File with the id and demand of each demand location.')
+    inputs.add_argument('--supply', help='File with the id and supply of each supply location.')
+    inputs.add_argument('--id-column', default='id')
+    inputs.add_argument('--demand-column', default='demand')
+    inputs.add_argument('--supply-column', default='supply')
+    inputs.add_argument('--origin-column', default='origin')
+    inputs.add_argument('--destination-column', default='destination')
+    inputs.add_argument('--distance-column', default='distance')
+    inputs.add_argument('--format', default='auto', choices=['auto', 'csv', 'parquet'])
+    inputs.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows read at a time.')
+
+    model = parser.add_argument_group('model')
+    model.add_argument('--model', default='gravity', choices=MODEL_NAMES)
+    model.add_argument('--decay-function', help='Name of a decay function, such as "gaussian".')
+    model.add_argument(
+        '--decay-param', dest='decay_params', action='append', type=_parse_param,
+        metavar='KEY=VALUE', help='Parameter of the decay function. May be repeated.'
+    )
+    model.add_argument('--radius', type=float, help='Catchment radius of the 2sfca model.')
+    model.add_argument('--huff-normalization', action='store_true')
+    model.add_argument('--suboptimality-exponent', type=float, default=1.0)
+    model.add_argument('--dtype', help='dtype of intermediate arrays, such as "float32".')
+    model.add_argument('--decay-tolerance', type=float)
+    model.add_argument('--lookup-tolerance', type=float)
+    model.add_argument('--distance-resolution', type=float)
+
+    parser.add_argument('-q', '--quiet', action='store_true', help='Do not report progress.')
+    return parser
+
+
+if __name__ == '__main__':
+    sys.exit(main())
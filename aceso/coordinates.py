@@ -0,0 +1,191 @@
+"""Methods to calculate distances between demand and supply locations from their coordinates.
+
+If a maximum distance is given, only pairs of locations within that distance are calculated. The
+supply locations are placed on a uniform grid whose cells are as wide as the maximum distance, so
+that each demand location need only be compared with supply locations in neighboring cells. The
+result is a ``SparseDistanceMatrix`` that can be scored without ever materializing a dense matrix.
+
+Two metrics are available:
+    - ``'euclidean'``: coordinates are points in the plane (or any number of dimensions);
+    - ``'haversine'``: coordinates are (latitude, longitude) pairs in degrees, and distances are
+      great-circle distances in the units of the given radius (kilometers by default).
+"""
+import functools
+import itertools
+
+import numpy as np
+
+from aceso import sparse
+
+# The mean radius of the Earth, in kilometers.
+EARTH_RADIUS = 6371.0088
+
+
+def euclidean_distance(points_a, points_b):
+    """Return the Euclidean distance between corresponding rows of two arrays of points."""
+    return np.sqrt(np.sum((points_a - points_b)**2, axis=-1))
+
+
+def haversine_distance(points_a, points_b, radius=EARTH_RADIUS):
+    """Return the great-circle distance between corresponding rows of two arrays of points.
+
+    Points are (latitude, longitude) pairs in degrees.
+    """
+    latitude_a, longitude_a = np.radians(points_a[..., 0]), np.radians(points_a[..., 1])
+    latitude_b, longitude_b = np.radians(points_b[..., 0]), np.radians(points_b[..., 1])
+    a = (
+        np.sin((latitude_b - latitude_a) / 2.0)**2 +
+        np.cos(latitude_a) * np.cos(latitude_b) * np.sin((longitude_b - longitude_a) / 2.0)**2
+    )
+    return 2.0 * radius * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+NAME_TO_METRIC_MAP = {
+    'euclidean': euclidean_distance,
+    'haversine': haversine_distance,
+}
+
+
+def calculate_distance_matrix(
+    demand_coordinates,
+    supply_coordinates,
+    metric='euclidean',
+    max_distance=None,
+    radius=EARTH_RADIUS,
+    block_size=None
+):
+    """Calculate the distances between demand and supply locations from their coordinates.
+
+    Parameters
+    ----------
+    demand_coordinates : np.ndarray(float)
+        A 2D-array whose row i holds the coordinates of demand location i.
+    supply_coordinates : np.ndarray(float)
+        A 2D-array whose row j holds the coordinates of supply location j.
+    metric : str
+        Either 'euclidean' or 'haversine'.
+    max_distance : float or None
+        If provided, only pairs within this distance are calculated and a sparse matrix is
+        returned. Otherwise, all pairs are calculated and a dense matrix is returned.
+    radius : float
+        The radius of the sphere used by the haversine metric.
+    block_size : int or None
+        The approximate number of pairs compared at once. Defaults to ``gravity.BLOCK_SIZE``.
+
+    Returns
+    -------
+    np.ndarray(float) or SparseDistanceMatrix
+        A matrix whose entry in row i, column j is the distance between demand point i
+        and supply point j.
+    """
+    demand_coordinates = np.atleast_2d(np.asarray(demand_coordinates, dtype=float))
+    supply_coordinates = np.atleast_2d(np.asarray(supply_coordinates, dtype=float))
+    if metric not in NAME_TO_METRIC_MAP:
+        raise ValueError('Unknown metric "{}"!'.format(metric))
+    if metric == 'haversine':
+        distance_function = functools.partial(haversine_distance, radius=radius)
+    else:
+        distance_function = euclidean_distance
+    shape = (demand_coordinates.shape[0], supply_coordinates.shape[0])
+    if block_size is None:
+        # The gravity module imports this one, so it is imported here rather than at the top.
+        from aceso import gravity
+        block_size = gravity.BLOCK_SIZE
+    block_rows = max(block_size // max(shape[1], 1), 1)
+
+    if max_distance is None:
+        distance_matrix = np.empty(shape)
+        for start in range(0, shape[0], block_rows):
+            block = demand_coordinates[start:start + block_rows]
+            distance_matrix[start:start + block_rows] = distance_function(
+                block[:, np.newaxis, :], supply_coordinates[np.newaxis, :, :]
+            )
+        return distance_matrix
+
+    # Index the supply locations on a grid in which neighboring cells hold all nearby pairs.
+    if metric == 'haversine':
+        demand_points = _to_unit_vectors(demand_coordinates)
+        supply_points = _to_unit_vectors(supply_coordinates)
+        cell_size = 2.0 * np.sin(min(max_distance / (2.0 * radius), np.pi / 2.0))
+    else:
+        demand_points, supply_points = demand_coordinates, supply_coordinates
+        cell_size = float(max_distance)
+    grid = _Grid(supply_points, cell_size)
+
+    rows, cols, distances = [], [], []
+    for start in range(0, shape[0], block_rows):
+        block_rows_indices, block_cols = grid.query(demand_points[start:start + block_rows])
+        block_rows_indices += start
+        block_distances = distance_function(
+            demand_coordinates[block_rows_indices], supply_coordinates[block_cols]
+        )
+        within_range = block_distances <= max_distance
+        rows.append(block_rows_indices[within_range])
+        cols.append(block_cols[within_range])
+        distances.append(block_distances[within_range])
+
+    return sparse.SparseDistanceMatrix(
+        rows=np.concatenate(rows) if rows else [],
+        cols=np.concatenate(cols) if cols else [],
+        distances=np.concatenate(distances) if distances else [],
+        shape=shape,
+    )
+
+
+class _Grid(object):
+    """A uniform grid over a set of points, used to find all points in neighboring cells."""
+
+    def __init__(self, points, cell_size):
+        """Place each point in a grid cell of the given width."""
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        self.n_dims = points.shape[1]
+        bounds = cells if len(cells) else np.zeros((1, self.n_dims), dtype=np.int64)
+        # Leave a margin of one cell on each side, so that neighbors of every cell have valid keys.
+        self.offset = bounds.min(axis=0) - 1
+        self.extent = bounds.max(axis=0) - self.offset + 2
+        if np.prod(self.extent.astype(float)) >= 2**62:
+            raise ValueError('The maximum distance is too small for the extent of the points!')
+        self.strides = np.cumprod(np.concatenate([[1], self.extent[:0:-1]]))[::-1]
+        keys = self._get_keys(cells)
+        self.order = np.argsort(keys, kind='mergesort')
+        self.sorted_keys = keys[self.order]
+
+    def _get_keys(self, cells):
+        """Return the key of each cell, or -1 for cells outside the grid."""
+        shifted = cells - self.offset
+        keys = np.dot(shifted, self.strides)
+        outside = np.any((shifted < 0) | (shifted >= self.extent), axis=1)
+        keys[outside] = -1
+        return keys
+
+    def query(self, points):
+        """Return all pairs of query points and indexed points in the same or neighboring cells.
+
+        Returns
+        -------
+        tuple
+            The index of the query point and the index of the indexed point of each pair.
+        """
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        rows, cols = [], []
+        for offset in itertools.product([-1, 0, 1], repeat=self.n_dims):
+            keys = self._get_keys(cells + np.array(offset))
+            lower = np.searchsorted(self.sorted_keys, keys, side='left')
+            upper = np.searchsorted(self.sorted_keys, keys, side='right')
+            counts = np.where(keys >= 0, upper - lower, 0)
+            starts = lower - (np.cumsum(counts) - counts)
+            positions = np.arange(counts.sum()) + np.repeat(starts, counts)
+            rows.append(np.repeat(np.arange(points.shape[0]), counts))
+            cols.append(self.order[positions])
+        return np.concatenate(rows), np.concatenate(cols)
+
+
+def _to_unit_vectors(coordinates):
+    """Convert (latitude, longitude) pairs in degrees to points on the unit sphere."""
+    latitude, longitude = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    return np.column_stack([
+        np.cos(latitude) * np.cos(longitude),
+        np.cos(latitude) * np.sin(longitude),
+        np.sin(latitude),
+    ])
@@ -1,15 +1,32 @@
 """A suite of decay functions to simulate demand dropoff as distance increases.
 
 All decay functions operate on one-dimensional numpy arrays.
+
+Each decay function accepts an optional ``dtype``. If provided, the distances and parameters are
+cast to this dtype before evaluation, so that all intermediate arrays use it as well. For example,
+``dtype=np.float32`` halves the memory used by each intermediate array.
+
+The properties of the built-in decay functions are listed in ``DECAY_FUNCTION_PROPERTIES``: the
+distance beyond which the decay is (or may be treated as) zero, whether the decay is monotonically
+non-increasing, and its derivative. Gravity models use the support radius to evaluate the decay
+only at distances within it. Custom decay functions may be added to the mapping as well.
 """
-# TODO: Add the standard gravity decay function d**(-beta).
 # TODO: Add linear decay (or other polynomial interpolation).
+import collections
 import math
 
 import numpy as np
 
+# Decay weights below this tolerance are treated as zero when truncating the support of a decay
+# function that never reaches zero, such as the Gaussian.
+DEFAULT_TOLERANCE = 1e-12
+
+# The number of intervals in the first lookup table tried, and the most intervals allowed.
+MIN_LOOKUP_TABLE_SIZE = 2**8
+MAX_LOOKUP_TABLE_SIZE = 2**22
+
 
-def parabolic_decay(distance_array, scale):
+def parabolic_decay(distance_array, scale, dtype=None):
     """
     Transform a measurement array using the Epanechnikov (parabolic) kernel.
 
@@ -30,13 +47,16 @@ def parabolic_decay(distance_array, scale):
     | 1.0           | 0.0           |
     +---------------+---------------+
     """
-    return np.maximum(
-        (scale**2 - distance_array**2) / scale**2,
-        np.zeros(shape=distance_array.shape)
-    )
+    distance_array, scale = _cast(dtype, distance_array, scale)
+    return _parabolic_decay_squared(distance_array**2, scale)
 
 
-def gaussian_decay(distance_array, sigma):
+def _parabolic_decay_squared(squared_distance_array, scale):
+    """Transform an array of squared measurements using the Epanechnikov (parabolic) kernel."""
+    return np.maximum((scale**2 - squared_distance_array) / scale**2, 0.0)
+
+
+def gaussian_decay(distance_array, sigma, dtype=None):
     """
     Transform a measurement array using a normal (Gaussian) distribution.
 
@@ -57,10 +77,16 @@ def gaussian_decay(distance_array, sigma):
     | 2.0           | 0.13531       |
     +---------------+---------------+
     """
-    return np.exp(-(distance_array**2 / (2.0 * sigma**2)))
+    distance_array, sigma = _cast(dtype, distance_array, sigma)
+    return _gaussian_decay_squared(distance_array**2, sigma)
+
+
+def _gaussian_decay_squared(squared_distance_array, sigma):
+    """Transform an array of squared measurements using a normal (Gaussian) distribution."""
+    return np.exp(-(squared_distance_array / (2.0 * sigma**2)))
 
 
-def raised_cosine_decay(distance_array, scale):
+def raised_cosine_decay(distance_array, scale, dtype=None):
     """
     Transform a measurement array using a raised cosine distribution.
 
@@ -81,11 +107,12 @@ def raised_cosine_decay(distance_array, scale):
     | 1.0           | 0.0           |
     +---------------+---------------+
     """
+    distance_array, scale = _cast(dtype, distance_array, scale)
     masked_array = np.clip(a=distance_array, a_min=0.0, a_max=scale)
     return (1.0 + np.cos((masked_array / scale) * math.pi)) / 2.0
 
 
-def uniform_decay(distance_array, scale):
+def uniform_decay(distance_array, scale, dtype=None):
     """
     Transform a measurement array using a uniform distribution.
 
@@ -108,7 +135,226 @@ def uniform_decay(distance_array, scale):
     | 1.0           | 1.0           |
     +---------------+---------------+
     """
-    return (distance_array <= scale).astype(np.float64)
+    distance_array, scale = _cast(dtype, distance_array, scale)
+    return (distance_array <= scale).astype(np.float64 if dtype is None else dtype)
+
+
+def power_decay(distance_array, beta=1.0, dtype=None):
+    """
+    Transform a measurement array using the standard gravity decay function, ``d**(-beta)``.
+
+    The output is infinite at zero distance. With ``beta=1.0``, this is the inverse distance used
+    by default for Huff-like interaction probabilities.
+
+    Some sample values for ``beta=1.0``:
+
+    +---------------+---------------+
+    | measurement   | decay value   |
+    +===============+===============+
+    | 0.0           | inf           |
+    +---------------+---------------+
+    | 0.5           | 2.0           |
+    +---------------+---------------+
+    | 1.0           | 1.0           |
+    +---------------+---------------+
+    | 2.0           | 0.5           |
+    +---------------+---------------+
+    """
+    distance_array, beta = _cast(dtype, distance_array, beta)
+    with np.errstate(divide='ignore'):
+        return np.power(distance_array, -1.0 * beta)
+
+
+def _parabolic_decay_derivative(distance_array, scale):
+    """Return the derivative of the parabolic decay function with respect to distance."""
+    return np.where(np.abs(distance_array) <= scale, -2.0 * distance_array / scale**2, 0.0)
+
+
+def _gaussian_decay_derivative(distance_array, sigma):
+    """Return the derivative of the Gaussian decay function with respect to distance."""
+    return -distance_array / sigma**2 * gaussian_decay(distance_array, sigma)
+
+
+def _raised_cosine_decay_derivative(distance_array, scale):
+    """Return the derivative of the raised cosine decay function with respect to distance."""
+    derivative = -math.pi / (2.0 * scale) * np.sin((distance_array / scale) * math.pi)
+    return np.where((distance_array >= 0.0) & (distance_array <= scale), derivative, 0.0)
+
+
+def _power_decay_derivative(distance_array, beta=1.0):
+    """Return the derivative of the power decay function with respect to distance."""
+    with np.errstate(divide='ignore'):
+        return -beta * np.power(distance_array, -1.0 * beta - 1.0)
+
+
+def _gaussian_support_radius(decay_params, tolerance):
+    """Return the distance beyond which the Gaussian decay falls below the tolerance."""
+    if not tolerance:
+        return np.inf
+    return decay_params['sigma'] * math.sqrt(-2.0 * math.log(tolerance))
+
+
+def _scale_support_radius(decay_params, tolerance):
+    """Return the scale parameter, beyond which compact decay functions are exactly zero."""
+    return decay_params['scale']
+
+
+def _cast(dtype, distance_array, *params):
+    """Cast a distance array and scalar parameters to the given dtype, if any."""
+    if dtype is None:
+        return (distance_array,) + params
+    dtype = np.dtype(dtype)
+    return (np.asarray(distance_array, dtype=dtype),) + tuple(dtype.type(p) for p in params)
+
+
+class LookupTableDecayFunction(object):
+    """Approximates a decay function by linear interpolation in a precomputed lookup table.
+
+    The decay function is sampled at evenly spaced distances from zero to ``max_distance``. The
+    number of samples is doubled until the interpolation error at the midpoint of every interval
+    is within the tolerance. Distances outside the table (including NaNs) are passed to the decay
+    function itself.
+
+    If no maximum distance is given, the table grows to cover the distances passed to it. Should a
+    larger table need more than ``MAX_LOOKUP_TABLE_SIZE`` intervals, the current table is kept and
+    distances beyond it are evaluated directly.
+
+    Interpolation only pays off for decay functions that cost more to evaluate than ``np.exp`` or a
+    polynomial. It is about twice as fast as direct evaluation of the raised cosine, but roughly
+    half as fast for the Gaussian, the parabolic function and custom exponential decay functions.
+    See ``benchmarks/lookup_table.py``.
+    """
+
+    def __init__(self, decay_function, max_distance=None, tolerance=1e-6):
+        """Initialize a lookup table for a decay function.
+
+        Parameters
+        ----------
+        decay_function : callable
+            A one-argument vectorized decay function, such as the bound decay function of a model.
+        max_distance : float or None
+            The largest distance in the table. If None, the table grows as needed to cover the
+            largest finite distance passed so far.
+        tolerance : float
+            The maximum absolute error of the interpolated decay weights.
+        """
+        self.decay_function = decay_function
+        self.tolerance = tolerance
+        self.max_distance = max_distance
+        self._table = None
+        # The smallest table range found to need too many intervals, if any.
+        self._max_table_distance = np.inf
+        if max_distance is not None and max_distance > 0.0:
+            self._table = self._build_table(max_distance)
+            if self._table is None:
+                raise ValueError(
+                    'The decay function cannot be interpolated within a tolerance of {} '
+                    'using at most {} samples!'.format(self.tolerance, MAX_LOOKUP_TABLE_SIZE)
+                )
+
+    def __call__(self, distance_array):
+        """Evaluate the decay function by interpolation wherever the table allows."""
+        distance_array = np.asarray(distance_array)
+        if distance_array.size == 0:
+            return self.decay_function(distance_array)
+        table = self._get_table(distance_array)
+        if table is None:
+            return self.decay_function(distance_array)
+        step, values, slopes = table
+
+        positions = distance_array * (1.0 / step)
+        # The extrema are NaN if any position is, so a single check covers the common case in
+        # which every distance lies within the table.
+        any_outside = not (positions.min() >= 0.0 and positions.max() <= values.shape[0] - 1)
+        if any_outside:
+            outside = ~((positions >= 0.0) & (positions <= values.shape[0] - 1))
+            positions[outside] = 0.0
+        indices = positions.astype(np.intp)
+        np.minimum(indices, values.shape[0] - 2, out=indices)
+        positions -= indices
+        decay_weights = np.take(slopes, indices)
+        decay_weights *= positions
+        decay_weights += np.take(values, indices)
+        if any_outside:
+            decay_weights[outside] = self.decay_function(distance_array[outside])
+        return decay_weights
+
+    def _get_table(self, distance_array):
+        """Return the current table, first growing it to cover the given distances if allowed."""
+        table = self._table
+        if self.max_distance is not None:
+            return table
+        finite_distances = distance_array[np.isfinite(distance_array)]
+        if finite_distances.size == 0:
+            return table
+        largest_distance = float(finite_distances.max())
+        if largest_distance <= 0.0:
+            return table
+        if table is None or largest_distance > table[0] * (table[1].shape[0] - 1):
+            # Round up to a power of two so that the table is rebuilt only a few times.
+            max_distance = 2.0 ** math.ceil(math.log(largest_distance, 2))
+            if max_distance >= self._max_table_distance:
+                return table
+            new_table = self._build_table(max_distance)
+            if new_table is None:
+                self._max_table_distance = max_distance
+                return table
+            table = self._table = new_table
+        return table
+
+    def _build_table(self, max_distance):
+        """Sample the decay function finely enough to interpolate it within the tolerance.
+
+        Returns
+        -------
+        tuple or None
+            The distance between samples, the sampled values, and the slope of each interval, or
+            None if more than ``MAX_LOOKUP_TABLE_SIZE`` intervals would be needed.
+        """
+        n_intervals = MIN_LOOKUP_TABLE_SIZE
+        while True:
+            distances = np.linspace(0.0, max_distance, 2 * n_intervals + 1)
+            samples = np.asarray(self.decay_function(distances))
+            values = samples[::2]
+            interpolated = (values[:-1] + values[1:]) / 2.0
+            error = np.max(np.abs(interpolated - samples[1::2]))
+            if error <= self.tolerance:
+                break
+            if 2 * n_intervals > MAX_LOOKUP_TABLE_SIZE:
+                return None
+            n_intervals *= 2
+        slopes = np.append(np.diff(values), 0.0).astype(values.dtype)
+        return max_distance / n_intervals, values, slopes
+
+
+def get_support_radius(decay_function, decay_params, tolerance=None):
+    """
+    Return the distance beyond which a decay function is zero, or None if it is not known.
+
+    Parameters
+    ----------
+    decay_function : callable or str
+        A decay function, or the name of one.
+    decay_params : mapping
+        The parameters of the decay function.
+    tolerance : float or None
+        If provided, decay weights below this value are treated as zero. Otherwise, only decay
+        functions that are exactly zero beyond some distance have a support radius.
+
+    Returns
+    -------
+    float or None
+        The support radius, or None if the decay function has no known finite support.
+    """
+    if isinstance(decay_function, str):
+        decay_function = get_decay_function(decay_function)
+    properties = DECAY_FUNCTION_PROPERTIES.get(decay_function)
+    if properties is None or properties.support_radius is None:
+        return None
+    radius = properties.support_radius(decay_params, tolerance)
+    if not np.isfinite(radius):
+        return None
+    return radius
 
 
 def get_decay_function(name):
@@ -125,6 +371,7 @@ def get_decay_function(name):
             - ``'raised_cosine'``
             - ``'gaussian'``
             - ``'parabolic'``
+            - ``'power'``
 
     """
     return NAME_TO_FUNCTION_MAP[name.lower()]
@@ -135,5 +382,57 @@ NAME_TO_FUNCTION_MAP = {
     'raised_cosine': raised_cosine_decay,
     'gaussian': gaussian_decay,
     'parabolic': parabolic_decay,
-    'epanechnikov': parabolic_decay
+    'epanechnikov': parabolic_decay,
+    'power': power_decay,
+}
+
+# Decay functions that depend on distance only through its square, mapped to equivalent functions
+# of the squared distance. Squared distances can then be computed once and shared.
+SQUARED_DISTANCE_FUNCTION_MAP = {
+    gaussian_decay: _gaussian_decay_squared,
+    parabolic_decay: _parabolic_decay_squared,
+}
+
+# The properties of a decay function:
+#     - support_radius: a callable of the decay parameters and a tolerance returning the distance
+#       beyond which the decay is zero (or below the tolerance), or None if unknown;
+#     - monotonic: whether the decay is non-increasing with distance;
+#     - derivative: a callable of the distances and the decay parameters, or None;
+#     - compress: whether evaluating the decay at the distances within the support alone is
+#       faster than evaluating it everywhere.
+DecayProperties = collections.namedtuple(
+    'DecayProperties', ['support_radius', 'monotonic', 'derivative', 'compress']
+)
+
+DECAY_FUNCTION_PROPERTIES = {
+    uniform_decay: DecayProperties(
+        support_radius=_scale_support_radius,
+        monotonic=True,
+        derivative=None,
+        compress=False,
+    ),
+    raised_cosine_decay: DecayProperties(
+        support_radius=_scale_support_radius,
+        monotonic=True,
+        derivative=_raised_cosine_decay_derivative,
+        compress=True,
+    ),
+    gaussian_decay: DecayProperties(
+        support_radius=_gaussian_support_radius,
+        monotonic=True,
+        derivative=_gaussian_decay_derivative,
+        compress=True,
+    ),
+    parabolic_decay: DecayProperties(
+        support_radius=_scale_support_radius,
+        monotonic=True,
+        derivative=_parabolic_decay_derivative,
+        compress=True,
+    ),
+    power_decay: DecayProperties(
+        support_radius=None,
+        monotonic=True,
+        derivative=_power_decay_derivative,
+        compress=False,
+    ),
 }
@@ -19,14 +19,43 @@ References:
     analyzing spatial access to health services. International Journal of Geographical Information
     Science. 26. 1073-1089. 10.1080/13658816.2011.624987.
 """
+import collections
+import contextlib
 import inspect
 import functools
+import multiprocessing
+import threading
 import warnings
 import sys
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 
+from aceso import bound
+from aceso import coordinates
 from aceso import decay
+from aceso import loaders
+from aceso import network as networks
+from aceso import profiling
+from aceso import sparse
+
+# Approximate number of matrix entries processed at once by the row-blocked calculations.
+BLOCK_SIZE = 2**20
+
+# The decay function is evaluated only within its support radius if at most this fraction of the
+# distances in a block lie within it. Otherwise, it is evaluated at every distance.
+COMPRESSED_EVALUATION_THRESHOLD = 0.25
+
+# The decay weights of every parameter value are kept between the two passes of a parameter sweep
+# if they have at most this many entries in total. Otherwise, they are evaluated again.
+PARAM_WEIGHTS_CACHE_SIZE = 2**24
+
+# Distances within this fraction of the distance resolution of a multiple of it are treated as
+# that multiple when evaluating the decay function once per distinct distance.
+RESOLUTION_TOLERANCE = 1e-9
+
+# The number of bound decay functions kept for reuse by models built with the same parameters.
+BOUND_FUNCTION_CACHE_SIZE = 1024
 
 
 class GravityModel(object):
@@ -42,7 +71,18 @@ class GravityModel(object):
     """
 
     def __init__(
-        self, decay_function, decay_params={}, huff_normalization=False, suboptimality_exponent=1.0
+        self,
+        decay_function,
+        decay_params={},
+        huff_normalization=False,
+        suboptimality_exponent=1.0,
+        dtype=None,
+        n_jobs=None,
+        decay_tolerance=None,
+        lookup_tolerance=None,
+        distance_resolution=None,
+        attractiveness_function='power',
+        attractiveness_params={}
     ):
         """Initialize a gravitational model of spatial accessibility.
 
@@ -68,15 +108,125 @@ class GravityModel(object):
 
             Values greater than 1.0 for this parameter will result in accessibility scores
             whose weighted average is less than the overall supply.
+        dtype: np.dtype or None
+            If provided, the dtype of all intermediate arrays, such as ``np.float32``.
+            Sums over demand or supply locations are still accumulated in double precision.
+
+            If None, the dtype is determined by the inputs and the output of the decay function.
+        n_jobs: int or None
+            If provided, the number of threads among which blocks of rows of the distance matrix are
+            divided. If -1, all available processors are used.
+
+            Partial sums from each block are combined in a fixed order, so the scores do not depend
+            on the number of threads. They may differ from the scores with ``n_jobs=None`` in the
+            last few bits, since the latter accumulate over all rows in a single pass.
+        decay_tolerance: float or None
+            If provided, decay weights below this value may be treated as zero. This allows decay
+            functions without compact support, such as the Gaussian, to be truncated.
+
+            Decay functions listed in ``decay.DECAY_FUNCTION_PROPERTIES`` are only evaluated at
+            distances within their support radius. Other decay functions are evaluated everywhere.
+        lookup_tolerance: float or None
+            If provided, the decay function is approximated by linear interpolation in a lookup
+            table, with at most this absolute error. See ``decay.LookupTableDecayFunction``.
+
+            The table spans the support radius of the decay function if it is known. Otherwise, it
+            grows to cover the largest finite distance seen so far, as long as it can do so within
+            ``decay.MAX_LOOKUP_TABLE_SIZE`` intervals. Distances beyond it are evaluated directly.
+
+            Interpolation only pays off for decay functions that cost more to evaluate than
+            ``np.exp`` or a polynomial, such as the raised cosine. The Gaussian, the parabolic
+            function and most custom exponential decay functions are faster to evaluate exactly.
+        distance_resolution: float or None
+            If provided, most distances are expected to be multiples of this value, such as travel
+            times in whole minutes. The decay function is then evaluated once per distinct multiple
+            and the weights are gathered by index. Other distances are evaluated directly.
+
+            Distance matrices of an integer dtype are always evaluated in this way.
+        attractiveness_function: callable or str
+            The function of distance whose row-normalized values are the Huff-like interaction
+            probabilities. Only used if huff_normalization is True. Defaults to inverse distance.
+
+            If the attractiveness of some supply locations is infinite, such as at zero distance,
+            the demand location splits its interaction evenly among those locations alone.
+        attractiveness_params: mapping
+            Parameter: value mapping for each argument of the attractiveness function.
         """
-        self.decay_function = self._bind_decay_function_parameters(decay_function, decay_params)
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self.n_jobs = n_jobs
+        self.decay_params = dict(decay_params)
+        self._unbound_decay_function = decay_function
+        self.decay_function = self._bind_decay_function_parameters(
+            decay_function, decay_params, dtype=self.dtype
+        )
         self.huff_normalization = huff_normalization
+        self.attractiveness_params = dict(attractiveness_params)
+        self._unbound_attractiveness_function = attractiveness_function
+        self.attractiveness_function = self._bind_decay_function_parameters(
+            attractiveness_function, attractiveness_params, dtype=self.dtype
+        )
         self.suboptimality_exponent = suboptimality_exponent
+        self.decay_tolerance = decay_tolerance
+        self.lookup_tolerance = lookup_tolerance
+        self.distance_resolution = distance_resolution
+        self._decay_properties = decay.DECAY_FUNCTION_PROPERTIES.get(
+            decay.get_decay_function(decay_function)
+            if isinstance(decay_function, str) else decay_function
+        )
+        support_radius = decay.get_support_radius(
+            decay_function, self.decay_params, decay_tolerance
+        )
+        if lookup_tolerance is not None:
+            self.decay_function = decay.LookupTableDecayFunction(
+                self.decay_function, max_distance=support_radius, tolerance=lookup_tolerance
+            )
+        self._support = (self.decay_function, support_radius)
+
+    @property
+    def support_radius(self):
+        """Return the distance beyond which all decay weights are zero, or None if unknown.
+
+        The support radius is forgotten if the decay function is replaced after initialization.
+        """
+        decay_function, support_radius = self._support
+        if decay_function is not self.decay_function:
+            return None
+        return support_radius
+
+    @contextlib.contextmanager
+    def profile(self, callback=None):
+        """Report the wall time and output size of each stage of calculations within the context.
+
+        Outside of this context, stages are not timed. See the ``profiling`` module for the stages.
+
+        Only calculations in the current thread are reported, including those that the model runs
+        on threads of its own when ``n_jobs`` is set. Calculations with the same model in other
+        threads, such as those of an executor, are not reported.
+
+        Parameters
+        ----------
+        callback : callable or None
+            A function called with a ``profiling.StageStats`` record after each call to a stage,
+            such as one exporting the statistics to a metrics system. Defaults to a new
+            ``profiling.Profiler``, which collects the records.
+
+        Yields
+        ------
+        callable
+            The callback, such as the profiler whose ``summary`` totals the time of each stage.
+        """
+        if callback is None:
+            callback = profiling.Profiler()
+        with profiling.register(self, callback):
+            yield callback
 
     @staticmethod
-    def _bind_decay_function_parameters(decay_function, decay_params):
+    def _bind_decay_function_parameters(decay_function, decay_params, dtype=None):
         """Bind the given parameters for the decay function.
 
+        If a dtype is given, it is bound as well if the decay function accepts a ``dtype``
+        argument. Otherwise, the output of the decay function is cast to the dtype.
+
         Returns
         -------
         callable
@@ -86,42 +236,55 @@ class GravityModel(object):
         if isinstance(decay_function, str):
             decay_function = decay.get_decay_function(decay_function)
 
-        if sys.version_info[0] >= 3:
-            missing_params = {
-                k for k in list(inspect.signature(decay_function).parameters)[1:]
-                if (k not in decay_params)
-            }
-            valid_params = {
-                k: v for k, v in decay_params.items()
-                if k in inspect.signature(decay_function).parameters
-            }
-        elif sys.version_info[0] == 2:
-            missing_params = {
-                k for k in inspect.getargspec(decay_function).args[1:]
-                if (k not in decay_params)
-            }
-            valid_params = {
-                k: v for k, v in decay_params.items()
-                if k in inspect.getargspec(decay_function).args
-            }
-
-        # If any required parameters are missing, raise an error.
-        if missing_params:
-            raise ValueError(
-                'Parameter(s) "{}" must be specified!'.format(', '.join(missing_params)))
+        key = None
+        # Only the functions of the ``decay`` module are cached, so that the cache never keeps
+        # user callables, or the data they refer to, alive.
+        if _is_cached_function(decay_function):
+            try:
+                key = (
+                    decay_function,
+                    tuple(sorted((k, type(v), v) for k, v in decay_params.items())),
+                    dtype,
+                )
+                hash(key)
+            except TypeError:
+                # Unhashable parameters, such as arrays, are bound without caching.
+                key = None
+        cached = None if key is None else _BOUND_FUNCTION_CACHE.get(key)
+        if cached is None:
+            cached = _bind_parameters(decay_function, decay_params, dtype)
+            if key is not None:
+                _BOUND_FUNCTION_CACHE.put(key, cached)
+        bound_function, invalid_params = cached
 
         # Warn users if a parameter was passed that the specified function does not accept.
-        for param in decay_params:
-            if param not in valid_params:
-                warnings.warn('Invalid parameter {param} was passed to {func}!'.format(
-                    param=param,
-                    func=decay_function
-                ))
-        # If any valid parameters are present, bind their values.
-        if valid_params:
-            decay_function = functools.partial(decay_function, **valid_params)
-
-        return decay_function
+        for param in invalid_params:
+            warnings.warn('Invalid parameter {param} was passed to {func}!'.format(
+                param=param,
+                func=decay_function
+            ))
+        return bound_function
+
+    def bind(self, distance_matrix, keep_nonzero=False):
+        """Bind this model to a fixed distance matrix, caching the weights derived from it.
+
+        Subsequent calculations with new demand or supply arrays reuse the cached decay weights and
+        interaction probabilities rather than evaluating them again.
+
+        Parameters
+        ----------
+        distance_matrix : np.ndarray(float) or SparseDistanceMatrix
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        keep_nonzero : bool
+            If True, only the nonzero weights are cached.
+
+        Returns
+        -------
+        BoundGravityModel
+            A model that calculates access scores from demand and supply arrays alone.
+        """
+        return bound.BoundGravityModel(self, distance_matrix, keep_nonzero=keep_nonzero)
 
     def calculate_accessibility_scores(
         self,
@@ -131,11 +294,18 @@ class GravityModel(object):
     ):
         """Calculate accessibility scores from a 2D distance matrix.
 
+        The distance matrix may also be sparse, in which case only the stored pairs are used and
+        all other pairs are treated as infinitely far apart.
+
+        The decay weights and (if applicable) the interaction probabilities are evaluated once and
+        shared between both steps of the calculation. Both steps then run over blocks of rows so
+        that no additional full-size temporaries are allocated.
+
         Parameters
         ----------
-        distance_matrix : np.ndarray(float)
+        distance_matrix : np.ndarray(float) or SparseDistanceMatrix
             A matrix whose entry in row i, column j is the distance between demand point i
-            and supply point j.
+            and supply point j. Matrices from ``scipy.sparse`` are also accepted.
         demand_array : np.array(float) or None
             A one-dimensional array containing demand multipliers for each demand location.
             The length of the array must match the number of rows in distance_matrix.
@@ -153,20 +323,1121 @@ class GravityModel(object):
         if supply_array is None:
             supply_array = np.ones(distance_matrix.shape[1])
 
-        demand_potentials = self._calculate_demand_potentials(
+        if sparse.is_sparse(distance_matrix):
+            return self._calculate_sparse_accessibility_scores(
+                distance_matrix=sparse.as_sparse_distance_matrix(distance_matrix),
+                demand_array=np.asarray(demand_array),
+                supply_array=np.asarray(supply_array),
+            )
+
+        if self.n_jobs is not None:
+            return self._calculate_parallel_accessibility_scores(
+                distance_matrix=distance_matrix,
+                demand_array=np.asarray(demand_array),
+                supply_array=supply_array,
+            )
+
+        decay_weights, interaction_probabilities = self._calculate_weights(distance_matrix)
+        demand_potentials = self._sum_demand_potentials(
+            decay_weights=decay_weights,
+            interaction_probabilities=interaction_probabilities,
+            demand_array=np.asarray(demand_array),
+        )
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        return self._sum_access_ratios(
+            decay_weights=decay_weights,
+            interaction_probabilities=interaction_probabilities,
+            supply_ratios=supply_array * inverse_demands,
+        )
+
+    def calculate_accessibility_scores_for_params(
+        self,
+        distance_matrix,
+        param_name,
+        param_values,
+        demand_array=None,
+        supply_array=None
+    ):
+        """Calculate accessibility scores for many values of one decay parameter in a single call.
+
+        The decay function is evaluated for all parameter values at once by broadcasting over a
+        leading parameter axis. Work that does not depend on the parameter is shared: the
+        interaction probabilities are calculated once per block of rows in each pass, as are the
+        squared distances for decay functions listed in ``decay.SQUARED_DISTANCE_FUNCTION_MAP``.
+
+        The weights of each block are kept for the second pass if the weights of all blocks have at
+        most ``PARAM_WEIGHTS_CACHE_SIZE`` entries. Otherwise, the second pass evaluates them again,
+        which doubles the cost of evaluating the decay function.
+
+        Parameters
+        ----------
+        distance_matrix : np.ndarray(float)
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        param_name : str
+            The name of the decay parameter to vary, such as 'scale' or 'sigma'.
+        param_values : array(float)
+            The values of the decay parameter. The other parameters are those of the model.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+
+        Returns
+        -------
+        array
+            A 2D-array whose entry in row k, column i is the access score at demand location i
+            using the k-th parameter value.
+        """
+        n_rows, n_cols = distance_matrix.shape
+        if demand_array is None:
+            demand_array = np.ones(n_rows)
+        if supply_array is None:
+            supply_array = np.ones(n_cols)
+        demand_array = self._as_compute_dtype(np.asarray(demand_array))
+        param_values = self._as_compute_dtype(np.asarray(param_values)).reshape(-1, 1, 1)
+        n_params = param_values.shape[0]
+
+        decay_function = self._unbound_decay_function
+        if isinstance(decay_function, str):
+            decay_function = decay.get_decay_function(decay_function)
+        decay_params = dict(self.decay_params)
+        decay_params[param_name] = param_values
+        squared_decay_function = decay.SQUARED_DISTANCE_FUNCTION_MAP.get(decay_function)
+        if squared_decay_function is not None:
+            decay_params.pop('dtype', None)
+            decay_function = self._bind_decay_function_parameters(
+                squared_decay_function, decay_params
+            )
+        else:
+            decay_function = self._bind_decay_function_parameters(
+                decay_function, decay_params, dtype=self.dtype
+            )
+
+        def evaluate_block(rows):
+            block = self._as_compute_dtype(distance_matrix[rows])
+            if squared_decay_function is not None:
+                decay_weights = decay_function(np.square(block)[np.newaxis])
+            else:
+                decay_weights = decay_function(block[np.newaxis])
+            decay_weights = np.broadcast_to(decay_weights, (n_params,) + block.shape)
+            interaction_probabilities = None
+            if self.huff_normalization:
+                interaction_probabilities = self._calculate_interaction_probabilities(block)
+            return decay_weights, interaction_probabilities
+
+        accumulator_dtype = _get_accumulator_dtype(self.dtype)
+        block_size = max(BLOCK_SIZE // n_params, 1)
+        row_blocks = list(_iter_row_blocks(distance_matrix.shape, block_size))
+        cached_weights = [] if n_params * n_rows * n_cols <= PARAM_WEIGHTS_CACHE_SIZE else None
+        demand_potentials = None
+        for rows in row_blocks:
+            decay_weights, interaction_probabilities = evaluate_block(rows)
+            if cached_weights is not None:
+                cached_weights.append((decay_weights, interaction_probabilities))
+            demand_matrix = decay_weights * demand_array[rows, np.newaxis]
+            if interaction_probabilities is not None:
+                demand_matrix *= interaction_probabilities
+            block_potentials = _nansum(demand_matrix, axis=1, dtype=accumulator_dtype)
+            if demand_potentials is None:
+                demand_potentials = block_potentials
+            else:
+                demand_potentials += block_potentials
+        if demand_potentials is None:
+            demand_potentials = np.zeros((n_params, n_cols))
+
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        supply_ratios = self._as_compute_dtype(supply_array * inverse_demands)[:, np.newaxis, :]
+
+        access_scores = np.zeros((n_params, n_rows), dtype=supply_ratios.dtype)
+        for k, rows in enumerate(row_blocks):
+            if cached_weights is not None:
+                decay_weights, interaction_probabilities = cached_weights[k]
+            else:
+                decay_weights, interaction_probabilities = evaluate_block(rows)
+            access_ratio_matrix = np.power(decay_weights, self.suboptimality_exponent)
+            access_ratio_matrix *= supply_ratios
+            if interaction_probabilities is not None:
+                access_ratio_matrix *= interaction_probabilities
+            access_scores[:, rows] = _nansum(access_ratio_matrix, axis=2, dtype=accumulator_dtype)
+        return access_scores
+
+    def calculate_accessibility_scores_for_scenarios(
+        self,
+        distance_matrix,
+        demand_arrays=None,
+        supply_arrays=None
+    ):
+        """Calculate accessibility scores for many demand and supply scenarios at once.
+
+        The decay weights and interaction probabilities are evaluated once. Each step of the
+        calculation is then a matrix product over all scenarios, one block of rows at a time.
+
+        Parameters
+        ----------
+        distance_matrix : np.ndarray(float)
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        demand_arrays : np.ndarray(float) or None
+            A 2D-array whose row k contains the demand multipliers of scenario k.
+            A one-dimensional array is shared by all scenarios.
+        supply_arrays : np.ndarray(float) or None
+            A 2D-array whose row k contains the supply multipliers of scenario k.
+            A one-dimensional array is shared by all scenarios.
+
+        Returns
+        -------
+        array
+            A 2D-array whose entry in row k, column i is the access score at demand location i
+            in scenario k.
+        """
+        n_rows, n_cols = distance_matrix.shape
+        if demand_arrays is None:
+            demand_arrays = np.ones(n_rows)
+        if supply_arrays is None:
+            supply_arrays = np.ones(n_cols)
+        demand_arrays = self._as_compute_dtype(np.atleast_2d(demand_arrays))
+        supply_arrays = self._as_compute_dtype(np.atleast_2d(supply_arrays))
+        n_scenarios = max(demand_arrays.shape[0], supply_arrays.shape[0])
+        demand_arrays = np.broadcast_to(demand_arrays, (n_scenarios, n_rows))
+        supply_arrays = np.broadcast_to(supply_arrays, (n_scenarios, n_cols))
+
+        decay_weights, interaction_probabilities = self._calculate_weights(distance_matrix)
+
+        demand_potentials = np.zeros((n_scenarios, n_cols))
+        for rows in _iter_row_blocks(distance_matrix.shape):
+            demand_matrix = np.array(decay_weights[rows], dtype=self.dtype)
+            if interaction_probabilities is not None:
+                demand_matrix *= interaction_probabilities[rows]
+            demand_potentials += np.dot(demand_arrays[:, rows], _zero_nans(demand_matrix))
+
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        supply_ratios = self._as_compute_dtype(supply_arrays * inverse_demands)
+
+        access_scores = np.zeros((n_scenarios, n_rows), dtype=supply_ratios.dtype)
+        for rows in _iter_row_blocks(distance_matrix.shape):
+            access_ratio_matrix = np.power(decay_weights[rows], self.suboptimality_exponent)
+            if interaction_probabilities is not None:
+                access_ratio_matrix *= interaction_probabilities[rows]
+            access_scores[:, rows] = np.dot(supply_ratios, _zero_nans(access_ratio_matrix).T)
+        return access_scores
+
+    def calculate_accessibility_scores_for_layers(
+        self,
+        distance_matrices,
+        demand_array=None,
+        supply_array=None,
+        mode_shares=None
+    ):
+        """Calculate accessibility scores over a stack of distance matrices in a single call.
+
+        Each layer of the stack holds the distances by one mode of travel (such as driving or
+        walking) or in one departure-time window. The layers are stacked into a single matrix
+        with a row per pair of layer and demand location, whose decay weights and interaction
+        probabilities are evaluated in one pass and held in one buffer shared by all layers.
+
+        Without mode shares, each layer is scored independently and the blended score is the mean
+        score over all layers. With mode shares, the demand of each location is split among the
+        layers, and all layers compete for the same supply as in the multi-modal 2SFCA model of
+        Mao and Nekorchuk (2013). The score of each layer is then the access obtained through that
+        layer, and the blended score is their share-weighted sum. In either case, interaction
+        probabilities are normalized within each layer.
+
+        Parameters
+        ----------
+        distance_matrices : np.ndarray(float)
+            A 3D-array whose entry at layer l, row i, column j is the distance between demand
+            point i and supply point j in layer l.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+        mode_shares : np.ndarray(float) or None
+            If provided, the share of the demand of each location that travels by each layer,
+            as a 2D-array whose entry in row l, column i is the share of demand location i in
+            layer l. A one-dimensional array holds the share of each layer at every location.
+
+        Returns
+        -------
+        tuple
+            A 2D-array whose entry in row l, column i is the access score at demand location i in
+            layer l, and an array of blended access scores at each demand location.
+
+        References
+        ----------
+        Mao, L., & Nekorchuk, D. (2013). Measuring spatial accessibility to healthcare for
+        populations with multiple transportation modes. Health & Place, 24, 115-122.
+        """
+        distance_matrices = np.asarray(distance_matrices)
+        if distance_matrices.ndim != 3:
+            raise ValueError('The distance matrices must be stacked in a 3D-array!')
+        n_layers, n_rows, n_cols = distance_matrices.shape
+        if demand_array is None:
+            demand_array = np.ones(n_rows)
+        if supply_array is None:
+            supply_array = np.ones(n_cols)
+        demand_array = np.asarray(demand_array)
+        if mode_shares is not None:
+            mode_shares = np.asarray(mode_shares, dtype=float)
+            if mode_shares.ndim == 1:
+                mode_shares = mode_shares[:, np.newaxis]
+            mode_shares = np.broadcast_to(mode_shares, (n_layers, n_rows))
+
+        decay_weights, interaction_probabilities = self._calculate_weights(
+            distance_matrices.reshape(n_layers * n_rows, n_cols)
+        )
+        if mode_shares is None:
+            layers = [slice(layer * n_rows, (layer + 1) * n_rows) for layer in range(n_layers)]
+            layer_demands = [demand_array] * n_layers
+        else:
+            layers = [slice(0, n_layers * n_rows)]
+            layer_demands = [(mode_shares * demand_array).ravel()]
+
+        access_scores = []
+        for rows, layer_demand in zip(layers, layer_demands):
+            layer_probabilities = None
+            if interaction_probabilities is not None:
+                layer_probabilities = interaction_probabilities[rows]
+            demand_potentials = self._sum_demand_potentials(
+                decay_weights=decay_weights[rows],
+                interaction_probabilities=layer_probabilities,
+                demand_array=layer_demand,
+            )
+            inverse_demands = self._invert_demand_potentials(demand_potentials)
+            access_scores.append(self._sum_access_ratios(
+                decay_weights=decay_weights[rows],
+                interaction_probabilities=layer_probabilities,
+                supply_ratios=supply_array * inverse_demands,
+            ))
+
+        layer_scores = np.concatenate(access_scores).reshape(n_layers, n_rows)
+        if mode_shares is None:
+            return layer_scores, layer_scores.mean(axis=0)
+        return layer_scores, np.sum(mode_shares * layer_scores, axis=0)
+
+    def calculate_accessibility_scores_for_services(
+        self,
+        distance_matrix,
+        demand_array=None,
+        supply_array=None,
+        supply_types=None,
+        service_models=None
+    ):
+        """Calculate accessibility scores to several types of service in a single call.
+
+        Supply locations may offer one type of service each, given by a label per column, or any
+        number of services, given by a supply matrix with a column per service. The decay weights
+        of each supply location are evaluated once per distinct model and shared by all services
+        using that model.
+
+        Without Huff normalization, the demand potential of a supply location does not depend on
+        the service, so the scores of all services using the same model are a single matrix product
+        over the shared weights. With Huff normalization, each demand location divides its demand
+        among the supply locations offering each service separately.
+
+        Parameters
+        ----------
+        distance_matrix : np.ndarray(float)
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.ndarray(float) or None
+            Either a one-dimensional array containing supply multipliers for each supply location,
+            in which case ``supply_types`` must be given, or a 2D-array whose entry in row j,
+            column k is the supply of service k at supply location j. In the latter case, location
+            j offers service k if this supply is positive.
+        supply_types : array or None
+            The service offered by each supply location. The services are the distinct labels,
+            in sorted order.
+        service_models : sequence, mapping, or None
+            If provided, the models whose decay functions and normalization are used for each
+            service, as a sequence in the order of the services or a mapping from labels to models.
+            Services without a model use this model.
+
+        Returns
+        -------
+        array
+            A 2D-array whose entry in row i, column k is the access score at demand location i
+            to service k.
+        """
+        distance_matrix = np.asarray(distance_matrix)
+        n_rows, n_cols = distance_matrix.shape
+        if demand_array is None:
+            demand_array = np.ones(n_rows)
+        if supply_array is None:
+            supply_array = np.ones(n_cols)
+        demand_array = np.asarray(demand_array)
+        supply_array = np.asarray(supply_array, dtype=float)
+        if supply_array.ndim == 1:
+            if supply_types is None:
+                raise ValueError('A one-dimensional supply array requires supply types!')
+            services, service_indices = np.unique(supply_types, return_inverse=True)
+            offers_service = service_indices.ravel()[:, np.newaxis] == np.arange(len(services))
+            supply_matrix = offers_service * supply_array[:, np.newaxis]
+        else:
+            services = np.arange(supply_array.shape[1])
+            supply_matrix = supply_array
+            offers_service = supply_matrix > 0
+
+        if isinstance(service_models, dict):
+            service_models = [service_models.get(service, self) for service in services]
+        elif service_models is None:
+            service_models = [self] * len(services)
+
+        access_scores = np.zeros((n_rows, len(services)))
+        for model in _unique_by_identity(service_models):
+            model_services = np.array([
+                k for k, service_model in enumerate(service_models) if service_model is model
+            ])
+            columns = np.flatnonzero(np.any(offers_service[:, model_services], axis=1))
+            access_scores[:, model_services] = model._calculate_service_scores(
+                distance_matrix[:, columns],
+                demand_array,
+                supply_matrix[np.ix_(columns, model_services)],
+                offers_service[np.ix_(columns, model_services)],
+            )
+        return access_scores
+
+    def _calculate_service_scores(
+        self, distance_matrix, demand_array, supply_matrix, offers_service
+    ):
+        """Calculate the accessibility scores to several services sharing this model.
+
+        Returns
+        -------
+        array
+            A 2D-array whose entry in row i, column k is the access score at demand location i
+            to service k.
+        """
+        n_rows, n_cols = distance_matrix.shape
+        decay_weights = self._evaluate_decay(distance_matrix)
+        if self.huff_normalization:
+            access_scores = np.zeros((n_rows, supply_matrix.shape[1]))
+            for k in range(supply_matrix.shape[1]):
+                columns = np.flatnonzero(offers_service[:, k])
+                service_weights = decay_weights[:, columns]
+                interaction_probabilities = self._calculate_interaction_probabilities(
+                    self._as_compute_dtype(distance_matrix[:, columns])
+                )
+                demand_potentials = self._sum_demand_potentials(
+                    decay_weights=service_weights,
+                    interaction_probabilities=interaction_probabilities,
+                    demand_array=demand_array,
+                )
+                access_scores[:, k] = self._sum_access_ratios(
+                    decay_weights=service_weights,
+                    interaction_probabilities=interaction_probabilities,
+                    supply_ratios=supply_matrix[columns, k] * self._invert_demand_potentials(
+                        demand_potentials
+                    ),
+                )
+            return access_scores
+
+        demand_potentials = self._sum_demand_potentials(
+            decay_weights=decay_weights,
+            interaction_probabilities=None,
+            demand_array=demand_array,
+        )
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        supply_ratios = self._as_compute_dtype(supply_matrix * inverse_demands[:, np.newaxis])
+        access_scores = np.zeros((n_rows, supply_matrix.shape[1]), dtype=supply_ratios.dtype)
+        for rows in _iter_row_blocks(distance_matrix.shape):
+            access_ratio_matrix = np.power(decay_weights[rows], self.suboptimality_exponent)
+            access_scores[rows] = np.dot(_zero_nans(access_ratio_matrix), supply_ratios)
+        return access_scores
+
+    def _calculate_parallel_accessibility_scores(self, distance_matrix, demand_array, supply_array):
+        """Calculate accessibility scores over blocks of rows on a pool of threads.
+
+        Each thread evaluates the decay weights of one block of rows and sums the demand reaching
+        each supply location from that block. The partial sums are then combined in order of the
+        blocks. NumPy releases the GIL during elementwise operations and reductions, so the blocks
+        are processed concurrently.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        row_blocks = list(_iter_row_blocks(distance_matrix.shape))
+
+        def evaluate_block(rows):
+            decay_weights, interaction_probabilities = self._calculate_weights(
+                distance_matrix[rows]
+            )
+            demand_potentials = self._sum_demand_potentials(
+                decay_weights=decay_weights,
+                interaction_probabilities=interaction_probabilities,
+                demand_array=demand_array[rows],
+            )
+            return decay_weights, interaction_probabilities, demand_potentials
+
+        pool = ThreadPool(_get_n_jobs(self.n_jobs, len(row_blocks)))
+        try:
+            blocks = pool.map(profiling.in_current_thread_context(evaluate_block), row_blocks)
+            if not blocks:
+                return np.zeros(0)
+            demand_potentials = _nansum(np.array([block[2] for block in blocks]), axis=0)
+            inverse_demands = self._invert_demand_potentials(demand_potentials)
+            supply_ratios = supply_array * inverse_demands
+
+            access_scores = pool.map(
+                profiling.in_current_thread_context(lambda block: self._sum_access_ratios(
+                    decay_weights=block[0],
+                    interaction_probabilities=block[1],
+                    supply_ratios=supply_ratios,
+                )),
+                blocks
+            )
+        finally:
+            pool.close()
+        return np.concatenate(access_scores)
+
+    def calculate_accessibility_scores_chunked(
+        self,
+        distance_blocks,
+        demand_array=None,
+        supply_array=None,
+        block_size=None,
+        out=None
+    ):
+        """Calculate accessibility scores by streaming the distance matrix in blocks of rows.
+
+        Only one block of the distance matrix is held in memory at a time. The blocks are read
+        twice: the first pass accumulates the demand potential at each supply location and the
+        second pass calculates the access scores of each block of demand locations. The output is
+        identical to that of ``calculate_accessibility_scores``.
+
+        Parameters
+        ----------
+        distance_blocks : array-like, iterable, or callable
+            The distance matrix, in one of the following forms:
+                - An array-like object supporting row slicing, such as an ``np.memmap``;
+                - A re-iterable collection (such as a list) of consecutive row blocks;
+                - A callable returning a new iterator over consecutive row blocks on each call.
+
+            One-shot iterators are not accepted, since the blocks must be read twice.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+        block_size : int or None
+            The approximate number of matrix entries in each block read from an array-like input.
+            Defaults to ``BLOCK_SIZE``.
+        out : array, str, or None
+            If an array (such as an ``np.memmap``), the access scores are written into it block by
+            block. If a str, the scores are written to a new memory-mapped file at that path.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        iter_blocks = _get_block_iterator(distance_blocks, block_size)
+        if demand_array is not None:
+            demand_array = np.asarray(demand_array)
+
+        demand_potentials = None
+        n_rows = 0
+        for block in iter_blocks():
+            block = np.asarray(block)
+            block_demand = _slice_or_ones(demand_array, n_rows, block.shape[0])
+            decay_weights, interaction_probabilities = self._calculate_weights(block)
+            demand_potentials = self._sum_demand_potentials(
+                decay_weights=decay_weights,
+                interaction_probabilities=interaction_probabilities,
+                demand_array=block_demand,
+                demand_potentials=demand_potentials,
+            )
+            n_rows += block.shape[0]
+
+        if demand_potentials is None:
+            return np.zeros(0)
+        if supply_array is None:
+            supply_array = np.ones(demand_potentials.shape[0])
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        supply_ratios = supply_array * inverse_demands
+
+        access_scores = []
+        start = 0
+        for block in iter_blocks():
+            decay_weights, interaction_probabilities = self._calculate_weights(np.asarray(block))
+            block_scores = self._sum_access_ratios(
+                decay_weights=decay_weights,
+                interaction_probabilities=interaction_probabilities,
+                supply_ratios=supply_ratios,
+            )
+            if out is None:
+                access_scores.append(block_scores)
+            else:
+                if isinstance(out, str):
+                    out = loaders.open_score_array(out, n_rows, dtype=block_scores.dtype)
+                out[start:start + block_scores.shape[0]] = block_scores
+            start += block_scores.shape[0]
+
+        if out is None:
+            return np.concatenate(access_scores)
+        if isinstance(out, np.memmap):
+            out.flush()
+        return out
+
+    def calculate_accessibility_scores_from_file(
+        self,
+        path,
+        demand_array=None,
+        supply_array=None,
+        dtype=None,
+        shape=None,
+        block_size=None,
+        out=None
+    ):
+        """Calculate accessibility scores from a distance matrix memory-mapped from disk.
+
+        The matrix is never copied into memory as a whole. Rows are paged in from disk one block
+        at a time, in the dtype of the file.
+
+        Parameters
+        ----------
+        path : str or np.memmap
+            The path to a ``.npy`` file or a raw binary file, or an existing memory-mapped array.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+        dtype : np.dtype or None
+            The dtype of a raw binary file. See ``loaders.load_distance_matrix``.
+        shape : tuple(int, int), int, or None
+            The shape of the matrix in a raw binary file. See ``loaders.load_distance_matrix``.
+        block_size : int or None
+            The approximate number of matrix entries read from disk at a time.
+        out : array, str, or None
+            If provided, an array or the path of a file to which the access scores are written.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        return self.calculate_accessibility_scores_chunked(
+            distance_blocks=loaders.load_distance_matrix(path, dtype=dtype, shape=shape),
+            demand_array=demand_array,
+            supply_array=supply_array,
+            block_size=block_size,
+            out=out,
+        )
+
+    def calculate_accessibility_scores_from_records(
+        self,
+        record_blocks,
+        shape,
+        demand_array=None,
+        supply_array=None
+    ):
+        """Calculate accessibility scores by streaming blocks of (demand, supply, distance) records.
+
+        Each block holds the distances of some pairs of demand and supply locations, in any order,
+        as in an origin-destination table read from disk in chunks. Only one block is held in
+        memory at a time. The blocks are read twice: the first pass accumulates the demand
+        potential at each supply location and the second pass accumulates the access scores.
+        With Huff normalization, an additional first pass sums the Huff weights of each demand
+        location. Pairs that appear in no block are treated as infinitely far apart, as in a
+        ``SparseDistanceMatrix``.
+
+        Parameters
+        ----------
+        record_blocks : iterable or callable
+            A re-iterable collection (such as a list) of blocks, or a callable returning a new
+            iterator over the blocks on each call. Each block is a ``SparseDistanceMatrix`` or a
+            tuple of arrays holding the demand index, supply index, and distance of each pair.
+        shape : tuple(int, int)
+            The number of demand locations and the number of supply locations.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        iter_blocks = _get_block_iterator(record_blocks)
+        n_rows, n_cols = int(shape[0]), int(shape[1])
+        if demand_array is None:
+            demand_array = np.ones(n_rows)
+        if supply_array is None:
+            supply_array = np.ones(n_cols)
+
+        def iter_records():
+            for block in iter_blocks():
+                if not isinstance(block, sparse.SparseDistanceMatrix):
+                    block = sparse.SparseDistanceMatrix(*block, shape=(n_rows, n_cols))
+                yield block
+
+        huff_totals = None
+        if self.huff_normalization:
+            row_totals = np.zeros(n_rows)
+            infinite_counts = np.zeros(n_rows)
+            for block in iter_records():
+                block_totals, block_counts = _sum_sparse_huff_weights(
+                    self._calculate_sparse_huff_weights(block), block.rows, n_rows
+                )
+                row_totals += block_totals
+                infinite_counts += block_counts
+            huff_totals = (row_totals, infinite_counts)
+
+        demand_potentials = np.zeros(n_cols)
+        for block in iter_records():
+            decay_weights, interaction_probabilities = self._calculate_sparse_weights(
+                block, huff_totals
+            )
+            demand_potentials += self._sum_sparse_demand_potentials(
+                distance_matrix=block,
+                decay_weights=decay_weights,
+                interaction_probabilities=interaction_probabilities,
+                demand_array=demand_array,
+            )
+
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        supply_ratios = self._as_compute_dtype(supply_array * inverse_demands)
+
+        access_scores = np.zeros(n_rows)
+        for block in iter_records():
+            decay_weights, interaction_probabilities = self._calculate_sparse_weights(
+                block, huff_totals
+            )
+            access_scores += self._sum_sparse_access_ratios(
+                distance_matrix=block,
+                decay_weights=decay_weights,
+                interaction_probabilities=interaction_probabilities,
+                supply_ratios=supply_ratios,
+            )
+        return self._as_compute_dtype(access_scores)
+
+    def calculate_accessibility_scores_from_coordinates(
+        self,
+        demand_coordinates,
+        supply_coordinates,
+        demand_array=None,
+        supply_array=None,
+        metric='euclidean',
+        tolerance=decay.DEFAULT_TOLERANCE,
+        **kwargs
+    ):
+        """Calculate accessibility scores from the coordinates of demand and supply locations.
+
+        If the decay function has a known support radius (see ``decay.get_support_radius``), only
+        pairs of locations within it are calculated, using a grid index. For example, pairs beyond
+        ``scale`` are skipped for the uniform, parabolic, and raised cosine decay functions. With
+        Huff normalization, the attractiveness function must have a known support radius as well.
+        Otherwise, all pairs are calculated.
+
+        Parameters
+        ----------
+        demand_coordinates : np.ndarray(float)
+            A 2D-array whose row i holds the coordinates of demand location i.
+        supply_coordinates : np.ndarray(float)
+            A 2D-array whose row j holds the coordinates of supply location j.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+        metric : str
+            Either 'euclidean' or 'haversine'. See ``coordinates.calculate_distance_matrix``.
+        tolerance : float or None
+            Decay weights below this value are treated as zero when finding the support radius.
+            By default, the Gaussian decay is truncated beyond about 7.4 standard deviations.
+        **kwargs
+            Further keyword arguments passed to ``coordinates.calculate_distance_matrix``,
+            such as ``radius`` or ``max_distance``.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        if 'max_distance' not in kwargs:
+            kwargs['max_distance'] = self._get_max_distance(tolerance)
+        distance_matrix = coordinates.calculate_distance_matrix(
+            demand_coordinates, supply_coordinates, metric=metric, **kwargs
+        )
+        return self.calculate_accessibility_scores(distance_matrix, demand_array, supply_array)
+
+    def calculate_accessibility_scores_from_network(
+        self,
+        network,
+        demand_nodes,
+        supply_nodes,
+        demand_array=None,
+        supply_array=None,
+        tolerance=decay.DEFAULT_TOLERANCE,
+        **kwargs
+    ):
+        """Calculate accessibility scores from travel distances over a network.
+
+        Shortest paths are searched outward from each supply node and cut off at the support
+        radius of the decay function (and, with Huff normalization, of the attractiveness
+        function), if known. Only the pairs within it are kept, so no dense
+        distance matrix is materialized. Searches are divided among ``n_jobs`` threads, if set.
+
+        Parameters
+        ----------
+        network : Network or scipy.sparse matrix
+            The network over which to travel. See ``network.Network``.
+        demand_nodes : array(int)
+            The node of each demand location.
+        supply_nodes : array(int)
+            The node of each supply location.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+        tolerance : float or None
+            Decay weights below this value are treated as zero when finding the support radius.
+        **kwargs
+            Further keyword arguments passed to ``network.calculate_distance_matrix``,
+            such as ``method`` or ``max_distance``.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        if 'max_distance' not in kwargs:
+            kwargs['max_distance'] = self._get_max_distance(tolerance)
+        kwargs.setdefault('n_jobs', self.n_jobs)
+        distance_matrix = networks.calculate_distance_matrix(
+            network, demand_nodes, supply_nodes, **kwargs
+        )
+        return self.calculate_accessibility_scores(distance_matrix, demand_array, supply_array)
+
+    def _get_max_distance(self, tolerance):
+        """Return the distance beyond which pairs of locations do not affect the scores, if known.
+
+        With Huff normalization, pairs beyond the support of the decay function still affect the
+        interaction probabilities, so the support of the attractiveness function is needed too.
+        """
+        max_distance = decay.get_support_radius(
+            self._unbound_decay_function, self.decay_params, tolerance
+        )
+        if max_distance is not None and self.huff_normalization:
+            attractiveness_radius = decay.get_support_radius(
+                self._unbound_attractiveness_function, self.attractiveness_params, tolerance
+            )
+            if attractiveness_radius is None:
+                return None
+            max_distance = max(max_distance, attractiveness_radius)
+        return max_distance
+
+    def _calculate_weights(self, distance_matrix):
+        """Evaluate the decay weights and interaction probabilities one block of rows at a time.
+
+        Returns
+        -------
+        tuple
+            The matrix of decay weights and the matrix of interaction probabilities.
+            The latter is None unless Huff normalization is enabled.
+        """
+        decay_weights = None
+        interaction_probabilities = None
+        for rows in _iter_row_blocks(distance_matrix.shape):
+            block_weights = self._evaluate_decay(distance_matrix[rows])
+            if decay_weights is None:
+                decay_weights = np.empty(distance_matrix.shape, dtype=block_weights.dtype)
+            decay_weights[rows] = block_weights
+            if self.huff_normalization:
+                block_probabilities = self._calculate_interaction_probabilities(
+                    self._as_compute_dtype(distance_matrix[rows])
+                )
+                if interaction_probabilities is None:
+                    interaction_probabilities = np.empty(
+                        distance_matrix.shape, dtype=block_probabilities.dtype
+                    )
+                interaction_probabilities[rows] = block_probabilities
+
+        if decay_weights is None:
+            decay_weights = np.zeros(distance_matrix.shape)
+            if self.huff_normalization:
+                interaction_probabilities = np.zeros(distance_matrix.shape)
+        return decay_weights, interaction_probabilities
+
+    @profiling.stage('demand_potentials')
+    def _sum_demand_potentials(
+        self, decay_weights, interaction_probabilities, demand_array, demand_potentials=None
+    ):
+        """Sum the demand reaching each supply location, one block of rows at a time.
+
+        The running total is carried in the first row of the scratch buffer so that the column
+        sums are accumulated in exactly the same order as a single reduction over all rows.
+
+        Parameters
+        ----------
+        demand_potentials : array or None
+            Demand potentials accumulated over preceding rows of the distance matrix, if any.
+
+        Returns
+        -------
+        array
+            An array of demand at each supply location.
+        """
+        n_rows, n_cols = decay_weights.shape
+        if self.dtype is None:
+            dtype = _result_type(decay_weights, interaction_probabilities, demand_array)
+        else:
+            dtype = self.dtype
+            demand_array = self._as_compute_dtype(demand_array)
+        accumulator_dtype = _get_accumulator_dtype(self.dtype)
+        scratch = None
+        for rows in _iter_row_blocks(decay_weights.shape):
+            n_block_rows = rows.stop - rows.start
+            if scratch is None:
+                scratch = np.empty((n_block_rows + 1, n_cols), dtype=dtype)
+            block = scratch[1:n_block_rows + 1]
+            np.multiply(decay_weights[rows], demand_array[rows, np.newaxis], out=block)
+            if interaction_probabilities is not None:
+                block *= interaction_probabilities[rows]
+            if demand_potentials is None:
+                demand_potentials = _nansum(block, axis=0, dtype=accumulator_dtype)
+            elif accumulator_dtype is not None:
+                demand_potentials += _nansum(block, axis=0, dtype=accumulator_dtype)
+            else:
+                scratch[0] = demand_potentials
+                demand_potentials = _nansum(scratch[:n_block_rows + 1], axis=0)
+        if demand_potentials is None:
+            demand_potentials = np.zeros(n_cols, dtype=accumulator_dtype or dtype)
+        return demand_potentials
+
+    @profiling.stage('inverse_demands')
+    def _invert_demand_potentials(self, demand_potentials):
+        """Return the reciprocal of the demand potentials, with zero where there is no demand."""
+        return _safe_reciprocal(demand_potentials)
+
+    @profiling.stage('access_ratios')
+    def _sum_access_ratios(self, decay_weights, interaction_probabilities, supply_ratios):
+        """Sum the supply-to-demand ratios reachable from each demand location.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        n_rows, n_cols = decay_weights.shape
+        if self.dtype is None:
+            dtype = _result_type(
+                decay_weights, interaction_probabilities, supply_ratios, self.suboptimality_exponent
+            )
+        else:
+            dtype = self.dtype
+            supply_ratios = self._as_compute_dtype(supply_ratios)
+        accumulator_dtype = _get_accumulator_dtype(self.dtype)
+        access_scores = np.zeros(n_rows, dtype=dtype)
+        scratch = None
+        for rows in _iter_row_blocks(decay_weights.shape):
+            n_block_rows = rows.stop - rows.start
+            if scratch is None:
+                scratch = np.empty((n_block_rows, n_cols), dtype=dtype)
+            block = scratch[:n_block_rows]
+            np.power(decay_weights[rows], self.suboptimality_exponent, out=block)
+            block *= supply_ratios
+            if interaction_probabilities is not None:
+                block *= interaction_probabilities[rows]
+            access_scores[rows] = _nansum(block, axis=1, dtype=accumulator_dtype)
+        return access_scores
+
+    def _calculate_sparse_accessibility_scores(self, distance_matrix, demand_array, supply_array):
+        """Calculate accessibility scores over the stored pairs of a sparse distance matrix.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        decay_weights, interaction_probabilities = self._calculate_sparse_weights(distance_matrix)
+        demand_potentials = self._sum_sparse_demand_potentials(
             distance_matrix=distance_matrix,
+            decay_weights=decay_weights,
+            interaction_probabilities=interaction_probabilities,
             demand_array=demand_array,
         )
-        inverse_demands = np.reciprocal(demand_potentials)
-        inverse_demands[np.isinf(inverse_demands)] = 0.0
-        access_ratio_matrix = supply_array * inverse_demands
-        access_ratio_matrix = access_ratio_matrix * np.power(
-            self.decay_function(distance_matrix),
-            self.suboptimality_exponent
+        inverse_demands = self._invert_demand_potentials(demand_potentials)
+        supply_ratios = self._as_compute_dtype(supply_array * inverse_demands)
+        access_scores = self._sum_sparse_access_ratios(
+            distance_matrix=distance_matrix,
+            decay_weights=decay_weights,
+            interaction_probabilities=interaction_probabilities,
+            supply_ratios=supply_ratios,
         )
+        return self._as_compute_dtype(access_scores)
+
+    def _calculate_sparse_weights(self, distance_matrix, huff_totals=None):
+        """Evaluate the decay weights and interaction probabilities of each stored pair.
+
+        If provided, ``huff_totals`` holds the totals of the Huff weights of each row, as returned
+        by ``_sum_sparse_huff_weights``. Otherwise, the totals are taken over the stored pairs.
+
+        Returns
+        -------
+        tuple
+            The array of decay weights and the array of interaction probabilities.
+            The latter is None unless Huff normalization is enabled.
+        """
+        decay_weights = self._evaluate_decay(distance_matrix.distances)
+        interaction_probabilities = None
         if self.huff_normalization:
-            access_ratio_matrix *= self._calculate_interaction_probabilities(distance_matrix)
-        return np.nansum(access_ratio_matrix, axis=1)
+            interaction_probabilities = self._calculate_sparse_interaction_probabilities(
+                distance_matrix, huff_totals
+            )
+        return decay_weights, interaction_probabilities
+
+    @profiling.stage('demand_potentials')
+    def _sum_sparse_demand_potentials(
+        self, distance_matrix, decay_weights, interaction_probabilities, demand_array
+    ):
+        """Sum the demand reaching each supply location over the stored pairs.
+
+        Returns
+        -------
+        array
+            An array of demand at each supply location.
+        """
+        demand_contributions = self._as_compute_dtype(demand_array)[distance_matrix.rows]
+        demand_contributions = demand_contributions * decay_weights
+        if interaction_probabilities is not None:
+            demand_contributions *= interaction_probabilities
+        demand_contributions[np.isnan(demand_contributions)] = 0.0
+        return np.bincount(
+            distance_matrix.cols, weights=demand_contributions, minlength=distance_matrix.shape[1]
+        )
+
+    @profiling.stage('access_ratios')
+    def _sum_sparse_access_ratios(
+        self, distance_matrix, decay_weights, interaction_probabilities, supply_ratios
+    ):
+        """Sum the supply-to-demand ratios reaching each demand location over the stored pairs.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        access_ratios = np.power(decay_weights, self.suboptimality_exponent)
+        access_ratios *= supply_ratios[distance_matrix.cols]
+        if interaction_probabilities is not None:
+            access_ratios *= interaction_probabilities
+        access_ratios[np.isnan(access_ratios)] = 0.0
+        return np.bincount(
+            distance_matrix.rows, weights=access_ratios, minlength=distance_matrix.shape[0]
+        )
+
+    def _calculate_sparse_huff_weights(self, distance_matrix):
+        """Calculate the Huff weights of each stored pair, with zeros in place of NaNs."""
+        weights = self._calculate_huff_weights(self._as_compute_dtype(distance_matrix.distances))
+        weights[np.isnan(weights)] = 0.0
+        return weights
+
+    @profiling.stage('interaction_probabilities')
+    def _calculate_sparse_interaction_probabilities(self, distance_matrix, huff_totals=None):
+        """Calculate the interaction probabilities of each stored pair.
+
+        Pairs that are not stored have an interaction probability of zero.
+
+        Returns
+        -------
+        array
+            An array of the interaction probabilities of each stored pair.
+        """
+        weights = self._calculate_sparse_huff_weights(distance_matrix)
+        if huff_totals is None:
+            huff_totals = _sum_sparse_huff_weights(
+                weights, distance_matrix.rows, distance_matrix.shape[0]
+            )
+        row_totals, infinite_counts = huff_totals
+        if np.any(infinite_counts):
+            in_infinite_rows = infinite_counts[distance_matrix.rows] > 0
+            weights[in_infinite_rows] = np.isinf(weights[in_infinite_rows])
+            row_totals = np.where(infinite_counts > 0, infinite_counts, row_totals)
+        weights /= row_totals[distance_matrix.rows]
+        return weights
+
+    @profiling.stage('decay')
+    def _evaluate_decay(self, distance_array):
+        """Evaluate the decay function, skipping distances outside its support if worthwhile.
+
+        Integer distances, or distances at the given resolution, are evaluated once per distinct
+        value. Otherwise, if few of the distances lie within the support radius, the decay function
+        is evaluated at those distances alone and all other weights are set to zero.
+
+        Returns
+        -------
+        array
+            The decay weight of each distance.
+        """
+        distance_array = np.asarray(distance_array)
+        if distance_array.size and (
+            self.distance_resolution is not None or
+            np.issubdtype(distance_array.dtype, np.integer)
+        ):
+            decay_weights = self._evaluate_decay_by_value(distance_array)
+            if decay_weights is not None:
+                return decay_weights
+
+        support_radius = self.support_radius
+        if support_radius is None or not self._decay_properties.compress:
+            return self.decay_function(distance_array)
+        within_support = distance_array <= support_radius
+        if np.count_nonzero(within_support) > COMPRESSED_EVALUATION_THRESHOLD * within_support.size:
+            return self.decay_function(distance_array)
+        indices = np.flatnonzero(within_support)
+        values = np.asarray(self.decay_function(distance_array.reshape(-1)[indices]))
+        decay_weights = np.zeros(distance_array.shape, dtype=values.dtype)
+        decay_weights.reshape(-1)[indices] = values
+        return decay_weights
+
+    def _evaluate_decay_by_value(self, distance_array):
+        """Evaluate the decay function once per distinct multiple of the distance resolution.
+
+        Returns
+        -------
+        array or None
+            The decay weight of each distance, or None if the distances span too many multiples
+            of the resolution for this to be worthwhile.
+        """
+        if np.issubdtype(distance_array.dtype, np.integer):
+            resolution = 1
+            multiples = distance_array
+            off_grid = None
+        else:
+            resolution = self.distance_resolution
+            positions = distance_array * (1.0 / resolution)
+            multiples = np.rint(positions)
+            positions -= multiples
+            off_grid = ~(np.abs(positions, out=positions) <= RESOLUTION_TOLERANCE)
+            if not np.any(off_grid):
+                off_grid = None
+            else:
+                multiples[off_grid] = 0.0
+
+        smallest, largest = int(multiples.min()), int(multiples.max())
+        if largest - smallest >= distance_array.size:
+            return None
+        if self._decay_properties is None and np.issubdtype(distance_array.dtype, np.integer):
+            # Custom decay functions may rely on integer input, such as to index a table.
+            distinct_distances = np.arange(smallest, largest + 1, dtype=distance_array.dtype)
+        else:
+            distinct_distances = np.arange(smallest, largest + 1, dtype=float) * resolution
+        values = np.asarray(self.decay_function(distinct_distances))
+        indices = np.subtract(multiples, smallest, dtype=np.intp, casting='unsafe')
+        decay_weights = np.take(values, indices)
+        if off_grid is not None:
+            decay_weights[off_grid] = self.decay_function(distance_array[off_grid])
+        return decay_weights
+
+    def _as_compute_dtype(self, array):
+        """Cast an array to the dtype of the model, if one was specified."""
+        if self.dtype is None:
+            return array
+        return np.asarray(array).astype(self.dtype, copy=False)
 
     def _calculate_demand_potentials(self, distance_matrix, demand_array):
         """Calculate the demand potential at each input location.
@@ -176,11 +1447,25 @@ class GravityModel(object):
         array
             An array of demand at each supply location.
         """
-        demand_matrix = demand_array.reshape(-1, 1) * self.decay_function(distance_matrix)
-        if self.huff_normalization:
-            demand_matrix *= self._calculate_interaction_probabilities(distance_matrix)
-        return np.nansum(demand_matrix, axis=0)
+        if sparse.is_sparse(distance_matrix):
+            distance_matrix = sparse.as_sparse_distance_matrix(distance_matrix)
+            decay_weights, interaction_probabilities = self._calculate_sparse_weights(
+                distance_matrix
+            )
+            return self._sum_sparse_demand_potentials(
+                distance_matrix=distance_matrix,
+                decay_weights=decay_weights,
+                interaction_probabilities=interaction_probabilities,
+                demand_array=np.asarray(demand_array),
+            )
+        decay_weights, interaction_probabilities = self._calculate_weights(distance_matrix)
+        return self._sum_demand_potentials(
+            decay_weights=decay_weights,
+            interaction_probabilities=interaction_probabilities,
+            demand_array=np.asarray(demand_array),
+        )
 
+    @profiling.stage('interaction_probabilities')
     def _calculate_interaction_probabilities(self, distance_matrix):
         """Calculate the demand potential at each input location.
 
@@ -195,18 +1480,287 @@ class GravityModel(object):
         array
             A 2D-array of the interaction probabilities between each demand point and supply point.
         """
-        # FIXME: Use alternative decay function to capture the Huff model of spatial interaction.
-        # This particular function isn't well-behaved near 0.
-        weights = np.power(distance_matrix, -1)
-        # FIXME: Handle the case of 0 distance more intelligently.
-        weights[np.isinf(weights)] = 10**8
-        return weights / np.nansum(weights, axis=1)[:, np.newaxis]
+        return _normalize_huff_weights(self._calculate_huff_weights(distance_matrix))
+
+    def _calculate_huff_weights(self, distance_matrix):
+        """Calculate the unnormalized attractiveness of each supply point to each demand point.
+
+        Returns
+        -------
+        array
+            A 2D-array of weights whose row-normalized values are the interaction probabilities.
+        """
+        weights = self.attractiveness_function(distance_matrix)
+        if not isinstance(weights, np.ndarray) or not weights.flags.writeable:
+            weights = np.array(weights)
+        return weights
+
+
+class _LRUCache(object):
+    """A thread-safe mapping that evicts its least recently used entry once full."""
+
+    def __init__(self, max_size):
+        """Initialize an empty cache holding at most the given number of entries."""
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of entries."""
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the value of a key and mark it as most recently used, or None if absent."""
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._entries[key] = value
+            return value
+
+    def put(self, key, value):
+        """Store the value of a key, evicting the least recently used entry if necessary."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+# The functions whose bindings and parameters are cached: those of the ``decay`` module.
+_CACHED_FUNCTIONS = frozenset(
+    list(decay.NAME_TO_FUNCTION_MAP.values()) +
+    list(decay.SQUARED_DISTANCE_FUNCTION_MAP.values()) +
+    list(decay.DECAY_FUNCTION_PROPERTIES)
+)
+
+# Bound decay functions, keyed by the decay function, its parameters, and the dtype. Models built
+# with parameters seen before share the bound function rather than binding it again.
+_BOUND_FUNCTION_CACHE = _LRUCache(BOUND_FUNCTION_CACHE_SIZE)
+
+# The parameters of each function in ``_CACHED_FUNCTIONS``, as returned by ``_get_parameters``.
+_PARAMETER_CACHE = {}
+
+
+def _is_cached_function(function):
+    """Return whether the bindings and parameters of a function are cached."""
+    try:
+        return function in _CACHED_FUNCTIONS
+    except TypeError:
+        return False
+
+
+def _get_parameters(function):
+    """Return the names of the parameters of a function after the first, and the required ones.
+
+    The result is cached for the functions of the ``decay`` module, since inspecting signatures
+    is slow.
+    """
+    cacheable = _is_cached_function(function)
+    if cacheable:
+        parameters = _PARAMETER_CACHE.get(function)
+        if parameters is not None:
+            return parameters
+
+    if sys.version_info[0] >= 3:
+        signature_parameters = inspect.signature(function).parameters
+        names = tuple(signature_parameters)
+        required = tuple(
+            k for k, v in list(signature_parameters.items())[1:]
+            if v.default is inspect.Parameter.empty
+        )
+    else:
+        argspec = inspect.getargspec(function)
+        names = tuple(argspec.args)
+        required = tuple(argspec.args[1:len(argspec.args) - len(argspec.defaults or ())])
+    parameters = (names, required)
+    if cacheable:
+        _PARAMETER_CACHE[function] = parameters
+    return parameters
+
+
+def _bind_parameters(decay_function, decay_params, dtype):
+    """Bind the given parameters and dtype for a decay function.
+
+    Returns
+    -------
+    tuple
+        The bound function and the names of the given parameters that the function does not accept.
+    """
+    names, required = _get_parameters(decay_function)
+    missing_params = [k for k in required if k not in decay_params]
+    # If any required parameters are missing, raise an error.
+    if missing_params:
+        raise ValueError(
+            'Parameter(s) "{}" must be specified!'.format(', '.join(missing_params)))
+
+    valid_params = {k: v for k, v in decay_params.items() if k in names}
+    invalid_params = tuple(param for param in decay_params if param not in valid_params)
+
+    # Bind the dtype if possible; otherwise, cast the output of the decay function.
+    if dtype is not None and 'dtype' not in valid_params:
+        if 'dtype' in names:
+            valid_params['dtype'] = dtype
+        else:
+            decay_function = _with_output_dtype(decay_function, dtype)
+
+    # If any valid parameters are present, bind their values.
+    if valid_params:
+        decay_function = functools.partial(decay_function, **valid_params)
+    return decay_function, invalid_params
+
+
+def _iter_row_blocks(shape, block_size=None):
+    """Yield slices covering the rows of a matrix of the given shape in blocks.
+
+    Each block holds roughly ``block_size`` entries (``BLOCK_SIZE`` by default).
+    """
+    n_rows, n_cols = shape
+    if block_size is None:
+        block_size = BLOCK_SIZE
+    # A single column is summed pairwise by numpy, so splitting it would change the result.
+    if n_cols <= 1:
+        block_rows = max(n_rows, 1)
+    else:
+        block_rows = max(block_size // n_cols, 1)
+    for start in range(0, n_rows, block_rows):
+        yield slice(start, min(start + block_rows, n_rows))
+
+
+def _get_block_iterator(distance_blocks, block_size=None):
+    """Return a callable that yields consecutive row blocks of a distance matrix on each call."""
+    if callable(distance_blocks):
+        return distance_blocks
+    if hasattr(distance_blocks, 'shape'):
+        return lambda: (
+            distance_blocks[rows]
+            for rows in _iter_row_blocks(distance_blocks.shape, block_size)
+        )
+    if iter(distance_blocks) is distance_blocks:
+        raise TypeError(
+            'The distance blocks must be read twice. '
+            'Pass a callable returning a new iterator instead of an iterator.'
+        )
+    return lambda: iter(distance_blocks)
+
+
+def _unique_by_identity(items):
+    """Return the distinct items of a sequence, compared by identity, in order of appearance."""
+    unique_items = []
+    for item in items:
+        if not any(item is unique_item for unique_item in unique_items):
+            unique_items.append(item)
+    return unique_items
+
+
+def _slice_or_ones(array, start, length):
+    """Return the given slice of an array, or an array of ones if the array is missing."""
+    if array is None:
+        return np.ones(length)
+    return array[start:start + length]
+
+
+def _get_n_jobs(n_jobs, n_tasks):
+    """Return the number of threads to use for the given number of tasks."""
+    if n_jobs < 0:
+        n_jobs = multiprocessing.cpu_count() + 1 + n_jobs
+    return max(min(n_jobs, n_tasks), 1)
+
+
+def _nansum(block, axis, dtype=None):
+    """Sum a scratch block along an axis, treating NaNs as zero.
+
+    Equivalent to ``np.nansum`` but replaces the NaNs in place rather than in a copy.
+    """
+    block[np.isnan(block)] = 0
+    return np.sum(block, axis=axis, dtype=dtype)
+
+
+def _normalize_huff_weights(weights):
+    """Divide each row of Huff weights by its total, in place, to give interaction probabilities.
+
+    In rows containing infinite weights, the probabilities are split evenly among those entries
+    alone. This is the limit of the probabilities as the corresponding distances approach zero.
+    NaN weights are replaced by zeros.
+    """
+    row_totals = _nansum(weights, axis=1)
+    infinite_rows = np.flatnonzero(np.isinf(row_totals))
+    if infinite_rows.size:
+        infinite_weights = np.isinf(weights[infinite_rows])
+        weights[infinite_rows] = infinite_weights
+        row_totals[infinite_rows] = np.sum(infinite_weights, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights /= row_totals[:, np.newaxis]
+    return weights
+
+
+def _sum_sparse_huff_weights(weights, rows, n_rows):
+    """Sum the finite Huff weights of each row and count its infinite weights.
+
+    Returns
+    -------
+    tuple
+        The total of the finite weights of each row and the number of infinite weights in each row.
+    """
+    infinite_weights = np.isinf(weights)
+    row_totals = np.bincount(
+        rows, weights=np.where(infinite_weights, 0.0, weights), minlength=n_rows
+    )
+    infinite_counts = np.bincount(rows, weights=infinite_weights, minlength=n_rows)
+    return row_totals, infinite_counts
+
+
+def _safe_reciprocal(array):
+    """Return the reciprocal of an array, with zero in place of infinity."""
+    shape = np.shape(array)
+    array = np.atleast_1d(np.asarray(array))
+    if not np.issubdtype(array.dtype, np.inexact):
+        array = array.astype(float)
+    with np.errstate(divide='ignore'):
+        reciprocal = np.reciprocal(array)
+    reciprocal[np.isinf(reciprocal)] = 0.0
+    return reciprocal.reshape(shape)
+
+
+def _zero_nans(array):
+    """Replace the NaNs in an array with zeros, in place if the array is writeable."""
+    if not array.flags.writeable:
+        array = array.copy()
+    array[np.isnan(array)] = 0
+    return array
+
+
+def _get_accumulator_dtype(dtype):
+    """Return the dtype in which to accumulate sums of arrays of the given dtype.
+
+    Sums of single- or half-precision arrays are accumulated in double precision. Otherwise, None
+    is returned and sums are accumulated in the dtype of the arrays themselves.
+    """
+    if dtype is not None and dtype.itemsize < 8:
+        return np.float64
+    return None
+
+
+def _with_output_dtype(decay_function, dtype):
+    """Wrap a decay function so that its output is cast to the given dtype."""
+    def cast_decay_function(distance_array):
+        return np.asarray(decay_function(distance_array)).astype(dtype, copy=False)
+    return cast_decay_function
+
+
+def _result_type(*arrays):
+    """Return the dtype resulting from combining the given arrays, ignoring missing ones."""
+    return np.result_type(*[array for array in arrays if array is not None])
 
 
 class TwoStepFCA(GravityModel):
     """Represents an instance of the standard Two-Step Floating Catchment Area (2SFCA) model."""
 
-    def __init__(self, radius):
+    def __init__(self, radius, dtype=None, n_jobs=None):
         """Initialize a 2SFCA model with the specified radius.
 
         Parameters
@@ -215,8 +1769,14 @@ class TwoStepFCA(GravityModel):
             The radius of each floating catchment.
             Pairs of points further than this distance apart are deemed mutually inaccessible.
             Points within this radius contribute the full demand amount (with no decay).
+        dtype : np.dtype or None
+            If provided, the dtype of all intermediate arrays. See ``GravityModel``.
+        n_jobs : int or None
+            If provided, the number of threads to use. See ``GravityModel``.
         """
-        super(TwoStepFCA, self).__init__(decay_function='uniform', decay_params={'scale': radius})
+        super(TwoStepFCA, self).__init__(
+            decay_function='uniform', decay_params={'scale': radius}, dtype=dtype, n_jobs=n_jobs
+        )
 
 
 class ThreeStepFCA(GravityModel):
@@ -237,7 +1797,18 @@ class ThreeStepFCA(GravityModel):
     Science. 26. 1073-1089. 10.1080/13658816.2011.624987.
     """
 
-    def __init__(self, decay_function, decay_params):
+    def __init__(
+        self,
+        decay_function,
+        decay_params,
+        dtype=None,
+        n_jobs=None,
+        decay_tolerance=None,
+        lookup_tolerance=None,
+        distance_resolution=None,
+        attractiveness_function='power',
+        attractiveness_params={}
+    ):
         """Initialize a gravitational model of spatial accessibility using Huff-like normalization.
 
         Parameters
@@ -250,9 +1821,32 @@ class ThreeStepFCA(GravityModel):
         decay_params : mapping
             Parameter: value mapping for each argument of the specified decay function.
             These parameters are bound to the decay function to create a one-argument callable.
+        dtype : np.dtype or None
+            If provided, the dtype of all intermediate arrays. See ``GravityModel``.
+        n_jobs : int or None
+            If provided, the number of threads to use. See ``GravityModel``.
+        decay_tolerance : float or None
+            If provided, decay weights below this value may be treated as zero.
+            See ``GravityModel``.
+        lookup_tolerance : float or None
+            If provided, the maximum error of interpolated decay weights. See ``GravityModel``.
+        distance_resolution : float or None
+            If provided, the spacing of most distances, such as one minute. See ``GravityModel``.
+        attractiveness_function : callable or str
+            The function of distance whose row-normalized values are the interaction probabilities.
+            Defaults to inverse distance. See ``GravityModel``.
+        attractiveness_params : mapping
+            Parameter: value mapping for each argument of the attractiveness function.
         """
         super(ThreeStepFCA, self).__init__(
             decay_function=decay_function,
             decay_params=decay_params,
             huff_normalization=True,
+            dtype=dtype,
+            n_jobs=n_jobs,
+            decay_tolerance=decay_tolerance,
+            lookup_tolerance=lookup_tolerance,
+            distance_resolution=distance_resolution,
+            attractiveness_function=attractiveness_function,
+            attractiveness_params=attractiveness_params,
         )
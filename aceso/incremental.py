@@ -0,0 +1,265 @@
+"""Incremental updates of access scores as individual supply locations change.
+
+Adding, removing, or resizing a single supply location only changes the demand potential of that
+location and its contribution to each access score. These changes can be applied in O(n) time for
+n demand locations, rather than recalculating the scores over the whole distance matrix.
+
+With Huff normalization, adding or removing a supply location also changes the interaction
+probabilities of every demand location within reach of it. The demand potentials and scores are
+then recalculated from the cached weights, which requires no further evaluation of the decay
+function. Resizing a supply location does not change the interaction probabilities, so it remains
+an O(n) update.
+"""
+import numpy as np
+
+from aceso import gravity
+
+
+class IncrementalGravityModel(object):
+    """Represents the access scores of a gravity model under changes to individual supply locations.
+
+    Supply locations are identified by their column index. Removed locations keep their index.
+    """
+
+    def __init__(self, model, distance_matrix, demand_array=None, supply_array=None):
+        """Calculate the initial access scores and cache the weights needed to update them.
+
+        Parameters
+        ----------
+        model : GravityModel
+            The model whose decay function and normalization are used.
+        distance_matrix : np.ndarray(float)
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        supply_array : np.array(float) or None
+            A one-dimensional array containing supply multipliers for each supply location.
+        """
+        n_rows, n_cols = distance_matrix.shape
+        if demand_array is None:
+            demand_array = np.ones(n_rows)
+        if supply_array is None:
+            supply_array = np.ones(n_cols)
+
+        self.model = model
+        self.demand_array = model._as_compute_dtype(np.asarray(demand_array, dtype=float))
+        self.n_supply = 0
+        dtype = np.float64 if model.dtype is None else model.dtype
+        self._supply_array = np.zeros(0)
+        self._active = np.zeros(0, dtype=bool)
+        self._demand_potentials = np.zeros(0)
+        self._decay_weights = np.zeros((n_rows, 0), dtype=dtype)
+        self._access_weights = np.zeros((n_rows, 0), dtype=dtype)
+        self._huff_weights = None
+        self._row_totals = None
+        self._infinite_counts = None
+        if model.huff_normalization:
+            self._huff_weights = np.zeros((n_rows, 0), dtype=dtype)
+            self._row_totals = np.zeros(n_rows)
+            self._infinite_counts = np.zeros(n_rows)
+
+        self._reserve(n_cols)
+        self._set_columns(slice(0, n_cols), distance_matrix, supply_array)
+        self.n_supply = n_cols
+        if self._huff_weights is not None:
+            self._update_row_totals(slice(0, n_cols), 1.0)
+        self.recalculate()
+
+    @property
+    def supply_array(self):
+        """Return the supply at each supply location. Removed locations have zero supply."""
+        return self._supply_array[:self.n_supply].copy()
+
+    @property
+    def demand_potentials(self):
+        """Return the demand potential at each supply location."""
+        return self._demand_potentials[:self.n_supply].copy()
+
+    @property
+    def access_scores(self):
+        """Return the current access score at each demand location."""
+        return self._access_scores.copy()
+
+    def add_supply(self, distance_array, supply=1.0):
+        """Add a supply location and update the access scores.
+
+        Parameters
+        ----------
+        distance_array : np.array(float)
+            The distance from each demand location to the new supply location.
+        supply : float
+            The supply multiplier of the new supply location.
+
+        Returns
+        -------
+        int
+            The column index of the new supply location.
+        """
+        index = self.n_supply
+        self._reserve(index + 1)
+        column = slice(index, index + 1)
+        self._set_columns(column, np.reshape(distance_array, (-1, 1)), [supply])
+        self.n_supply += 1
+        if self._huff_weights is not None:
+            self._update_row_totals(index, 1.0)
+            self.recalculate()
+        else:
+            self._demand_potentials[index] = self._calculate_column_potential(index)
+            self._add_column_scores(index, self._supply_array[index])
+        return index
+
+    def remove_supply(self, index):
+        """Remove a supply location and update the access scores.
+
+        Parameters
+        ----------
+        index : int
+            The column index of the supply location to remove.
+        """
+        self._check_index(index)
+        if self._huff_weights is not None:
+            self._active[index] = False
+            self._supply_array[index] = 0.0
+            self._update_row_totals(index, -1.0)
+            self.recalculate()
+        else:
+            self._add_column_scores(index, -self._supply_array[index])
+            self._active[index] = False
+            self._supply_array[index] = 0.0
+            self._demand_potentials[index] = 0.0
+
+    def resize_supply(self, index, supply):
+        """Change the supply at a supply location and update the access scores.
+
+        Parameters
+        ----------
+        index : int
+            The column index of the supply location to resize.
+        supply : float
+            The new supply multiplier of the supply location.
+        """
+        self._check_index(index)
+        self._add_column_scores(index, supply - self._supply_array[index])
+        self._supply_array[index] = supply
+
+    def recalculate(self):
+        """Recalculate all demand potentials and access scores from the cached weights.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location.
+        """
+        columns = slice(0, self.n_supply)
+        demand_weights = self._get_demand_weights(columns)
+        self._demand_potentials = np.zeros(self._supply_array.shape[0])
+        self._demand_potentials[columns] = np.dot(self.demand_array, demand_weights)
+        self._demand_potentials[columns] *= self._active[columns]
+        self._access_scores = np.dot(
+            self._get_access_weights(columns),
+            self._supply_array[columns] * self._get_inverse_demands(columns),
+        )
+        return self.access_scores
+
+    def _add_column_scores(self, index, supply_change):
+        """Add the scores due to a change in supply at the given location."""
+        access_weights = self._get_access_weights(index)
+        inverse_demand = self._get_inverse_demands(index)
+        self._access_scores += access_weights * (supply_change * inverse_demand)
+
+    def _calculate_column_potential(self, index):
+        """Calculate the demand potential of the supply location with the given index."""
+        return np.dot(self.demand_array, self._get_demand_weights(index))
+
+    def _get_demand_weights(self, columns):
+        """Return the weights of demand at the given columns, including any normalization."""
+        weights = self._decay_weights[:, columns]
+        if self._huff_weights is None:
+            return weights
+        return weights * self._get_interaction_probabilities(columns)
+
+    def _get_access_weights(self, columns):
+        """Return the weights of supply at the given columns, including any normalization."""
+        weights = self._access_weights[:, columns]
+        if self._huff_weights is None:
+            return weights
+        return weights * self._get_interaction_probabilities(columns)
+
+    def _get_interaction_probabilities(self, columns):
+        """Return the Huff-like interaction probabilities at the given columns.
+
+        In rows with infinite Huff weights, the probabilities are split evenly among those entries.
+        """
+        huff_weights = self._huff_weights[:, columns]
+        inverse_totals = gravity._safe_reciprocal(self._row_totals)
+        infinite_counts = self._infinite_counts
+        if isinstance(columns, slice):
+            inverse_totals = inverse_totals[:, np.newaxis]
+            infinite_counts = infinite_counts[:, np.newaxis]
+        with np.errstate(invalid='ignore'):
+            return np.where(
+                infinite_counts > 0,
+                np.isinf(huff_weights) * gravity._safe_reciprocal(infinite_counts),
+                huff_weights * inverse_totals,
+            )
+
+    def _update_row_totals(self, columns, sign):
+        """Add (or, with a negative sign, subtract) the Huff weights of the given columns.
+
+        Finite weights are summed, while infinite weights are counted separately.
+        """
+        huff_weights = self._huff_weights[:, columns]
+        infinite_weights = np.isinf(huff_weights)
+        finite_weights = np.where(infinite_weights, 0.0, huff_weights)
+        if isinstance(columns, slice):
+            infinite_weights = infinite_weights.sum(axis=1)
+            finite_weights = finite_weights.sum(axis=1)
+        self._infinite_counts += sign * infinite_weights
+        self._row_totals += sign * finite_weights
+
+    def _get_inverse_demands(self, columns):
+        """Return the reciprocal demand potentials at the given columns, or zero for none."""
+        inverse_demands = self.model._invert_demand_potentials(self._demand_potentials[columns])
+        return inverse_demands * self._active[columns]
+
+    def _set_columns(self, columns, distance_matrix, supply_array):
+        """Evaluate and cache the weights of the given columns of the distance matrix."""
+        distance_matrix = np.asarray(distance_matrix)
+        decay_weights = np.array(self.model._evaluate_decay(distance_matrix))
+        access_weights = np.power(decay_weights, self.model.suboptimality_exponent)
+        self._decay_weights[:, columns] = gravity._zero_nans(decay_weights)
+        self._access_weights[:, columns] = gravity._zero_nans(access_weights)
+        self._supply_array[columns] = supply_array
+        self._active[columns] = True
+        if self._huff_weights is not None:
+            huff_weights = self.model._calculate_huff_weights(
+                self.model._as_compute_dtype(distance_matrix)
+            )
+            self._huff_weights[:, columns] = gravity._zero_nans(huff_weights)
+
+    def _reserve(self, n_cols):
+        """Grow the cached arrays, if necessary, to hold the given number of supply locations."""
+        capacity = self._supply_array.shape[0]
+        if n_cols <= capacity:
+            return
+        capacity = max(n_cols, 2 * capacity)
+        self._supply_array = _resize(self._supply_array, capacity)
+        self._active = _resize(self._active, capacity)
+        self._demand_potentials = _resize(self._demand_potentials, capacity)
+        self._decay_weights = _resize(self._decay_weights, capacity)
+        self._access_weights = _resize(self._access_weights, capacity)
+        if self._huff_weights is not None:
+            self._huff_weights = _resize(self._huff_weights, capacity)
+
+    def _check_index(self, index):
+        """Raise an error unless the given index refers to a supply location that is present."""
+        if not (0 <= index < self.n_supply and self._active[index]):
+            raise IndexError('There is no supply location with index {}!'.format(index))
+
+
+def _resize(array, capacity):
+    """Return a copy of an array with its last axis padded with zeros to the given length."""
+    resized = np.zeros(array.shape[:-1] + (capacity,), dtype=array.dtype)
+    resized[..., :array.shape[-1]] = array
+    return resized
@@ -0,0 +1,77 @@
+"""Methods to read distance matrices from disk and write access scores to disk.
+
+Large distance matrices are memory-mapped rather than read into memory. Pages of the file are only
+loaded as the corresponding rows are used, so matrices much larger than the available memory can
+be scored block by block with ``GravityModel.calculate_accessibility_scores_chunked``.
+
+Two file formats are supported:
+    - NumPy ``.npy`` files, whose header records the dtype and shape of the matrix;
+    - Raw binary files, whose dtype and shape must be provided by the caller.
+"""
+import numpy as np
+
+
+def load_distance_matrix(path, dtype=None, shape=None, mode='r'):
+    """Memory-map a distance matrix stored on disk without copying it into memory.
+
+    Parameters
+    ----------
+    path : str or np.memmap
+        The path to a ``.npy`` file or a raw binary file. Memory-mapped arrays are returned as-is.
+    dtype : np.dtype or None
+        The dtype of a raw binary file. Must not conflict with the header of a ``.npy`` file.
+    shape : tuple(int, int), int, or None
+        The shape of the matrix in a raw binary file. If an int, the number of columns; the number
+        of rows is then inferred from the size of the file.
+    mode : str
+        The mode in which to open the file. Defaults to read-only.
+
+    Returns
+    -------
+    np.memmap
+        A two-dimensional memory-mapped array whose entry in row i, column j is the distance between
+        demand point i and supply point j.
+    """
+    if isinstance(path, np.memmap):
+        return path
+
+    if str(path).endswith('.npy'):
+        distance_matrix = np.load(path, mmap_mode=mode)
+        if dtype is not None and np.dtype(dtype) != distance_matrix.dtype:
+            raise ValueError('File {path} has dtype {actual}, not {expected}!'.format(
+                path=path, actual=distance_matrix.dtype, expected=np.dtype(dtype)
+            ))
+    else:
+        if dtype is None or shape is None:
+            raise ValueError('Both dtype and shape must be specified for raw binary files!')
+        if np.ndim(shape) == 0:
+            distance_matrix = np.memmap(path, dtype=dtype, mode=mode).reshape(-1, int(shape))
+        else:
+            distance_matrix = np.memmap(path, dtype=dtype, mode=mode, shape=tuple(shape))
+
+    if distance_matrix.ndim != 2:
+        raise ValueError('Distance matrices must be two-dimensional!')
+    return distance_matrix
+
+
+def open_score_array(path, length, dtype=np.float64):
+    """Create a one-dimensional memory-mapped array to hold access scores.
+
+    Parameters
+    ----------
+    path : str
+        The path of the output file. Files ending in ``.npy`` are written with a NumPy header;
+        all others are written as raw binary.
+    length : int
+        The number of demand locations.
+    dtype : np.dtype
+        The dtype of the access scores.
+
+    Returns
+    -------
+    np.memmap
+        A writable memory-mapped array of the given length.
+    """
+    if str(path).endswith('.npy'):
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(length,))
+    return np.memmap(path, dtype=dtype, mode='w+', shape=(length,))
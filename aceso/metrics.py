@@ -0,0 +1,278 @@
+"""Demand-weighted summaries of access scores, such as their mean and Gini coefficient.
+
+Every function accepts either a one-dimensional array of access scores or a 2D-array whose row k
+holds the scores of scenario k, such as the output of
+``GravityModel.calculate_accessibility_scores_for_scenarios``. Each demand location is weighted by
+its demand. Summaries may also be calculated separately for each region, given a region id for each
+demand location. The last axis of each result then corresponds to the distinct region ids, in
+sorted order.
+
+Scenarios are summarized one at a time, so memory use is proportional to the number of demand
+locations. The Gini coefficient and percentiles both require the scores of each scenario to be
+sorted within each region; ``summarize`` sorts each scenario once and shares the order among all
+metrics.
+"""
+import numpy as np
+
+DEFAULT_PERCENTILES = (10.0, 25.0, 50.0, 75.0, 90.0)
+
+
+def weighted_mean(access_scores, demand_array=None, regions=None):
+    """Calculate the demand-weighted mean access score.
+
+    Parameters
+    ----------
+    access_scores : np.ndarray(float)
+        An array of access scores at each demand location, or a 2D-array with a row per scenario.
+    demand_array : np.array(float) or None
+        A one-dimensional array containing demand multipliers for each demand location.
+    regions : array or None
+        If provided, the region id of each demand location.
+
+    Returns
+    -------
+    np.ndarray(float) or float
+        The mean score of each scenario (if any) and region (if any).
+    """
+    groups = _Groups(access_scores, demand_array, regions)
+    return groups.reshape(groups.weighted_sums(groups.scores) / groups.total_weights)
+
+
+def weighted_gini(access_scores, demand_array=None, regions=None):
+    """Calculate the demand-weighted Gini coefficient of the access scores.
+
+    The coefficient is the mean absolute difference between the scores of two units of demand,
+    divided by twice the mean score. It is zero if all scores are equal.
+
+    Parameters
+    ----------
+    access_scores : np.ndarray(float)
+        An array of access scores at each demand location, or a 2D-array with a row per scenario.
+    demand_array : np.array(float) or None
+        A one-dimensional array containing demand multipliers for each demand location.
+    regions : array or None
+        If provided, the region id of each demand location.
+
+    Returns
+    -------
+    np.ndarray(float) or float
+        The Gini coefficient of each scenario (if any) and region (if any).
+    """
+    groups = _Groups(access_scores, demand_array, regions)
+    return groups.reshape(np.array([
+        groups.gini(*groups.sort(k)) for k in range(groups.n_scenarios)
+    ]))
+
+
+def weighted_percentiles(access_scores, percentiles, demand_array=None, regions=None):
+    """Calculate percentiles of the access scores of all units of demand.
+
+    The p-th percentile is the smallest score such that at least p percent of the demand has a
+    score no greater than it.
+
+    Parameters
+    ----------
+    access_scores : np.ndarray(float)
+        An array of access scores at each demand location, or a 2D-array with a row per scenario.
+    percentiles : array(float)
+        The percentiles to calculate, between 0 and 100.
+    demand_array : np.array(float) or None
+        A one-dimensional array containing demand multipliers for each demand location.
+    regions : array or None
+        If provided, the region id of each demand location.
+
+    Returns
+    -------
+    np.ndarray(float)
+        The percentiles of each scenario (if any) and region (if any), along the last axis.
+    """
+    groups = _Groups(access_scores, demand_array, regions)
+    percentiles = np.asarray(percentiles, dtype=float).ravel()
+    return groups.reshape(np.array([
+        groups.percentiles(percentiles, *groups.sort(k)) for k in range(groups.n_scenarios)
+    ]))
+
+
+def shortfall(access_scores, target, demand_array=None, regions=None):
+    """Calculate the demand whose access score falls short of a target, and the total shortfall.
+
+    Parameters
+    ----------
+    access_scores : np.ndarray(float)
+        An array of access scores at each demand location, or a 2D-array with a row per scenario.
+    target : float
+        The target access score.
+    demand_array : np.array(float) or None
+        A one-dimensional array containing demand multipliers for each demand location.
+    regions : array or None
+        If provided, the region id of each demand location.
+
+    Returns
+    -------
+    tuple
+        The total demand with a score below the target, and the demand-weighted total of the
+        shortfall of each score below the target, for each scenario (if any) and region (if any).
+    """
+    groups = _Groups(access_scores, demand_array, regions)
+    return (
+        groups.reshape(groups.weighted_sums(groups.scores < target)),
+        groups.reshape(groups.weighted_sums(np.maximum(target - groups.scores, 0.0))),
+    )
+
+
+def summarize(
+    access_scores,
+    demand_array=None,
+    regions=None,
+    percentiles=DEFAULT_PERCENTILES,
+    target=None,
+    supply_array=None
+):
+    """Calculate all summaries of the access scores, sorting each scenario only once.
+
+    Parameters
+    ----------
+    access_scores : np.ndarray(float)
+        An array of access scores at each demand location, or a 2D-array with a row per scenario.
+    demand_array : np.array(float) or None
+        A one-dimensional array containing demand multipliers for each demand location.
+    regions : array or None
+        If provided, the region id of each demand location.
+    percentiles : array(float)
+        The percentiles to calculate, between 0 and 100.
+    target : float or None
+        If provided, the target score below which the shortfall is calculated.
+    supply_array : np.array(float) or None
+        If provided, the supply at each supply location. The mean score is then also compared with
+        the total supply per unit of total demand, which it equals for the 2SFCA model when all
+        demand can reach some supply.
+
+    Returns
+    -------
+    dict
+        A mapping with the following keys, each holding an array over the scenarios (if any)
+        and the regions (if any):
+            - ``'demand'``: the total demand;
+            - ``'mean'``: the demand-weighted mean score;
+            - ``'gini'``: the demand-weighted Gini coefficient;
+            - ``'percentiles'``: the percentiles, along an additional last axis;
+            - ``'shortfall_demand'`` and ``'shortfall'``: see ``shortfall``, if a target is given;
+            - ``'mean_to_supply_ratio'``: the mean divided by the overall supply per unit of
+              demand, if a supply array is given.
+
+        If regions are given, the key ``'regions'`` holds the distinct region ids.
+    """
+    groups = _Groups(access_scores, demand_array, regions)
+    percentiles = np.asarray(percentiles, dtype=float).ravel()
+    summary = {
+        'demand': groups.reshape(np.tile(groups.total_weights, (groups.n_scenarios, 1))),
+        'mean': groups.reshape(groups.weighted_sums(groups.scores) / groups.total_weights),
+    }
+    ginis, percentile_values = [], []
+    for k in range(groups.n_scenarios):
+        sorted_scores, sorted_weights = groups.sort(k)
+        ginis.append(groups.gini(sorted_scores, sorted_weights))
+        percentile_values.append(groups.percentiles(percentiles, sorted_scores, sorted_weights))
+    summary['gini'] = groups.reshape(np.array(ginis))
+    summary['percentiles'] = groups.reshape(np.array(percentile_values))
+    if target is not None:
+        summary['shortfall_demand'] = groups.reshape(groups.weighted_sums(groups.scores < target))
+        summary['shortfall'] = groups.reshape(
+            groups.weighted_sums(np.maximum(target - groups.scores, 0.0))
+        )
+    if supply_array is not None:
+        supply_per_demand = np.sum(supply_array) / np.sum(groups.weights)
+        summary['mean_to_supply_ratio'] = summary['mean'] / supply_per_demand
+    if regions is not None:
+        summary['regions'] = groups.region_ids
+    return summary
+
+
+class _Groups(object):
+    """Access scores of one or more scenarios, with the weight and region of each location."""
+
+    def __init__(self, access_scores, demand_array=None, regions=None):
+        """Validate the inputs and index the demand locations by region."""
+        access_scores = np.asarray(access_scores, dtype=float)
+        self.squeeze_scenarios = access_scores.ndim == 1
+        self.scores = np.atleast_2d(access_scores)
+        self.n_scenarios, n_locations = self.scores.shape
+        if demand_array is None:
+            demand_array = np.ones(n_locations)
+        self.weights = np.asarray(demand_array, dtype=float).ravel()
+        if self.weights.shape[0] != n_locations:
+            raise ValueError('The demand array must have one entry per demand location!')
+
+        self.squeeze_regions = regions is None
+        if regions is None:
+            self.region_ids = np.zeros(1, dtype=int)
+            self.codes = np.zeros(n_locations, dtype=np.intp)
+        else:
+            self.region_ids, self.codes = np.unique(regions, return_inverse=True)
+            self.codes = self.codes.ravel()
+            if self.codes.shape[0] != n_locations:
+                raise ValueError('The regions must have one entry per demand location!')
+        self.n_groups = len(self.region_ids)
+        self.total_weights = np.bincount(self.codes, weights=self.weights, minlength=self.n_groups)
+        # After sorting by region, the locations of each region are contiguous.
+        counts = np.bincount(self.codes, minlength=self.n_groups)
+        self.ends = np.cumsum(counts)
+        self.starts = self.ends - counts
+
+    def weighted_sums(self, values):
+        """Return the weighted sum of each row of values within each region."""
+        return np.array([
+            np.bincount(self.codes, weights=self.weights * row, minlength=self.n_groups)
+            for row in values
+        ])
+
+    def sort(self, scenario):
+        """Return the scores and weights of a scenario sorted by region and then by score."""
+        order = np.lexsort((self.scores[scenario], self.codes))
+        return self.scores[scenario][order], self.weights[order]
+
+    def gini(self, sorted_scores, sorted_weights):
+        """Return the Gini coefficient within each region from sorted scores and weights.
+
+        For scores sorted in increasing order, the sum over all pairs of units of demand of the
+        smaller score is the sum of w_i * (2 * C_(i-1) + w_i * x_i), where C_i is the cumulative
+        weighted score within the region.
+        """
+        weighted_scores = sorted_weights * sorted_scores
+        cumulative = np.cumsum(weighted_scores)
+        offsets = np.concatenate([[0.0], cumulative])[self.starts]
+        sorted_codes = np.repeat(np.arange(self.n_groups), self.ends - self.starts)
+        preceding = cumulative - weighted_scores - offsets[sorted_codes]
+        smaller_sums = np.bincount(
+            sorted_codes,
+            weights=sorted_weights * (2.0 * preceding + weighted_scores),
+            minlength=self.n_groups,
+        )
+        totals = np.bincount(sorted_codes, weights=weighted_scores, minlength=self.n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return 1.0 - smaller_sums / (self.total_weights * totals)
+
+    def percentiles(self, percentiles, sorted_scores, sorted_weights):
+        """Return the weighted percentiles within each region from sorted scores and weights.
+
+        Returns
+        -------
+        np.ndarray(float)
+            A 2D-array whose entry in row r, column q is percentile q in region r.
+        """
+        cumulative = np.cumsum(sorted_weights)
+        offsets = np.concatenate([[0.0], cumulative])[self.starts]
+        thresholds = offsets[:, np.newaxis] + np.outer(self.total_weights, percentiles / 100.0)
+        positions = np.searchsorted(cumulative, thresholds, side='left')
+        positions = np.clip(
+            positions, self.starts[:, np.newaxis], (self.ends - 1)[:, np.newaxis]
+        )
+        return sorted_scores[positions]
+
+    def reshape(self, values):
+        """Drop the scenario and region axes of a result where the inputs did not have them."""
+        if self.squeeze_regions:
+            values = values.reshape(values.shape[:1] + values.shape[2:])
+        if self.squeeze_scenarios:
+            values = values[0]
+        return values
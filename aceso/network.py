@@ -0,0 +1,273 @@
+"""Methods to calculate travel distances between demand and supply locations over a network.
+
+A network is a directed graph stored in compressed sparse row (CSR) format: the edges leaving node
+``u`` are at positions ``indptr[u]`` to ``indptr[u + 1]`` of the ``indices`` (target nodes) and
+``weights`` (travel costs) arrays. Demand and supply locations are identified by their nodes.
+
+Shortest paths are found by searching outward from each supply node over the reversed network, so
+that the result is the distance from each demand node to the supply node. Searches stop at a
+maximum distance, usually the support radius of the decay function, and only the pairs within it
+are kept. The result is a ``SparseDistanceMatrix``, so no dense matrix is ever materialized.
+
+If ``scipy`` is installed, searches use Dijkstra's algorithm from ``scipy.sparse.csgraph``.
+Otherwise, a label-correcting search written in NumPy alone is used. It processes a batch of
+supply nodes at once, relaxing all edges that leave the current frontier of each search together.
+"""
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from aceso import sparse
+
+try:
+    from scipy.sparse import csgraph
+    import scipy.sparse
+except ImportError:  # pragma: no cover
+    csgraph = None
+
+
+class Network(object):
+    """Represents a directed network with nonnegative edge weights in CSR format."""
+
+    def __init__(self, indptr, indices, weights):
+        """Initialize a network from CSR adjacency arrays.
+
+        Parameters
+        ----------
+        indptr : array(int)
+            An array of length one more than the number of nodes. The edges leaving node u are at
+            positions ``indptr[u]`` to ``indptr[u + 1]`` of the other arrays.
+        indices : array(int)
+            The target node of each edge.
+        weights : array(float)
+            The nonnegative travel cost of each edge, such as its length or travel time.
+        """
+        self.indptr = np.asarray(indptr, dtype=np.intp).ravel()
+        self.indices = np.asarray(indices, dtype=np.intp).ravel()
+        self.weights = np.asarray(weights, dtype=float).ravel()
+        self.n_nodes = len(self.indptr) - 1
+
+        if self.n_nodes < 0 or self.indptr[0] != 0 or np.any(np.diff(self.indptr) < 0):
+            raise ValueError('indptr must be a nondecreasing array starting at zero!')
+        if not (self.indptr[-1] == len(self.indices) == len(self.weights)):
+            raise ValueError('indices and weights must have the length given by indptr!')
+        if len(self.indices) and (self.indices.min() < 0 or self.indices.max() >= self.n_nodes):
+            raise ValueError('Edge targets must be nodes of the network!')
+        if np.any(~(self.weights >= 0.0)):
+            raise ValueError('Edge weights must be nonnegative!')
+
+    @property
+    def n_edges(self):
+        """Return the number of edges."""
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(cls, sources, targets, weights, n_nodes=None, directed=True):
+        """Create a network from arrays of edges.
+
+        Parameters
+        ----------
+        sources : array(int)
+            The source node of each edge.
+        targets : array(int)
+            The target node of each edge.
+        weights : array(float)
+            The travel cost of each edge.
+        n_nodes : int or None
+            The number of nodes. Defaults to one more than the largest node in any edge.
+        directed : bool
+            If False, each edge may be traveled in both directions.
+        """
+        sources = np.asarray(sources, dtype=np.intp).ravel()
+        targets = np.asarray(targets, dtype=np.intp).ravel()
+        weights = np.asarray(weights, dtype=float).ravel()
+        if not directed:
+            sources, targets = (
+                np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            )
+            weights = np.concatenate([weights, weights])
+        if n_nodes is None:
+            n_nodes = int(max(sources.max(), targets.max())) + 1 if len(sources) else 0
+        order = np.argsort(sources, kind='mergesort')
+        indptr = np.zeros(n_nodes + 1, dtype=np.intp)
+        indptr[1:] = np.cumsum(np.bincount(sources, minlength=n_nodes))
+        return cls(indptr, targets[order], weights[order])
+
+    @classmethod
+    def from_scipy(cls, matrix):
+        """Create a network from the stored entries of a square ``scipy.sparse`` matrix."""
+        csr = matrix.tocsr()
+        return cls(csr.indptr, csr.indices, csr.data)
+
+    def reversed(self):
+        """Return the network with the direction of every edge reversed."""
+        sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        return Network.from_edges(self.indices, sources, self.weights, n_nodes=self.n_nodes)
+
+
+def calculate_distance_matrix(
+    network,
+    demand_nodes,
+    supply_nodes,
+    max_distance=None,
+    method='auto',
+    n_jobs=None
+):
+    """Calculate the travel distance from each demand node to each supply node over a network.
+
+    Parameters
+    ----------
+    network : Network or scipy.sparse matrix
+        The network over which to travel.
+    demand_nodes : array(int)
+        The node of each demand location. Several demand locations may share a node.
+    supply_nodes : array(int)
+        The node of each supply location. Several supply locations may share a node.
+    max_distance : float or None
+        If provided, only pairs of locations at most this far apart are kept, and each search
+        stops once it has reached all nodes within this distance.
+    method : str
+        The search to use: 'scipy' for Dijkstra's algorithm from ``scipy.sparse.csgraph``, 'numpy'
+        for the NumPy fallback, or 'auto' to use the former if ``scipy`` is installed.
+    n_jobs : int or None
+        If provided, the number of threads among which batches of supply nodes are divided.
+        If -1, all available processors are used.
+
+    Returns
+    -------
+    SparseDistanceMatrix
+        A sparse matrix whose entry in row i, column j is the distance from demand location i
+        to supply location j. Pairs that are not connected within the maximum distance are absent.
+    """
+    if not isinstance(network, Network):
+        network = Network.from_scipy(network)
+    if method == 'auto':
+        method = 'numpy' if csgraph is None else 'scipy'
+    if method not in ('scipy', 'numpy'):
+        raise ValueError('Unknown method "{}"!'.format(method))
+    if method == 'scipy' and csgraph is None:
+        raise ImportError('The "scipy" method requires scipy to be installed!')
+    if max_distance is None:
+        max_distance = np.inf
+
+    demand_nodes = np.asarray(demand_nodes, dtype=np.intp).ravel()
+    supply_nodes = np.asarray(supply_nodes, dtype=np.intp).ravel()
+    shape = (len(demand_nodes), len(supply_nodes))
+
+    # Search once per distinct supply node, over the reversed network.
+    search_nodes, supply_locations = np.unique(supply_nodes, return_inverse=True)
+    reversed_network = network.reversed()
+    if method == 'scipy':
+        graph = scipy.sparse.csr_matrix(
+            (reversed_network.weights, reversed_network.indices, reversed_network.indptr),
+            shape=(network.n_nodes, network.n_nodes),
+        )
+
+        def search(sources):
+            return csgraph.dijkstra(graph, indices=sources, limit=max_distance)
+    else:
+        def search(sources):
+            return _search(reversed_network, sources, max_distance)
+
+    # Group demand locations by node, so that each search result is read only at demand nodes.
+    demand_order = np.argsort(demand_nodes, kind='mergesort')
+    unique_demand_nodes, demand_counts = np.unique(demand_nodes[demand_order], return_counts=True)
+
+    def evaluate_batch(batch):
+        node_distances = search(search_nodes[batch])[:, unique_demand_nodes]
+        batch_indices, node_indices = np.nonzero(node_distances <= max_distance)
+        distances = node_distances[batch_indices, node_indices]
+        # Expand each demand node into its demand locations.
+        counts = demand_counts[node_indices]
+        offsets = np.cumsum(demand_counts) - demand_counts
+        positions = np.arange(counts.sum()) + np.repeat(
+            offsets[node_indices] - (np.cumsum(counts) - counts), counts
+        )
+        return (
+            demand_order[positions],
+            np.repeat(batch.start + batch_indices, counts),
+            np.repeat(distances, counts),
+        )
+
+    # The gravity module imports this one, so it is imported here rather than at the top.
+    from aceso import gravity
+
+    # Each batch holds about ``gravity.BLOCK_SIZE`` distances from supply nodes to network nodes.
+    batch_size = max(gravity.BLOCK_SIZE // max(network.n_nodes, 1), 1)
+    batches = [
+        slice(start, min(start + batch_size, len(search_nodes)))
+        for start in range(0, len(search_nodes), batch_size)
+    ]
+    if n_jobs is not None and len(batches) > 1:
+        pool = ThreadPool(gravity._get_n_jobs(n_jobs, len(batches)))
+        try:
+            results = pool.map(evaluate_batch, batches)
+        finally:
+            pool.close()
+    else:
+        results = [evaluate_batch(batch) for batch in batches]
+
+    if not results:
+        return sparse.SparseDistanceMatrix([], [], [], shape)
+    rows, searches, distances = [np.concatenate(arrays) for arrays in zip(*results)]
+
+    # Expand each searched node into its supply locations.
+    supply_order = np.argsort(supply_locations, kind='mergesort')
+    supply_counts = np.bincount(supply_locations, minlength=len(search_nodes))
+    counts = supply_counts[searches]
+    offsets = np.cumsum(supply_counts) - supply_counts
+    positions = np.arange(counts.sum()) + np.repeat(
+        offsets[searches] - (np.cumsum(counts) - counts), counts
+    )
+    return sparse.SparseDistanceMatrix(
+        rows=np.repeat(rows, counts),
+        cols=supply_order[positions],
+        distances=np.repeat(distances, counts),
+        shape=shape,
+    )
+
+
+def shortest_path_lengths(network, sources, max_distance=None):
+    """Calculate the shortest distance from each source node to every node, using NumPy alone.
+
+    Parameters
+    ----------
+    network : Network
+        The network over which to travel.
+    sources : array(int)
+        The nodes from which to search.
+    max_distance : float or None
+        If provided, nodes farther than this from a source are left at infinity.
+
+    Returns
+    -------
+    np.ndarray(float)
+        A 2D-array whose entry in row k, column v is the distance from ``sources[k]`` to node v.
+    """
+    return _search(network, sources, np.inf if max_distance is None else max_distance)
+
+
+def _search(network, sources, max_distance):
+    """Run a label-correcting search from each source node at once.
+
+    The distances of all searches are held in a single flattened array. At each iteration, every
+    edge leaving a node whose distance improved in the previous iteration is relaxed.
+    """
+    sources = np.asarray(sources, dtype=np.intp).ravel()
+    n_nodes = network.n_nodes
+    distances = np.full(len(sources) * n_nodes, np.inf)
+    frontier = np.arange(len(sources)) * n_nodes + sources
+    distances[frontier] = 0.0
+    while frontier.size:
+        nodes = frontier % n_nodes
+        search_offsets = frontier - nodes
+        starts = network.indptr[nodes]
+        counts = network.indptr[nodes + 1] - starts
+        edges = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        targets = np.repeat(search_offsets, counts) + network.indices[edges]
+        candidates = np.repeat(distances[frontier], counts) + network.weights[edges]
+        improving = (candidates < distances[targets]) & (candidates <= max_distance)
+        targets = targets[improving]
+        np.minimum.at(distances, targets, candidates[improving])
+        frontier = np.unique(targets)
+    return distances.reshape(len(sources), n_nodes)
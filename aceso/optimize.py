@@ -0,0 +1,237 @@
+"""Greedy selection of new supply locations to improve spatial accessibility.
+
+Without Huff normalization, adding a supply location leaves the demand potentials of all other
+supply locations unchanged. Its effect on the access scores is therefore a fixed vector, which is
+computed once per candidate location and stored sparsely: only demand locations within reach of the
+candidate see their scores change. The marginal gain of each candidate is evaluated over these
+demand locations alone rather than by recalculating the scores over the whole distance matrix.
+
+Objectives are demand-weighted means of a utility of each access score, such as the score itself
+or its shortfall below a target. Since the utilities are concave, gains can only decrease as
+locations are selected. Lazy greedy selection keeps the candidates in a priority queue ordered by
+their last known gain and only re-evaluates candidates that reach the top of the queue.
+
+References:
+    Minoux, M. (1978) Accelerated greedy algorithms for maximizing submodular set functions.
+    Optimization Techniques, Lecture Notes in Control and Information Sciences 7, 234-243.
+"""
+import heapq
+
+import numpy as np
+
+from aceso import gravity
+
+# The number of stale candidates re-evaluated together during lazy greedy selection.
+LAZY_BATCH_SIZE = 16
+
+
+def access_utility(access_scores, target=None):
+    """Return the access scores themselves. The objective is then the mean access score."""
+    return access_scores
+
+
+def shortfall_utility(access_scores, target):
+    """Return the negated shortfall of each access score below the target score."""
+    return -np.maximum(target - access_scores, 0.0)
+
+
+NAME_TO_OBJECTIVE_MAP = {
+    'mean': access_utility,
+    'shortfall': shortfall_utility,
+}
+
+
+class GreedyFacilitySelector(object):
+    """Selects supply locations from a set of candidates to maximize an accessibility objective."""
+
+    def __init__(
+        self,
+        model,
+        candidate_distance_matrix,
+        demand_array=None,
+        candidate_supply_array=None,
+        distance_matrix=None,
+        supply_array=None,
+        objective='mean',
+        target=None
+    ):
+        """Initialize a selector and evaluate the effect of each candidate location.
+
+        Parameters
+        ----------
+        model : GravityModel
+            The model used to calculate access scores. Huff normalization is not supported, since
+            the effect of each candidate would then depend on the locations already selected.
+        candidate_distance_matrix : np.ndarray(float)
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and candidate supply point j.
+        demand_array : np.array(float) or None
+            A one-dimensional array containing demand multipliers for each demand location.
+        candidate_supply_array : np.array(float) or None
+            The supply multiplier of each candidate supply location, if selected.
+        distance_matrix : np.ndarray(float) or None
+            If provided, the distance matrix of the existing supply locations.
+        supply_array : np.array(float) or None
+            The supply multiplier of each existing supply location.
+        objective : callable or str
+            If str, the name of an objective in ``NAME_TO_OBJECTIVE_MAP``: 'mean' or 'shortfall'.
+
+            If callable, a vectorized concave utility of the access scores and the target.
+            The demand-weighted mean utility over all demand locations is maximized.
+        target : float or None
+            The target access score used by the 'shortfall' objective.
+        """
+        if model.huff_normalization:
+            raise ValueError('Greedy selection does not support Huff normalization!')
+        n_rows, n_candidates = candidate_distance_matrix.shape
+        if demand_array is None:
+            demand_array = np.ones(n_rows)
+        if candidate_supply_array is None:
+            candidate_supply_array = np.ones(n_candidates)
+        if isinstance(objective, str):
+            objective = NAME_TO_OBJECTIVE_MAP[objective]
+
+        self.model = model
+        self.demand_array = np.asarray(demand_array, dtype=float)
+        self.objective = objective
+        self.target = target
+
+        if distance_matrix is None:
+            self.access_scores = np.zeros(n_rows)
+        else:
+            self.access_scores = np.array(model.calculate_accessibility_scores(
+                distance_matrix, self.demand_array, supply_array
+            ), dtype=float)
+        self.objective_values = [self._evaluate(self.access_scores)]
+        self.selected = []
+        self._indptr, self._rows, self._score_changes = self._calculate_score_changes(
+            candidate_distance_matrix, np.asarray(candidate_supply_array, dtype=float)
+        )
+
+    def select(self, n_select, lazy=True):
+        """Greedily select additional supply locations from the candidates.
+
+        Parameters
+        ----------
+        n_select : int
+            The number of candidate locations to select.
+        lazy : bool
+            If True, only re-evaluate candidates whose last known gain is the largest.
+            If False, all remaining candidates are re-evaluated at every step.
+
+        Returns
+        -------
+        list
+            The column indices of all candidate locations selected so far, in order of selection.
+        """
+        remaining = np.setdiff1d(np.arange(self._indptr.shape[0] - 1), self.selected)
+        n_select = min(n_select, remaining.shape[0])
+        if lazy:
+            gains = self._calculate_gains(remaining)
+            queue = [(-gain, index, 0) for gain, index in zip(gains, remaining)]
+            heapq.heapify(queue)
+        for step in range(n_select):
+            if lazy:
+                index = _pop_best(queue, step, self._calculate_gains)
+            else:
+                gains = self._calculate_gains(remaining)
+                index = remaining[np.argmax(gains)]
+                remaining = remaining[remaining != index]
+            self._add(index)
+        return list(self.selected)
+
+    def _add(self, index):
+        """Add the candidate location with the given index to the selection."""
+        entries = slice(self._indptr[index], self._indptr[index + 1])
+        self.access_scores[self._rows[entries]] += self._score_changes[entries]
+        self.objective_values.append(self._evaluate(self.access_scores))
+        self.selected.append(int(index))
+
+    def _calculate_gains(self, indices):
+        """Calculate the marginal gains in the objective of the given candidate locations.
+
+        Only demand locations whose scores change contribute to the gain of each candidate.
+        """
+        indices = np.asarray(indices, dtype=int)
+        starts = self._indptr[indices]
+        lengths = self._indptr[indices + 1] - starts
+        candidates = np.repeat(np.arange(indices.shape[0]), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        entries = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+
+        rows = self._rows[entries]
+        current_scores = self.access_scores[rows]
+        utility_changes = (
+            self.objective(current_scores + self._score_changes[entries], self.target) -
+            self.objective(current_scores, self.target)
+        )
+        gains = np.bincount(
+            candidates,
+            weights=self.demand_array[rows] * utility_changes,
+            minlength=indices.shape[0]
+        )
+        return gains / np.sum(self.demand_array)
+
+    def _calculate_score_changes(self, candidate_distance_matrix, candidate_supply_array):
+        """Calculate the change in access scores caused by adding each candidate location alone.
+
+        Returns
+        -------
+        tuple
+            The nonzero changes in compressed sparse column format: the offsets of each candidate
+            (of length one more than the number of candidates), the demand location of each change,
+            and the change itself.
+        """
+        n_rows, n_candidates = candidate_distance_matrix.shape
+        indptr = np.zeros(n_candidates + 1, dtype=int)
+        rows = []
+        score_changes = []
+        for columns in _iter_column_blocks(n_rows, n_candidates):
+            decay_weights, _ = self.model._calculate_weights(candidate_distance_matrix[:, columns])
+            demand_potentials = self.model._sum_demand_potentials(
+                decay_weights=decay_weights,
+                interaction_probabilities=None,
+                demand_array=self.demand_array,
+            )
+            inverse_demands = self.model._invert_demand_potentials(demand_potentials)
+
+            block_changes = np.power(decay_weights, self.model.suboptimality_exponent)
+            block_changes *= candidate_supply_array[columns] * inverse_demands
+            block_changes[np.isnan(block_changes)] = 0.0
+
+            block_columns, block_rows = np.nonzero(block_changes.T)
+            indptr[columns.start + 1:columns.stop + 1] = np.bincount(
+                block_columns, minlength=columns.stop - columns.start
+            )
+            rows.append(block_rows)
+            score_changes.append(block_changes[block_rows, block_columns])
+        return np.cumsum(indptr), np.concatenate(rows), np.concatenate(score_changes)
+
+    def _evaluate(self, access_scores):
+        """Evaluate the objective, the demand-weighted mean utility of the access scores."""
+        utilities = self.objective(access_scores, self.target)
+        return np.dot(self.demand_array, utilities) / np.sum(self.demand_array)
+
+
+def _pop_best(queue, step, calculate_gains, batch_size=None):
+    """Pop the candidate with the largest gain from a lazy priority queue.
+
+    Each entry records the step at which its gain was last evaluated. Stale entries at the top of
+    the queue are re-evaluated in batches and pushed back until the top entry is up to date.
+    """
+    if batch_size is None:
+        batch_size = LAZY_BATCH_SIZE
+    while queue[0][2] != step:
+        stale = []
+        while queue and queue[0][2] != step and len(stale) < batch_size:
+            stale.append(heapq.heappop(queue)[1])
+        for gain, index in zip(calculate_gains(stale), stale):
+            heapq.heappush(queue, (-gain, index, step))
+    return heapq.heappop(queue)[1]
+
+
+def _iter_column_blocks(n_rows, n_cols):
+    """Yield slices covering the given number of columns, about ``BLOCK_SIZE`` entries at a time."""
+    block_cols = max(gravity.BLOCK_SIZE // max(n_rows, 1), 1)
+    for start in range(0, n_cols, block_cols):
+        yield slice(start, min(start + block_cols, n_cols))
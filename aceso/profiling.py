@@ -0,0 +1,141 @@
+"""Optional timing of the stages of access score calculations.
+
+Each stage of a calculation, such as evaluating the decay function or summing the demand potentials,
+is a method of ``GravityModel`` marked with the ``stage`` decorator. While a callback is registered
+with ``GravityModel.profile``, every call to such a method reports a ``StageStats`` record to it.
+Otherwise, the decorator adds a single attribute lookup to each call.
+
+Callbacks are registered for the current thread only, so profiling a model shared between threads
+reports the calculations of the profiling thread alone. The threads that a model starts itself,
+when ``n_jobs`` is set, report to the callbacks of the thread that started the calculation.
+
+Stages that run over blocks of rows report once per block. The reported size is that of the arrays
+returned by the stage, which is the memory it allocates for its result.
+
+The stages are:
+    - ``'decay'``: evaluating the decay function;
+    - ``'interaction_probabilities'``: calculating Huff-like interaction probabilities;
+    - ``'demand_potentials'``: summing the demand reaching each supply location;
+    - ``'inverse_demands'``: taking the reciprocal of the demand potentials;
+    - ``'access_ratios'``: summing the supply-to-demand ratios reaching each demand location.
+"""
+import collections
+import contextlib
+import functools
+import threading
+import timeit
+
+import numpy as np
+
+
+class StageStats(collections.namedtuple('StageStats', ['stage', 'seconds', 'nbytes', 'shape'])):
+    """The wall time of one call to a stage and the size and shape of its result.
+
+    For stages that return several arrays, ``nbytes`` is their total size and ``shape`` that of the
+    first array.
+    """
+
+    __slots__ = ()
+
+
+# The callbacks registered in each thread, keyed by the id of the profiled model.
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def register(model, callback):
+    """Register a callback for the stages of the given model in the current thread."""
+    callbacks = _local.__dict__.setdefault('callbacks', {})
+    previous_callback = callbacks.get(id(model))
+    callbacks[id(model)] = callback
+    try:
+        yield callback
+    finally:
+        if previous_callback is None:
+            del callbacks[id(model)]
+        else:
+            callbacks[id(model)] = previous_callback
+
+
+def in_current_thread_context(function):
+    """Return a function that reports to the callbacks of the current thread from any thread.
+
+    Used for tasks that a model runs on threads of its own.
+    """
+    callbacks = getattr(_local, 'callbacks', None)
+    if not callbacks:
+        return function
+    callbacks = dict(callbacks)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        previous_callbacks = getattr(_local, 'callbacks', None)
+        _local.callbacks = callbacks
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.callbacks = previous_callbacks
+    return wrapper
+
+
+def stage(name):
+    """Return a decorator reporting each call of a ``GravityModel`` method as the named stage."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            callbacks = getattr(_local, 'callbacks', None)
+            callback = callbacks.get(id(self)) if callbacks else None
+            if callback is None:
+                return method(self, *args, **kwargs)
+            started = timeit.default_timer()
+            result = method(self, *args, **kwargs)
+            seconds = timeit.default_timer() - started
+            arrays = [
+                array for array in (result if isinstance(result, tuple) else (result,))
+                if array is not None
+            ]
+            callback(StageStats(
+                stage=name,
+                seconds=seconds,
+                nbytes=sum(np.asarray(array).nbytes for array in arrays),
+                shape=np.shape(arrays[0]) if arrays else (),
+            ))
+            return result
+        return wrapper
+    return decorator
+
+
+class Profiler(object):
+    """Collects the stage statistics reported during a calculation.
+
+    A profiler may be passed as the callback of ``GravityModel.profile``. Stages may report from
+    several threads at once when ``n_jobs`` is set, or if the same profiler is registered in
+    several threads.
+    """
+
+    def __init__(self):
+        """Initialize an empty profiler."""
+        self.records = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stats):
+        """Record the statistics of one call to a stage."""
+        with self._lock:
+            self.records.append(stats)
+
+    def summary(self):
+        """Return the number of calls, total wall time, and total size of each stage.
+
+        Returns
+        -------
+        dict
+            A mapping from each stage name to a dict with keys 'calls', 'seconds', and 'nbytes',
+            in order of the first call to each stage.
+        """
+        totals = collections.OrderedDict()
+        for stats in self.records:
+            total = totals.setdefault(stats.stage, {'calls': 0, 'seconds': 0.0, 'nbytes': 0})
+            total['calls'] += 1
+            total['seconds'] += stats.seconds
+            total['nbytes'] += stats.nbytes
+        return totals
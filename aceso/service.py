@@ -0,0 +1,223 @@
+"""An asyncio service answering concurrent queries for access scores over a fixed distance matrix.
+
+Queries such as "what is the access score of this tract if facility X changes capacity" leave the
+distance matrix unchanged. The service binds the model to the matrix once, so that the decay weights
+are evaluated a single time and held in memory (see ``GravityModel.bind``). Each query is then a
+pair of matrix products.
+
+Queries are answered in batches on an executor, leaving the event loop free. While a batch is
+being calculated, new queries are queued. The queued queries are then calculated together as a
+stack of scenarios, which replaces many matrix-vector products by a few matrix-matrix products.
+A query arriving while the service is idle is calculated at once, so batching never delays it.
+
+The service can also be exposed over TCP with ``start_server``. Each request is a line holding a
+JSON object with any of the keys 'supply_changes' (a mapping from supply location index to new
+supply), 'demand_changes' (likewise for demand locations), and 'rows' (the demand locations whose
+scores are returned). Each response is a line holding a JSON object with the key 'scores' or, if
+the query failed, 'error'.
+
+This module uses syntax that requires Python 3.5 or later, so it is not imported by ``aceso``.
+"""
+import asyncio
+import json
+
+import numpy as np
+
+# The maximum number of queries calculated together in one batch.
+MAX_BATCH_SIZE = 256
+
+
+class AccessibilityService(object):
+    """Answers concurrent queries for access scores using weights cached for one distance matrix."""
+
+    def __init__(
+        self,
+        model,
+        distance_matrix,
+        demand_array=None,
+        supply_array=None,
+        executor=None,
+        max_batch_size=MAX_BATCH_SIZE,
+        keep_nonzero=False
+    ):
+        """Bind a model to a distance matrix in order to answer queries about it.
+
+        Parameters
+        ----------
+        model : GravityModel
+            The model used to calculate access scores.
+        distance_matrix : np.ndarray(float) or SparseDistanceMatrix
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        demand_array : np.array(float) or None
+            The demand multipliers of each demand location, to which query changes are applied.
+        supply_array : np.array(float) or None
+            The supply multipliers of each supply location, to which query changes are applied.
+        executor : concurrent.futures.Executor or None
+            The executor on which batches are calculated. Defaults to that of the event loop.
+            Since NumPy releases the GIL during matrix products, threads are suitable.
+        max_batch_size : int
+            The maximum number of queries calculated together.
+        keep_nonzero : bool
+            If True, only the nonzero weights are cached. See ``GravityModel.bind``.
+        """
+        n_rows, n_cols = distance_matrix.shape
+        self.bound_model = model.bind(distance_matrix, keep_nonzero=keep_nonzero)
+        self.demand_array = np.ones(n_rows) if demand_array is None else np.array(
+            demand_array, dtype=float
+        )
+        self.supply_array = np.ones(n_cols) if supply_array is None else np.array(
+            supply_array, dtype=float
+        )
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.n_batches = 0
+        self._queue = []
+        self._worker = None
+
+    async def start(self):
+        """Evaluate the cached weights on the executor, so that the first query is not delayed."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self.executor, self.bound_model._get_weights)
+
+    async def calculate_accessibility_scores(
+        self,
+        supply_changes=None,
+        demand_changes=None,
+        rows=None
+    ):
+        """Calculate access scores after hypothetical changes to the supply or demand.
+
+        The changes apply to this query alone. The stored demand and supply are unchanged.
+
+        Parameters
+        ----------
+        supply_changes : mapping or None
+            A mapping from the index of a supply location to its new supply multiplier.
+        demand_changes : mapping or None
+            A mapping from the index of a demand location to its new demand multiplier.
+        rows : array(int) or None
+            If provided, the demand locations whose scores are returned.
+
+        Returns
+        -------
+        array
+            An array of access scores at each demand location, or at the given rows.
+        """
+        demand_array = _apply_changes(self.demand_array, demand_changes)
+        supply_array = _apply_changes(self.supply_array, supply_changes)
+        if rows is not None:
+            rows = np.asarray(rows, dtype=int)
+            _check_indices(rows, len(self.demand_array))
+        future = asyncio.get_event_loop().create_future()
+        self._queue.append((demand_array, supply_array, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run_batches())
+        access_scores = await future
+        return access_scores if rows is None else access_scores[rows]
+
+    async def _run_batches(self):
+        """Calculate the queued queries in batches until the queue is empty."""
+        loop = asyncio.get_event_loop()
+        while self._queue:
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:len(batch)]
+            batch = [query for query in batch if not query[2].cancelled()]
+            if not batch:
+                continue
+            demand_arrays, supply_arrays, futures = zip(*batch)
+            try:
+                access_scores = await loop.run_in_executor(
+                    self.executor, self._calculate_batch, demand_arrays, supply_arrays
+                )
+            except Exception as error:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for future, scores in zip(futures, access_scores):
+                if not future.done():
+                    future.set_result(scores)
+
+    def _calculate_batch(self, demand_arrays, supply_arrays):
+        """Calculate the access scores of a batch of queries as one stack of scenarios.
+
+        Returns
+        -------
+        array
+            A 2D-array whose row k holds the access scores of query k.
+        """
+        self.n_batches += 1
+        # Queries without demand changes share the stored demand array, and with it the demand
+        # potentials.
+        if all(demand_array is self.demand_array for demand_array in demand_arrays):
+            demand_arrays = self.demand_array
+        return np.atleast_2d(self.bound_model.calculate_accessibility_scores(
+            demand_array=np.array(demand_arrays), supply_array=np.array(supply_arrays)
+        ))
+
+
+async def start_server(service, host='127.0.0.1', port=0):
+    """Serve queries to the given service over TCP, one JSON object per line.
+
+    Parameters
+    ----------
+    service : AccessibilityService
+        The service that answers the queries.
+    host : str
+        The interface on which to listen.
+    port : int
+        The port on which to listen. If zero, a free port is chosen.
+
+    Returns
+    -------
+    asyncio.AbstractServer
+        The server, whose ``sockets`` give the address on which it listens.
+    """
+    async def handle_connection(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line.decode())
+                access_scores = await service.calculate_accessibility_scores(
+                    supply_changes=_parse_changes(request.get('supply_changes')),
+                    demand_changes=_parse_changes(request.get('demand_changes')),
+                    rows=request.get('rows'),
+                )
+                response = {'scores': access_scores.tolist()}
+            except Exception as error:
+                response = {'error': '{}: {}'.format(type(error).__name__, error)}
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+def _apply_changes(array, changes):
+    """Return the array with the given changes applied, or the array itself if there are none."""
+    if not changes:
+        return array
+    _check_indices(list(changes), len(array))
+    array = array.copy()
+    for index, value in changes.items():
+        array[index] = value
+    return array
+
+
+def _check_indices(indices, n_locations):
+    """Raise an IndexError unless every index is that of one of the given number of locations."""
+    for index in np.ravel(indices):
+        if not 0 <= index < n_locations:
+            raise IndexError('Location index {} is out of range for {} locations!'.format(
+                index, n_locations
+            ))
+
+
+def _parse_changes(changes):
+    """Convert the keys of a mapping of changes decoded from JSON to indices."""
+    if changes is None:
+        return None
+    return {int(index): float(value) for index, value in changes.items()}
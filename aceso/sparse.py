@@ -0,0 +1,91 @@
+"""A lightweight container for sparse distance matrices.
+
+Compact-support decay functions (such as uniform, parabolic, and raised cosine decay) are exactly
+zero beyond their scale, so most entries of a large distance matrix contribute nothing to the
+access scores. Storing only the relevant pairs avoids evaluating the decay function on all others.
+
+Pairs that are not stored are treated as infinitely far apart. In particular, this differs from the
+convention of ``scipy.sparse``, whose implicit entries are zero. Matrices from ``scipy.sparse`` are
+accepted, but only their explicitly stored entries are used.
+"""
+import numpy as np
+
+
+class SparseDistanceMatrix(object):
+    """Represents the distances between selected pairs of demand and supply locations.
+
+    Distances are stored in coordinate (COO) format: the entry at position k is the distance
+    between demand location ``rows[k]`` and supply location ``cols[k]``.
+    """
+
+    def __init__(self, rows, cols, distances, shape):
+        """Initialize a sparse distance matrix from coordinate arrays.
+
+        Parameters
+        ----------
+        rows : array(int)
+            The index of the demand location of each stored pair.
+        cols : array(int)
+            The index of the supply location of each stored pair.
+        distances : array(float)
+            The distance between the demand and supply location of each stored pair.
+        shape : tuple(int, int)
+            The number of demand locations and the number of supply locations.
+        """
+        self.rows = np.asarray(rows, dtype=np.intp).ravel()
+        self.cols = np.asarray(cols, dtype=np.intp).ravel()
+        self.distances = np.asarray(distances).ravel()
+        self.shape = (int(shape[0]), int(shape[1]))
+
+        if not (len(self.rows) == len(self.cols) == len(self.distances)):
+            raise ValueError('rows, cols, and distances must have the same length!')
+        if len(self.rows) and (
+            self.rows.min() < 0 or self.rows.max() >= self.shape[0] or
+            self.cols.min() < 0 or self.cols.max() >= self.shape[1]
+        ):
+            raise ValueError('Indices must lie within a matrix of shape {}!'.format(self.shape))
+
+    @property
+    def nnz(self):
+        """Return the number of stored pairs."""
+        return len(self.distances)
+
+    @classmethod
+    def from_dense(cls, distance_matrix, max_distance=np.inf):
+        """Create a sparse distance matrix from the entries of a dense matrix.
+
+        Parameters
+        ----------
+        distance_matrix : np.ndarray(float)
+            A matrix whose entry in row i, column j is the distance between demand point i
+            and supply point j.
+        max_distance : float
+            Only pairs at most this far apart are stored. Infinite and NaN entries are never stored.
+        """
+        distance_matrix = np.asarray(distance_matrix)
+        rows, cols = np.nonzero(distance_matrix <= max_distance)
+        return cls(rows, cols, distance_matrix[rows, cols], distance_matrix.shape)
+
+    @classmethod
+    def from_scipy(cls, matrix):
+        """Create a sparse distance matrix from the stored entries of a ``scipy.sparse`` matrix."""
+        coo = matrix.tocoo()
+        return cls(coo.row, coo.col, coo.data, coo.shape)
+
+    def toarray(self):
+        """Return the dense equivalent of this matrix, with missing pairs set to infinity."""
+        dense = np.full(self.shape, np.inf, dtype=np.result_type(self.distances, np.float64))
+        dense[self.rows, self.cols] = self.distances
+        return dense
+
+
+def is_sparse(distance_matrix):
+    """Return True if the input is a sparse distance matrix or a ``scipy.sparse`` matrix."""
+    return isinstance(distance_matrix, SparseDistanceMatrix) or hasattr(distance_matrix, 'tocoo')
+
+
+def as_sparse_distance_matrix(distance_matrix):
+    """Convert a sparse input into a ``SparseDistanceMatrix``, without copying if possible."""
+    if isinstance(distance_matrix, SparseDistanceMatrix):
+        return distance_matrix
+    return SparseDistanceMatrix.from_scipy(distance_matrix)
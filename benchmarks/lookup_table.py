@@ -0,0 +1,65 @@
+"""Benchmark lookup-table evaluation of decay functions against exact evaluation.
+
+For each decay function, the weights of a random distance matrix are evaluated exactly and by
+interpolation in a lookup table. The time of each and the maximum absolute error are printed.
+
+Usage:
+    python benchmarks/lookup_table.py [n_rows] [n_cols] [tolerance]
+"""
+import sys
+import timeit
+
+import numpy as np
+
+import aceso
+
+
+def logistic_decay(distance_array, scale):
+    """A decay function without registered properties, to exercise the growing table."""
+    return 1.0 / (1.0 + np.exp((distance_array - scale) / (0.1 * scale)))
+
+
+DECAY_FUNCTIONS = [
+    ('raised_cosine', {'scale': 60.0}),
+    ('parabolic', {'scale': 60.0}),
+    ('gaussian', {'sigma': 20.0}),
+    (logistic_decay, {'scale': 60.0}),
+]
+
+
+def main(n_rows=2000, n_cols=1000, tolerance=1e-6, n_repeats=5):
+    """Print the timing and accuracy of lookup-table evaluation for each decay function."""
+    random_state = np.random.RandomState(0)
+    distance_matrix = random_state.uniform(0.0, 60.0, size=(n_rows, n_cols))
+    print('{:>16} {:>12} {:>12} {:>8} {:>12}'.format(
+        'decay', 'exact (s)', 'lookup (s)', 'speedup', 'max error'
+    ))
+    for decay_function, decay_params in DECAY_FUNCTIONS:
+        exact_model = aceso.GravityModel(decay_function, decay_params)
+        lookup_model = aceso.GravityModel(
+            decay_function, decay_params, lookup_tolerance=tolerance
+        )
+        lookup_model.decay_function(distance_matrix)  # Build any growing table outside the timing.
+        exact_time = min(timeit.repeat(
+            lambda: exact_model.decay_function(distance_matrix), number=1, repeat=n_repeats
+        ))
+        lookup_time = min(timeit.repeat(
+            lambda: lookup_model.decay_function(distance_matrix), number=1, repeat=n_repeats
+        ))
+        error = np.max(np.abs(
+            exact_model.decay_function(distance_matrix) -
+            lookup_model.decay_function(distance_matrix)
+        ))
+        name = decay_function if isinstance(decay_function, str) else decay_function.__name__
+        print('{:>16} {:>12.4f} {:>12.4f} {:>8.2f} {:>12.2e}'.format(
+            name, exact_time, lookup_time, exact_time / lookup_time, error
+        ))
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    main(
+        n_rows=int(arguments[0]) if len(arguments) > 0 else 2000,
+        n_cols=int(arguments[1]) if len(arguments) > 1 else 1000,
+        tolerance=float(arguments[2]) if len(arguments) > 2 else 1e-6,
+    )
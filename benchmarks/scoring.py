@@ -0,0 +1,216 @@
+"""Benchmark the time and peak memory of access score calculations.
+
+Each case scores a random distance matrix with one model and decay function:
+    - ``GravityModel`` and ``ThreeStepFCA`` with each decay function in ``NAME_TO_FUNCTION_MAP``;
+    - ``TwoStepFCA``, whose decay function is always uniform.
+
+Matrices are generated in two regimes: 'dense', where every distance lies within the scale of the
+decay function, and 'sparse', where most distances lie far beyond it. Matrices with more than
+``MAX_DENSE_ENTRIES`` entries are not held in memory. Instead, a single block of rows is generated
+and scored repeatedly with ``calculate_accessibility_scores_chunked``.
+
+The time of each case is the minimum over several repeats. Peak memory is measured in a separate
+run with ``tracemalloc``, to which NumPy reports its allocations, and excludes the input matrix.
+Results are printed as a table and may be saved as JSON. Given the JSON results of an earlier run,
+cases that became slower or used more memory by more than a threshold are reported as regressions.
+
+Usage:
+    python benchmarks/scoring.py [--shapes 1000x100,10000x1000] [--output results.json]
+                                 [--compare baseline.json] [--threshold 1.25]
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+
+import aceso
+from aceso import decay
+from aceso import gravity
+
+# The scale of the decay functions, in the units of the distances.
+SCALE = 60.0
+
+DECAY_PARAMS = {
+    'uniform': {'scale': SCALE},
+    'raised_cosine': {'scale': SCALE},
+    'gaussian': {'sigma': SCALE / 3.0},
+    'parabolic': {'scale': SCALE},
+    'epanechnikov': {'scale': SCALE},
+    'power': {'beta': 1.0},
+}
+
+SHAPES = [(1000, 100), (10000, 1000), (100000, 10000)]
+DEFAULT_SHAPES = SHAPES[:2]
+
+REGIMES = ('dense', 'sparse')
+
+# The fraction of distances within the scale of the decay function in the 'sparse' regime.
+SPARSE_FRACTION = 0.05
+
+# Matrices with more entries than this are scored in blocks rather than held in memory.
+MAX_DENSE_ENTRIES = 2**25
+
+
+def get_cases():
+    """Return the name, model, and decay function name of each benchmarked model."""
+    cases = [('TwoStepFCA', aceso.TwoStepFCA(radius=SCALE), 'uniform')]
+    seen = set()
+    for name, decay_function in sorted(decay.NAME_TO_FUNCTION_MAP.items()):
+        if decay_function in seen:
+            continue
+        seen.add(decay_function)
+        decay_params = DECAY_PARAMS.get(name, {})
+        cases.append(('GravityModel', aceso.GravityModel(name, decay_params), name))
+        cases.append(('ThreeStepFCA', aceso.ThreeStepFCA(name, decay_params), name))
+    return cases
+
+
+def generate_distances(n_rows, n_cols, regime, random_state):
+    """Generate a random distance matrix in the given regime."""
+    distances = random_state.uniform(0.0, SCALE, size=(n_rows, n_cols))
+    if regime == 'sparse':
+        far = random_state.uniform(size=(n_rows, n_cols)) >= SPARSE_FRACTION
+        distances[far] *= 10.0
+        distances[far] += SCALE
+    return distances
+
+
+def get_scorer(model, shape, regime, random_state):
+    """Return a function that scores a matrix of the given shape, and the method it uses."""
+    n_rows, n_cols = shape
+    if n_rows * n_cols <= MAX_DENSE_ENTRIES:
+        distance_matrix = generate_distances(n_rows, n_cols, regime, random_state)
+        return lambda: model.calculate_accessibility_scores(distance_matrix), 'dense'
+
+    block_rows = max(gravity.BLOCK_SIZE // n_cols, 1)
+    block = generate_distances(block_rows, n_cols, regime, random_state)
+
+    def iter_blocks():
+        for start in range(0, n_rows, block_rows):
+            yield block[:min(block_rows, n_rows - start)]
+
+    return lambda: model.calculate_accessibility_scores_chunked(iter_blocks), 'chunked'
+
+
+def measure_peak_memory(function):
+    """Return the peak memory in bytes allocated while calling the function."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(shapes, n_repeats=3):
+    """Run every case at every shape and regime, printing and returning the results."""
+    results = []
+    print('{:>14} {:>14} {:>14} {:>7} {:>8} {:>10} {:>12}'.format(
+        'model', 'decay', 'shape', 'regime', 'method', 'time (s)', 'peak (MiB)'
+    ))
+    for shape in shapes:
+        for regime in REGIMES:
+            for model_name, model, decay_name in get_cases():
+                score, method = get_scorer(model, shape, regime, np.random.RandomState(0))
+                seconds = min(timeit.repeat(score, number=1, repeat=n_repeats))
+                peak_bytes = measure_peak_memory(score)
+                result = {
+                    'model': model_name,
+                    'decay': decay_name,
+                    'shape': list(shape),
+                    'regime': regime,
+                    'method': method,
+                    'seconds': seconds,
+                    'peak_bytes': peak_bytes,
+                }
+                results.append(result)
+                print('{:>14} {:>14} {:>14} {:>7} {:>8} {:>10.4f} {:>12.1f}'.format(
+                    model_name, decay_name, '{}x{}'.format(*shape), regime, method,
+                    seconds, peak_bytes / 2.0**20
+                ))
+    return results
+
+
+def get_metadata():
+    """Return a description of the environment in which the benchmarks were run."""
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'commit': commit,
+        'aceso': aceso.__version__,
+        'numpy': np.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Return the cases whose time or peak memory grew by more than the threshold factor."""
+    def key(result):
+        return (result['model'], result['decay'], tuple(result['shape']), result['regime'])
+
+    baseline_results = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        previous = baseline_results.get(key(result))
+        if previous is None:
+            continue
+        for measure in ('seconds', 'peak_bytes'):
+            if result[measure] > threshold * previous[measure]:
+                regressions.append((key(result), measure, previous[measure], result[measure]))
+    return regressions
+
+
+def parse_shapes(text):
+    """Parse a comma-separated list of shapes such as '1000x100,10000x1000', or 'all'."""
+    if text == 'all':
+        return SHAPES
+    return [tuple(int(size) for size in shape.split('x')) for shape in text.split(',')]
+
+
+def main(argv=None):
+    """Run the benchmarks, save the results, and compare them with a baseline if given."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--shapes', type=parse_shapes, default=DEFAULT_SHAPES,
+        help='Comma-separated shapes such as 1000x100, or "all" (up to 100000x10000).'
+    )
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed repeats.')
+    parser.add_argument('--output', help='Path of a JSON file to which results are saved.')
+    parser.add_argument('--compare', help='Path of a JSON file of earlier results.')
+    parser.add_argument(
+        '--threshold', type=float, default=1.25,
+        help='Factor by which a measure must grow to count as a regression.'
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.shapes, n_repeats=args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': get_metadata(), 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for case, measure, previous, current in regressions:
+            print('REGRESSION {}: {} {:.4g} -> {:.4g}'.format(case, measure, previous, current))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
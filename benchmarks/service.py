@@ -0,0 +1,96 @@
+"""Benchmark the latency of queries to ``AccessibilityService`` under concurrent load.
+
+Each client sends queries one after another, each changing the supply at one random location. The
+latency of every query is recorded, and its percentiles are printed for each number of clients,
+both with batching and with every query calculated on its own (a maximum batch size of one).
+
+Usage:
+    python benchmarks/service.py [--shape 10000x1000] [--clients 1,16,64] [--queries 20]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import sys
+import timeit
+
+import numpy as np
+
+import aceso
+from aceso import service
+
+PERCENTILES = (50, 90, 99)
+
+
+async def run_clients(accessibility_service, n_clients, n_queries, n_cols):
+    """Run the given number of clients concurrently and return the latency of each query."""
+    latencies = []
+
+    async def client(random_state):
+        for _ in range(n_queries):
+            supply_changes = {int(random_state.randint(n_cols)): float(random_state.uniform(10.0))}
+            started = timeit.default_timer()
+            await accessibility_service.calculate_accessibility_scores(
+                supply_changes=supply_changes
+            )
+            latencies.append(timeit.default_timer() - started)
+
+    await asyncio.gather(*[client(np.random.RandomState(k)) for k in range(n_clients)])
+    return latencies
+
+
+def run(shape, client_counts, n_queries):
+    """Measure query latencies for each number of clients, with and without batching."""
+    n_rows, n_cols = shape
+    random_state = np.random.RandomState(0)
+    distance_matrix = random_state.uniform(0.0, 100.0, size=shape)
+    model = aceso.GravityModel('gaussian', {'sigma': 20.0})
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    print('{:>8} {:>8} {:>8} {:>10} {}'.format(
+        'clients', 'batch', 'batches', 'queries/s',
+        ' '.join('{:>9}'.format('p{} (ms)'.format(p)) for p in PERCENTILES)
+    ))
+    for n_clients in client_counts:
+        for max_batch_size in (1, service.MAX_BATCH_SIZE):
+            accessibility_service = service.AccessibilityService(
+                model, distance_matrix, executor=executor, max_batch_size=max_batch_size
+            )
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(accessibility_service.start())
+                started = timeit.default_timer()
+                latencies = loop.run_until_complete(
+                    run_clients(accessibility_service, n_clients, n_queries, n_cols)
+                )
+                seconds = timeit.default_timer() - started
+            finally:
+                loop.close()
+            print('{:>8} {:>8} {:>8} {:>10.0f} {}'.format(
+                n_clients, max_batch_size, accessibility_service.n_batches,
+                len(latencies) / seconds,
+                ' '.join(
+                    '{:>9.2f}'.format(1000.0 * np.percentile(latencies, p)) for p in PERCENTILES
+                )
+            ))
+    executor.shutdown()
+
+
+def main(argv=None):
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--shape', type=lambda text: tuple(int(size) for size in text.split('x')),
+        default=(10000, 1000), help='The shape of the distance matrix, such as 10000x1000.'
+    )
+    parser.add_argument(
+        '--clients', type=lambda text: [int(count) for count in text.split(',')],
+        default=[1, 16, 64], help='Comma-separated numbers of concurrent clients.'
+    )
+    parser.add_argument('--queries', type=int, default=20, help='Number of queries per client.')
+    args = parser.parse_args(argv)
+    run(args.shape, args.clients, args.queries)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -48,5 +48,8 @@ setuptools.setup(
     install_requires=[
         'numpy>=1.11.0',
     ],
+    entry_points={
+        'console_scripts': ['aceso = aceso.cli:main'],
+    },
     python_requires='>=2.7'
 )
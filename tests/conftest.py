@@ -0,0 +1,7 @@
+"""Configure the collection of tests."""
+import sys
+
+collect_ignore = []
+# The service module uses syntax that requires Python 3.5 or later.
+if sys.version_info < (3, 5):
+    collect_ignore.append('test_service.py')
@@ -0,0 +1,69 @@
+"""Test methods contained in the ``bound.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestBoundGravityModel():
+    """Test gravity models bound to a fixed distance matrix."""
+
+    def setup(self):
+        """Initialize a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(60, 8))
+        self.distance_matrix[0, 0] = np.nan
+        self.demand_array = random_state.uniform(0.0, 100.0, size=60)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=8)
+
+    @pytest.mark.parametrize('keep_nonzero', [False, True])
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=8.0),
+        aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0}),
+        aceso.GravityModel(
+            decay_function='raised_cosine', decay_params={'scale': 12.0}, suboptimality_exponent=2.0
+        ),
+    ])
+    def test_calculate_accessibility_scores(self, model, keep_nonzero):
+        """Test that a bound model gives the same scores as the unbound model."""
+        bound_model = model.bind(self.distance_matrix, keep_nonzero=keep_nonzero)
+        for supply_array in [self.supply_array, self.supply_array[::-1]]:
+            expected = model.calculate_accessibility_scores(
+                self.distance_matrix, self.demand_array, supply_array
+            )
+            output = bound_model.calculate_accessibility_scores(self.demand_array, supply_array)
+            np.testing.assert_allclose(output, expected)
+
+    def test_scenarios(self):
+        """Test that a bound model accepts stacks of supply arrays."""
+        model = aceso.TwoStepFCA(radius=8.0)
+        bound_model = model.bind(aceso.SparseDistanceMatrix.from_dense(self.distance_matrix, 8.0))
+        supply_arrays = np.array([self.supply_array, 2.0 * self.supply_array])
+        output = bound_model.calculate_accessibility_scores(self.demand_array, supply_arrays)
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, 2.0 * self.supply_array
+        )
+        assert output.shape == (2, 60)
+        np.testing.assert_allclose(output[1], expected)
+
+    def test_keep_nonzero_memory(self):
+        """Test that keeping only nonzero weights reduces the memory used."""
+        model = aceso.TwoStepFCA(radius=2.0)
+        dense = model.bind(self.distance_matrix)
+        compressed = model.bind(self.distance_matrix, keep_nonzero=True)
+        dense.calculate_accessibility_scores()
+        compressed.calculate_accessibility_scores()
+        assert 0 < compressed.nbytes < dense.nbytes
+
+    def test_invalidate_and_release(self):
+        """Test that invalidated weights are evaluated again and released ones are not."""
+        bound_model = aceso.TwoStepFCA(radius=8.0).bind(self.distance_matrix)
+        expected = bound_model.calculate_accessibility_scores()
+        bound_model.invalidate()
+        assert bound_model.nbytes == 0
+        np.testing.assert_array_equal(bound_model.calculate_accessibility_scores(), expected)
+        bound_model.release()
+        with pytest.raises(ValueError):
+            bound_model.calculate_accessibility_scores()
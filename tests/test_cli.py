@@ -0,0 +1,154 @@
+"""Test methods contained in the ``cli.py`` submodule."""
+import csv
+import json
+
+import numpy as np
+
+import pytest
+
+from context import aceso
+from aceso import cli
+
+
+def _write_csv(path, header, rows):
+    """Write rows to a CSV file with a header row."""
+    with open(path, 'w') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _read_scores(path):
+    """Read the scores written by the command into a mapping from demand id to score."""
+    with open(path) as f:
+        return {row['id']: float(row['score']) for row in csv.DictReader(f)}
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestCommandLine():
+    """Test the ``aceso`` command against in-memory calculations."""
+
+    def setup(self):
+        """Initialize a random distance matrix with some pairs missing."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(12, 4))
+        self.distance_matrix[random_state.uniform(size=(12, 4)) < 0.3] = np.inf
+        self.demand_array = random_state.uniform(0.0, 100.0, size=12)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=4)
+        self.demand_ids = ['tract-{}'.format(i) for i in range(12)]
+        self.supply_ids = ['site-{}'.format(j) for j in range(4)]
+
+    def _write_inputs(self, tmpdir):
+        """Write the distance matrix as a shuffled origin-destination table and the locations."""
+        rows, cols = np.nonzero(np.isfinite(self.distance_matrix))
+        order = np.random.RandomState(1).permutation(len(rows))
+        paths = {
+            'od': str(tmpdir.join('od.csv')),
+            'demand': str(tmpdir.join('demand.csv')),
+            'supply': str(tmpdir.join('supply.csv')),
+            'output': str(tmpdir.join('scores.csv')),
+        }
+        _write_csv(paths['od'], ['origin', 'destination', 'distance'], [
+            (self.demand_ids[rows[k]], self.supply_ids[cols[k]],
+             repr(float(self.distance_matrix[rows[k], cols[k]])))
+            for k in order
+        ])
+        _write_csv(paths['demand'], ['id', 'demand'], [
+            (demand_id, repr(float(value)))
+            for demand_id, value in zip(self.demand_ids, self.demand_array)
+        ])
+        _write_csv(paths['supply'], ['id', 'supply'], [
+            (supply_id, repr(float(value)))
+            for supply_id, value in zip(self.supply_ids, self.supply_array)
+        ])
+        return paths
+
+    def test_flags(self, tmpdir):
+        """Test that scores match those of the model given by flags, with a small chunk size."""
+        paths = self._write_inputs(tmpdir)
+        cli.main([
+            paths['od'], '-o', paths['output'], '-q', '--chunk-size', '5',
+            '--demand', paths['demand'], '--supply', paths['supply'],
+            '--model', '3sfca', '--decay-function', 'gaussian', '--decay-param', 'sigma=5',
+        ])
+        model = aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0})
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        scores = _read_scores(paths['output'])
+        np.testing.assert_allclose([scores[i] for i in self.demand_ids], expected, atol=1e-12)
+
+    def test_config(self, tmpdir):
+        """Test that flags override the configuration file and ids are collected from the table."""
+        paths = self._write_inputs(tmpdir)
+        config_path = str(tmpdir.join('config.json'))
+        with open(config_path, 'w') as f:
+            json.dump({
+                'decay_function': 'raised_cosine',
+                'decay_params': {'scale': 50.0},
+                'suboptimality_exponent': 2.0,
+            }, f)
+        cli.main([
+            paths['od'], '-o', paths['output'], '-q', '--config', config_path,
+            '--decay-param', 'scale=12',
+        ])
+        model = aceso.GravityModel(
+            decay_function='raised_cosine', decay_params={'scale': 12.0}, suboptimality_exponent=2.0
+        )
+        expected = model.calculate_accessibility_scores(self.distance_matrix)
+        scores = _read_scores(paths['output'])
+        assert len(scores) == np.sum(np.any(np.isfinite(self.distance_matrix), axis=1))
+        for i, demand_id in enumerate(self.demand_ids):
+            if demand_id in scores:
+                assert scores[demand_id] == pytest.approx(expected[i], abs=1e-12)
+
+    def test_config_keys(self):
+        """Test that the configuration keys are the long names of all flags."""
+        args = cli.parse_args(['od.csv', '--model', '2sfca', '--radius', '5'])
+        assert set(cli.CONFIG_KEYS) == set(vars(args)) - {'od_path', 'config'}
+
+    @pytest.mark.parametrize('use_pandas', [False, True])
+    def test_id_index(self, monkeypatch, use_pandas):
+        """Test that ids are indexed in order of first appearance, with or without pandas."""
+        if not use_pandas:
+            monkeypatch.setattr(cli, 'pd', None)
+        elif cli.pd is None:
+            pytest.skip('pandas is not installed')
+        index = cli._IdIndex()
+        np.testing.assert_array_equal(index.get_indices(['a']), [-1])
+        index.add(np.array(['c', 'a', 'c'], dtype=object))
+        index.add(np.array([7, 3]))
+        np.testing.assert_array_equal(index.ids, ['c', 'a', '7', '3'])
+        np.testing.assert_array_equal(
+            index.get_indices(np.array(['3', 'b', 'c', 'a'])), [3, -1, 0, 1]
+        )
+        np.testing.assert_array_equal(index.get_indices(np.array([7])), [2])
+
+    def test_missing_decay_function(self, tmpdir):
+        """Test that a model without a decay function is rejected."""
+        with pytest.raises(SystemExit):
+            cli.main([str(tmpdir.join('od.csv')), '--model', 'gravity'])
+
+    def test_missing_column(self, tmpdir):
+        """Test that a table without the distance column raises a ValueError."""
+        path = str(tmpdir.join('od.csv'))
+        _write_csv(path, ['origin', 'destination', 'minutes'], [('a', 'b', '1.0')])
+        with pytest.raises(ValueError):
+            cli.main([path, '-q', '--model', '2sfca', '--radius', '5'])
+
+    @pytest.mark.skipif(cli.pq is None, reason='pyarrow is not installed')
+    def test_parquet(self, tmpdir):
+        """Test that Parquet tables give the same scores as CSV tables."""
+        import pyarrow
+        paths = self._write_inputs(tmpdir)
+        parquet_path = str(tmpdir.join('od.parquet'))
+        columns = list(zip(*list(csv.reader(open(paths['od'])))[1:]))
+        cli.pq.write_table(pyarrow.table({
+            'origin': list(columns[0]),
+            'destination': list(columns[1]),
+            'distance': [float(value) for value in columns[2]],
+        }), parquet_path)
+        csv_output = str(tmpdir.join('csv_scores.csv'))
+        for path, output in [(paths['od'], csv_output), (parquet_path, paths['output'])]:
+            cli.main([path, '-o', output, '-q', '--model', '2sfca', '--radius', '8'])
+        assert _read_scores(csv_output) == _read_scores(paths['output'])
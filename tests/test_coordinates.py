@@ -0,0 +1,124 @@
+"""Test methods contained in the ``coordinates.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+from aceso import coordinates
+
+
+class TestDistanceMatrix():
+    """Test the calculation of distance matrices from coordinates."""
+
+    def setup(self):
+        """Initialize random coordinates to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.demand_points = random_state.uniform(0.0, 100.0, size=(200, 2))
+        self.supply_points = random_state.uniform(0.0, 100.0, size=(50, 2))
+        self.demand_locations = np.column_stack([
+            random_state.uniform(40.0, 42.0, size=200), random_state.uniform(-75.0, -73.0, size=200)
+        ])
+        self.supply_locations = np.column_stack([
+            random_state.uniform(40.0, 42.0, size=50), random_state.uniform(-75.0, -73.0, size=50)
+        ])
+
+    def test_euclidean_distance(self):
+        """Test that the dense Euclidean distance matrix matches a direct calculation."""
+        distance_matrix = coordinates.calculate_distance_matrix(
+            self.demand_points, self.supply_points, block_size=100
+        )
+        expected = np.sqrt(
+            ((self.demand_points[:, np.newaxis, :] - self.supply_points) ** 2).sum(axis=2)
+        )
+        np.testing.assert_allclose(distance_matrix, expected)
+
+    def test_haversine_distance(self):
+        """Test the great-circle distance between two known locations."""
+        distance = coordinates.haversine_distance(
+            np.array([51.5007, 0.1246]), np.array([40.6892, 74.0445])
+        )
+        assert abs(distance - 5574.8) < 1.0
+
+    @pytest.mark.parametrize('metric, max_distance', [('euclidean', 15.0), ('haversine', 40.0)])
+    def test_grid_matches_dense(self, metric, max_distance):
+        """Test that the grid index finds exactly the pairs within the maximum distance."""
+        if metric == 'euclidean':
+            demand, supply = self.demand_points, self.supply_points
+        else:
+            demand, supply = self.demand_locations, self.supply_locations
+        dense_matrix = coordinates.calculate_distance_matrix(demand, supply, metric=metric)
+        sparse_matrix = coordinates.calculate_distance_matrix(
+            demand, supply, metric=metric, max_distance=max_distance, block_size=500
+        )
+        expected = np.where(dense_matrix <= max_distance, dense_matrix, np.inf)
+        assert 0 < sparse_matrix.nnz < dense_matrix.size
+        np.testing.assert_allclose(sparse_matrix.toarray(), expected)
+
+    def test_no_supply(self):
+        """Test that an empty set of supply locations yields an empty sparse matrix."""
+        sparse_matrix = coordinates.calculate_distance_matrix(
+            self.demand_points, np.zeros((0, 2)), max_distance=10.0
+        )
+        assert sparse_matrix.shape == (200, 0)
+        assert sparse_matrix.nnz == 0
+
+    def test_unknown_metric(self):
+        """Test that an unknown metric raises a ValueError."""
+        with pytest.raises(ValueError):
+            coordinates.calculate_distance_matrix(
+                self.demand_points, self.supply_points, metric='manhattan'
+            )
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestScoresFromCoordinates():
+    """Test the calculation of access scores directly from coordinates."""
+
+    def setup(self):
+        """Initialize random coordinates to use in the tests."""
+        random_state = np.random.RandomState(1)
+        self.demand_points = random_state.uniform(0.0, 100.0, size=(300, 2))
+        self.supply_points = random_state.uniform(0.0, 100.0, size=(40, 2))
+        self.demand_array = random_state.uniform(1.0, 10.0, size=300)
+        self.supply_array = random_state.uniform(1.0, 10.0, size=40)
+        self.distance_matrix = coordinates.calculate_distance_matrix(
+            self.demand_points, self.supply_points
+        )
+
+    @pytest.mark.parametrize('decay_function, decay_params', [
+        ('uniform', {'scale': 20.0}),
+        ('parabolic', {'scale': 20.0}),
+        ('raised_cosine', {'scale': 20.0}),
+        ('gaussian', {'sigma': 5.0}),
+        (lambda distance_array: 1.0 / (1.0 + distance_array), {}),
+    ])
+    def test_matches_dense(self, decay_function, decay_params):
+        """Test that scores from coordinates match scores from the dense distance matrix."""
+        model = aceso.GravityModel(decay_function=decay_function, decay_params=decay_params)
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        actual = model.calculate_accessibility_scores_from_coordinates(
+            self.demand_points, self.supply_points, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(actual, expected, rtol=1e-10, atol=1e-10)
+
+    def test_max_distance(self):
+        """Test that an explicit maximum distance overrides the support of the decay function."""
+        model = aceso.GravityModel(decay_function='gaussian', decay_params={'sigma': 5.0})
+        expected = model.calculate_accessibility_scores(
+            np.where(self.distance_matrix <= 10.0, self.distance_matrix, np.inf)
+        )
+        actual = model.calculate_accessibility_scores_from_coordinates(
+            self.demand_points, self.supply_points, max_distance=10.0
+        )
+        np.testing.assert_allclose(actual, expected, rtol=1e-10)
+
+    def test_huff_normalization(self):
+        """Test that pairs beyond the decay support still count towards Huff normalization."""
+        model = aceso.ThreeStepFCA(decay_function='raised_cosine', decay_params={'scale': 20.0})
+        expected = model.calculate_accessibility_scores(self.distance_matrix)
+        actual = model.calculate_accessibility_scores_from_coordinates(
+            self.demand_points, self.supply_points
+        )
+        np.testing.assert_allclose(actual, expected, rtol=1e-10)
@@ -34,3 +34,142 @@ class TestDecayFunctions():
         # FIXME: Leave np.nan unchanged.
         expected = np.array([[1.0, 1.0, 0.0, 0.0, 0.0]])
         np.testing.assert_equal(output, expected)
+
+    def test_power_decay(self):
+        output = aceso.decay.power_decay(self.distance_array, beta=2.0)
+        expected = np.array([[np.inf, 1.0, 1e-4, np.nan, 0.0]])
+        np.testing.assert_equal(output, expected)
+
+    @pytest.mark.parametrize('decay_function', [
+        aceso.decay.parabolic_decay,
+        aceso.decay.raised_cosine_decay,
+        aceso.decay.uniform_decay,
+    ])
+    def test_float32(self, decay_function):
+        """Test that decay functions evaluate in the requested dtype."""
+        output = decay_function(self.distance_array, scale=2.0, dtype=np.float32)
+        expected = decay_function(self.distance_array, scale=2.0)
+        assert output.dtype == np.float32
+        np.testing.assert_allclose(output, expected, rtol=1e-6)
+
+    def test_gaussian_float32(self):
+        """Test that the Gaussian decay function evaluates in the requested dtype."""
+        output = aceso.decay.gaussian_decay(self.distance_array, sigma=2.0, dtype=np.float32)
+        expected = aceso.decay.gaussian_decay(self.distance_array, sigma=2.0)
+        assert output.dtype == np.float32
+        np.testing.assert_allclose(output, expected, rtol=1e-6)
+
+
+class TestDecayProperties():
+    """Test the properties of the built-in decay functions."""
+
+    @pytest.mark.parametrize('name, decay_params', [
+        ('parabolic', {'scale': 2.0}),
+        ('raised_cosine', {'scale': 2.0}),
+        ('gaussian', {'sigma': 2.0}),
+        ('power', {'beta': 1.5}),
+    ])
+    def test_derivative(self, name, decay_params):
+        """Test each derivative against a central finite difference."""
+        decay_function = aceso.decay.get_decay_function(name)
+        derivative = aceso.decay.DECAY_FUNCTION_PROPERTIES[decay_function].derivative
+        distance_array = np.linspace(0.05, 2.95, 30)
+        step = 1e-6
+        expected = (
+            decay_function(distance_array + step, **decay_params) -
+            decay_function(distance_array - step, **decay_params)
+        ) / (2.0 * step)
+        np.testing.assert_allclose(
+            derivative(distance_array, **decay_params), expected, atol=1e-6
+        )
+
+    @pytest.mark.parametrize('name', ['uniform', 'parabolic', 'raised_cosine'])
+    def test_compact_support(self, name):
+        """Test that compact decay functions are zero beyond their support radius."""
+        support_radius = aceso.decay.get_support_radius(name, {'scale': 2.0})
+        assert support_radius == 2.0
+        decay_function = aceso.decay.get_decay_function(name)
+        distance_array = np.linspace(support_radius, 10.0, 50)[1:]
+        assert not np.any(decay_function(distance_array, scale=2.0))
+
+    def test_gaussian_support(self):
+        """Test that the Gaussian decay only has a support radius given a tolerance."""
+        assert aceso.decay.get_support_radius('gaussian', {'sigma': 2.0}) is None
+        support_radius = aceso.decay.get_support_radius('gaussian', {'sigma': 2.0}, 1e-12)
+        assert 7.4 < support_radius / 2.0 < 7.5
+        np.testing.assert_allclose(
+            aceso.decay.gaussian_decay(support_radius, sigma=2.0), 1e-12
+        )
+
+    def test_custom_function(self):
+        """Test that functions without properties have no support radius."""
+        assert aceso.decay.get_support_radius(np.exp, {}) is None
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestLookupTableDecayFunction():
+    """Test the approximation of decay functions by lookup tables."""
+
+    def setup(self):
+        """Initialize an array of distances for use in the test cases."""
+        random_state = np.random.RandomState(0)
+        self.distance_array = random_state.uniform(0.0, 5.0, size=(20, 30))
+        self.distance_array[0, :3] = [np.nan, np.inf, -1.0]
+
+    @pytest.mark.parametrize('name, decay_params', [
+        ('parabolic', {'scale': 2.0}),
+        ('raised_cosine', {'scale': 2.0}),
+        ('gaussian', {'sigma': 1.0}),
+    ])
+    def test_tolerance(self, name, decay_params):
+        """Test that the interpolated weights are within the tolerance of the exact weights."""
+        decay_function = aceso.GravityModel(name, decay_params).decay_function
+        lookup_table = aceso.decay.LookupTableDecayFunction(
+            decay_function, max_distance=2.0, tolerance=1e-6
+        )
+        np.testing.assert_allclose(
+            lookup_table(self.distance_array), decay_function(self.distance_array), atol=1e-6
+        )
+
+    def test_growing_table(self):
+        """Test that a table without a maximum distance grows to cover all finite distances."""
+        lookup_table = aceso.decay.LookupTableDecayFunction(np.cos, tolerance=1e-6)
+        np.testing.assert_allclose(lookup_table(np.array([0.5, 1.0])), np.cos([0.5, 1.0]))
+        np.testing.assert_allclose(
+            lookup_table(self.distance_array), np.cos(self.distance_array), atol=1e-6
+        )
+        assert lookup_table._table[0] * (lookup_table._table[1].shape[0] - 1) == 8.0
+
+    def test_outside_table(self):
+        """Test that distances outside the table are evaluated exactly."""
+        lookup_table = aceso.decay.LookupTableDecayFunction(
+            np.cos, max_distance=1.0, tolerance=1e-6
+        )
+        output = lookup_table(self.distance_array)
+        expected = np.cos(self.distance_array)
+        outside = ~(self.distance_array <= 1.0) | (self.distance_array < 0.0)
+        np.testing.assert_array_equal(output[outside], expected[outside])
+
+    def test_table_size_limit(self, monkeypatch):
+        """Test that distances beyond the largest table allowed are evaluated exactly."""
+        monkeypatch.setattr(aceso.decay, 'MAX_LOOKUP_TABLE_SIZE', 2**10)
+        decay_function = aceso.GravityModel('gaussian', {'sigma': 1.0}).decay_function
+        lookup_table = aceso.decay.LookupTableDecayFunction(decay_function, tolerance=1e-6)
+        lookup_table(np.array([0.5, 2.0]))
+        table = lookup_table._table
+        distance_array = np.array([0.25, 1.5, 3.0, 100.0, 5000.0])
+        np.testing.assert_allclose(
+            lookup_table(distance_array), decay_function(distance_array), atol=1e-6
+        )
+        assert lookup_table._table is table
+        assert lookup_table._max_table_distance == 8192.0
+        np.testing.assert_array_equal(
+            lookup_table(distance_array[3:]), decay_function(distance_array[3:])
+        )
+
+    def test_unreachable_tolerance(self):
+        """Test that a discontinuous decay function cannot be tabulated."""
+        with pytest.raises(ValueError):
+            aceso.decay.LookupTableDecayFunction(
+                lambda x: (x <= 0.3).astype(float), max_distance=1.0, tolerance=1e-6
+            )
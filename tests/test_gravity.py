@@ -102,3 +102,749 @@ class TestGravityModel():
         output = model.calculate_accessibility_scores(distance_matrix=self.distance_matrix)
         expected = np.array([4.0 / 3, 2.0 / 3, 0.0])
         np.testing.assert_array_almost_equal(output, expected)
+
+    def test_calculate_accessibility_scores_row_blocks(self, monkeypatch):
+        """Test that splitting the matrix into row blocks leaves the scores unchanged."""
+        distance_matrix = np.random.RandomState(0).uniform(0.0, 20.0, size=(50, 7))
+        demand_array = np.random.RandomState(1).uniform(0.0, 100.0, size=50)
+        model = aceso.gravity.GravityModel(
+            decay_function='gaussian',
+            decay_params={'sigma': 5.0},
+            huff_normalization=True,
+            suboptimality_exponent=1.5,
+        )
+        expected = model.calculate_accessibility_scores(distance_matrix, demand_array)
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 20)
+        output = model.calculate_accessibility_scores(distance_matrix, demand_array)
+        np.testing.assert_array_equal(output, expected)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestChunkedGravityModel():
+    """Test calculations that stream the distance matrix in blocks of rows."""
+
+    def setup(self):
+        """Initialize a model and a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(50, 7))
+        self.demand_array = random_state.uniform(0.0, 100.0, size=50)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=7)
+        self.model = aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0})
+        self.expected = self.model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+
+    def test_array(self):
+        """Test that an array read in blocks gives identical scores."""
+        output = self.model.calculate_accessibility_scores_chunked(
+            self.distance_matrix, self.demand_array, self.supply_array, block_size=30
+        )
+        np.testing.assert_array_equal(output, self.expected)
+
+    def test_memmap(self, tmpdir):
+        """Test that a memory-mapped .npy file read in blocks gives identical scores."""
+        path = str(tmpdir.join('distances.npy'))
+        np.save(path, self.distance_matrix)
+        output = self.model.calculate_accessibility_scores_chunked(
+            np.load(path, mmap_mode='r'), self.demand_array, self.supply_array, block_size=30
+        )
+        np.testing.assert_array_equal(output, self.expected)
+
+    def test_callable(self):
+        """Test that blocks yielded by a callable give identical scores."""
+        def iter_blocks():
+            for start in range(0, 50, 8):
+                yield self.distance_matrix[start:start + 8]
+
+        output = self.model.calculate_accessibility_scores_chunked(
+            iter_blocks, self.demand_array, self.supply_array
+        )
+        np.testing.assert_array_equal(output, self.expected)
+
+    def test_iterator(self):
+        """Test that a one-shot iterator raises a TypeError."""
+        with pytest.raises(TypeError):
+            self.model.calculate_accessibility_scores_chunked(
+                iter([self.distance_matrix]), self.demand_array, self.supply_array
+            )
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestRecordsGravityModel():
+    """Test calculations that stream blocks of (demand, supply, distance) records."""
+
+    def setup(self):
+        """Initialize a random distance matrix and its records in shuffled blocks."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(50, 7))
+        self.distance_matrix[1, :] = np.inf
+        self.distance_matrix[2, 3] = 0.0
+        self.demand_array = random_state.uniform(0.0, 100.0, size=50)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=7)
+        rows, cols = np.nonzero(np.isfinite(self.distance_matrix))
+        order = random_state.permutation(len(rows))
+        self.blocks = [
+            (rows[entries], cols[entries], self.distance_matrix[rows[entries], cols[entries]])
+            for entries in np.array_split(order, 6)
+        ]
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=8.0),
+        aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0}),
+        aceso.GravityModel(
+            decay_function='raised_cosine',
+            decay_params={'scale': 12.0},
+            huff_normalization=True,
+            suboptimality_exponent=2.0,
+        ),
+    ])
+    def test_blocks(self, model):
+        """Test that shuffled blocks of records give the same scores as the full matrix."""
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        output = model.calculate_accessibility_scores_from_records(
+            self.blocks, self.distance_matrix.shape, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(output, expected, atol=1e-12)
+
+    def test_callable(self):
+        """Test that sparse blocks yielded by a callable give the same scores."""
+        model = aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0})
+        shape = self.distance_matrix.shape
+
+        def iter_blocks():
+            for rows, cols, distances in self.blocks:
+                yield aceso.SparseDistanceMatrix(rows, cols, distances, shape)
+
+        np.testing.assert_allclose(
+            model.calculate_accessibility_scores_from_records(iter_blocks, shape),
+            model.calculate_accessibility_scores(self.distance_matrix),
+            atol=1e-12,
+        )
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestFloat32GravityModel():
+    """Test calculations carried out in single precision."""
+
+    def setup(self):
+        """Initialize a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 60.0, size=(500, 40))
+        self.demand_array = random_state.uniform(0.0, 1000.0, size=500)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=40)
+
+    @pytest.mark.parametrize('decay_function,decay_params,huff_normalization', [
+        ('uniform', {'scale': 20.0}, False),
+        ('raised_cosine', {'scale': 30.0}, False),
+        ('gaussian', {'sigma': 10.0}, True),
+        (lambda distance_array: 1.0 / (1.0 + distance_array), {}, False),
+    ])
+    def test_error_bound(self, decay_function, decay_params, huff_normalization):
+        """Test that single-precision scores are within a small relative error of the default."""
+        kwargs = {
+            'decay_function': decay_function,
+            'decay_params': decay_params,
+            'huff_normalization': huff_normalization,
+        }
+        expected = aceso.GravityModel(**kwargs).calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        output = aceso.GravityModel(dtype=np.float32, **kwargs).calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        assert output.dtype == np.float32
+        np.testing.assert_allclose(output, expected, rtol=1e-4, atol=1e-9)
+
+    def test_sparse(self):
+        """Test that single-precision scores from sparse input have the requested dtype."""
+        sparse_matrix = aceso.SparseDistanceMatrix.from_dense(self.distance_matrix, 20.0)
+        model = aceso.ThreeStepFCA('raised_cosine', {'scale': 20.0}, dtype=np.float32)
+        output = model.calculate_accessibility_scores(
+            sparse_matrix, self.demand_array, self.supply_array
+        )
+        expected = aceso.ThreeStepFCA(
+            'raised_cosine', {'scale': 20.0}
+        ).calculate_accessibility_scores(sparse_matrix, self.demand_array, self.supply_array)
+        assert output.dtype == np.float32
+        np.testing.assert_allclose(output, expected, rtol=1e-4, atol=1e-9)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestParallelGravityModel():
+    """Test calculations divided among a pool of threads."""
+
+    def setup(self):
+        """Initialize a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(200, 9))
+        self.demand_array = random_state.uniform(0.0, 100.0, size=200)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=9)
+
+    def _calculate(self, n_jobs):
+        model = aceso.GravityModel(
+            decay_function='raised_cosine',
+            decay_params={'scale': 10.0},
+            huff_normalization=True,
+            n_jobs=n_jobs,
+        )
+        return model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+
+    def test_reproducible(self, monkeypatch):
+        """Test that the scores do not depend on the number of threads."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 100)
+        expected = self._calculate(n_jobs=1)
+        for n_jobs in [2, 3, -1]:
+            np.testing.assert_array_equal(self._calculate(n_jobs=n_jobs), expected)
+
+    def test_matches_serial(self, monkeypatch):
+        """Test that the scores match those calculated without threads."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 100)
+        np.testing.assert_allclose(self._calculate(n_jobs=4), self._calculate(n_jobs=None))
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestParameterSweep():
+    """Test calculations over many values of a decay parameter at once."""
+
+    def setup(self):
+        """Initialize a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(60, 8))
+        self.demand_array = random_state.uniform(0.0, 100.0, size=60)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=8)
+
+    @pytest.mark.parametrize('cache_size', [0, aceso.gravity.PARAM_WEIGHTS_CACHE_SIZE])
+    @pytest.mark.parametrize('decay_function,param_name,huff_normalization', [
+        ('gaussian', 'sigma', False),
+        ('parabolic', 'scale', True),
+        ('raised_cosine', 'scale', True),
+        ('uniform', 'scale', False),
+    ])
+    def test_matches_individual_models(
+        self, monkeypatch, decay_function, param_name, huff_normalization, cache_size
+    ):
+        """Test that each row of the output matches the scores of an individual model."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 100)
+        monkeypatch.setattr(aceso.gravity, 'PARAM_WEIGHTS_CACHE_SIZE', cache_size)
+        param_values = [2.0, 5.0, 10.0]
+        model = aceso.GravityModel(
+            decay_function=decay_function,
+            decay_params={param_name: 1.0},
+            huff_normalization=huff_normalization,
+        )
+        output = model.calculate_accessibility_scores_for_params(
+            self.distance_matrix, param_name, param_values, self.demand_array, self.supply_array
+        )
+        assert output.shape == (3, 60)
+        for row, param_value in zip(output, param_values):
+            expected = aceso.GravityModel(
+                decay_function=decay_function,
+                decay_params={param_name: param_value},
+                huff_normalization=huff_normalization,
+            ).calculate_accessibility_scores(
+                self.distance_matrix, self.demand_array, self.supply_array
+            )
+            np.testing.assert_allclose(row, expected)
+
+    @pytest.mark.parametrize('cache_size, expected_calls', [
+        (0, 2), (aceso.gravity.PARAM_WEIGHTS_CACHE_SIZE, 1)
+    ])
+    def test_weights_cached_between_passes(self, monkeypatch, cache_size, expected_calls):
+        """Test that each block is evaluated in one pass only if the weights fit in the cache."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 100)
+        monkeypatch.setattr(aceso.gravity, 'PARAM_WEIGHTS_CACHE_SIZE', cache_size)
+        model = aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 1.0})
+        calls = []
+        calculate_interaction_probabilities = model._calculate_interaction_probabilities
+        monkeypatch.setattr(
+            model, '_calculate_interaction_probabilities',
+            lambda block: calls.append(block.shape) or calculate_interaction_probabilities(block)
+        )
+        model.calculate_accessibility_scores_for_params(
+            self.distance_matrix, 'sigma', [2.0, 5.0], self.demand_array, self.supply_array
+        )
+        n_blocks = len(list(aceso.gravity._iter_row_blocks((60, 8), 50)))
+        assert len(calls) == expected_calls * n_blocks
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestScenarios():
+    """Test calculations over many demand and supply scenarios at once."""
+
+    def setup(self):
+        """Initialize a random distance matrix and scenarios to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(60, 8))
+        self.distance_matrix[0, 0] = np.nan
+        self.demand_arrays = random_state.uniform(0.0, 100.0, size=(4, 60))
+        self.supply_arrays = random_state.uniform(0.0, 10.0, size=(4, 8))
+        self.supply_arrays[1, 3] = 0.0
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=8.0),
+        aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0}),
+        aceso.GravityModel(
+            decay_function='raised_cosine', decay_params={'scale': 12.0}, suboptimality_exponent=2.0
+        ),
+    ])
+    def test_matches_individual_scenarios(self, monkeypatch, model):
+        """Test that each row of the output matches the scores of an individual scenario."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 100)
+        output = model.calculate_accessibility_scores_for_scenarios(
+            self.distance_matrix, self.demand_arrays, self.supply_arrays
+        )
+        assert output.shape == (4, 60)
+        for row, demand_array, supply_array in zip(output, self.demand_arrays, self.supply_arrays):
+            expected = model.calculate_accessibility_scores(
+                self.distance_matrix, demand_array, supply_array
+            )
+            np.testing.assert_allclose(row, expected)
+
+    def test_shared_demand(self):
+        """Test that a one-dimensional demand array is shared by all scenarios."""
+        model = aceso.TwoStepFCA(radius=8.0)
+        output = model.calculate_accessibility_scores_for_scenarios(
+            self.distance_matrix, self.demand_arrays[0], self.supply_arrays
+        )
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_arrays[0], self.supply_arrays[2]
+        )
+        np.testing.assert_allclose(output[2], expected)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestLayers():
+    """Test calculations over stacks of distance matrices, such as one per mode of travel."""
+
+    def setup(self):
+        """Initialize a random stack of distance matrices to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrices = random_state.uniform(0.0, 20.0, size=(3, 40, 6))
+        self.distance_matrices[1, 0, :] = np.nan
+        self.demand_array = random_state.uniform(0.0, 100.0, size=40)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=6)
+        self.mode_shares = random_state.dirichlet(np.ones(3), size=40).T
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=8.0),
+        aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0}),
+        aceso.GravityModel(
+            decay_function='raised_cosine',
+            decay_params={'scale': 12.0},
+            huff_normalization=True,
+            suboptimality_exponent=2.0,
+        ),
+    ])
+    def test_independent_layers(self, model):
+        """Test that layers without mode shares match separate calculations."""
+        layer_scores, blended_scores = model.calculate_accessibility_scores_for_layers(
+            self.distance_matrices, self.demand_array, self.supply_array
+        )
+        expected = np.array([
+            model.calculate_accessibility_scores(
+                distance_matrix, self.demand_array, self.supply_array
+            )
+            for distance_matrix in self.distance_matrices
+        ])
+        np.testing.assert_array_equal(layer_scores, expected)
+        np.testing.assert_allclose(blended_scores, expected.mean(axis=0))
+
+    @pytest.mark.parametrize('suboptimality_exponent', [1.0, 2.0])
+    def test_mode_shares(self, suboptimality_exponent):
+        """Test that demand split by mode shares competes for the same supply."""
+        model = aceso.GravityModel(
+            decay_function='raised_cosine',
+            decay_params={'scale': 12.0},
+            suboptimality_exponent=suboptimality_exponent,
+        )
+        layer_scores, blended_scores = model.calculate_accessibility_scores_for_layers(
+            self.distance_matrices, self.demand_array, self.supply_array, self.mode_shares
+        )
+        decay_weights = np.nan_to_num(aceso.decay.raised_cosine_decay(
+            self.distance_matrices, scale=12.0
+        ))
+        demand_potentials = np.einsum(
+            'li,lij->j', self.mode_shares * self.demand_array, decay_weights
+        )
+        expected = np.dot(
+            decay_weights**suboptimality_exponent, self.supply_array / demand_potentials
+        )
+        np.testing.assert_allclose(layer_scores, expected)
+        np.testing.assert_allclose(blended_scores, np.sum(self.mode_shares * expected, axis=0))
+
+    def test_two_dimensional(self):
+        """Test that a single distance matrix raises a ValueError."""
+        with pytest.raises(ValueError):
+            aceso.TwoStepFCA(radius=8.0).calculate_accessibility_scores_for_layers(
+                self.distance_matrices[0]
+            )
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestServices():
+    """Test calculations of access to several types of service at once."""
+
+    def setup(self):
+        """Initialize a random distance matrix whose columns offer one of three services."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(40, 9))
+        self.distance_matrix[0, 0] = np.nan
+        self.demand_array = random_state.uniform(0.0, 100.0, size=40)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=9)
+        self.supply_types = np.array(['pharmacy', 'clinic', 'dentist'] * 3)
+
+    def _calculate_expected(self, models):
+        """Calculate the scores of each service separately over its own columns."""
+        return np.column_stack([
+            model.calculate_accessibility_scores(
+                self.distance_matrix[:, self.supply_types == service],
+                self.demand_array,
+                self.supply_array[self.supply_types == service],
+            )
+            for service, model in zip(['clinic', 'dentist', 'pharmacy'], models)
+        ])
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=8.0),
+        aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0}),
+        aceso.GravityModel(
+            decay_function='raised_cosine', decay_params={'scale': 12.0}, suboptimality_exponent=2.0
+        ),
+    ])
+    def test_supply_types(self, model):
+        """Test that labeled supply locations match separate calculations for each service."""
+        output = model.calculate_accessibility_scores_for_services(
+            self.distance_matrix, self.demand_array, self.supply_array, self.supply_types
+        )
+        np.testing.assert_allclose(output, self._calculate_expected([model] * 3), atol=1e-12)
+
+    def test_supply_matrix(self):
+        """Test that a supply matrix with one service per location matches supply types."""
+        model = aceso.GravityModel(decay_function='raised_cosine', decay_params={'scale': 12.0})
+        supply_matrix = np.zeros((9, 3))
+        supply_matrix[np.arange(9), np.tile([2, 0, 1], 3)] = self.supply_array
+        np.testing.assert_allclose(
+            model.calculate_accessibility_scores_for_services(
+                self.distance_matrix, self.demand_array, supply_matrix
+            ),
+            self._calculate_expected([model] * 3),
+            atol=1e-12,
+        )
+
+    def test_service_models(self):
+        """Test that each service may use its own model."""
+        model = aceso.TwoStepFCA(radius=8.0)
+        pharmacy_model = aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 3.0})
+        output = model.calculate_accessibility_scores_for_services(
+            self.distance_matrix,
+            self.demand_array,
+            self.supply_array,
+            self.supply_types,
+            service_models={'pharmacy': pharmacy_model},
+        )
+        np.testing.assert_allclose(
+            output, self._calculate_expected([model, model, pharmacy_model]), atol=1e-12
+        )
+
+    def test_missing_supply_types(self):
+        """Test that a one-dimensional supply array without supply types raises a ValueError."""
+        with pytest.raises(ValueError):
+            aceso.TwoStepFCA(radius=8.0).calculate_accessibility_scores_for_services(
+                self.distance_matrix, self.demand_array, self.supply_array
+            )
+
+
+class TestDecayFunctionBinding():
+    """Test the reuse of bound decay functions across models."""
+
+    def test_shared_binding(self):
+        """Test that models with the same parameters share their bound decay function."""
+        model = aceso.GravityModel('gaussian', {'sigma': 5.0}, dtype=np.float32)
+        same_model = aceso.GravityModel('gaussian', {'sigma': 5.0}, dtype=np.float32)
+        other_model = aceso.GravityModel('gaussian', {'sigma': 5}, dtype=np.float32)
+        assert same_model.decay_function is model.decay_function
+        assert other_model.decay_function is not model.decay_function
+        assert other_model.decay_function.keywords['sigma'] == 5
+
+    def test_unhashable_params(self):
+        """Test that unhashable parameters are bound without caching."""
+        scales = np.array([5.0, 10.0])
+        decay_function = aceso.GravityModel._bind_decay_function_parameters(
+            'raised_cosine', {'scale': scales}
+        )
+        np.testing.assert_allclose(
+            decay_function(np.array([2.5])),
+            aceso.decay.raised_cosine_decay(np.array([2.5]), scale=scales),
+        )
+
+    def test_invalid_params(self):
+        """Test that invalid and missing parameters are reported on every construction."""
+        for _ in range(2):
+            with pytest.warns(UserWarning):
+                aceso.GravityModel('uniform', {'scale': 5.0, 'sigma': 1.0})
+            with pytest.raises(ValueError):
+                aceso.GravityModel('uniform', {})
+
+    def test_custom_functions_not_cached(self):
+        """Test that custom decay functions are not kept alive by the cache."""
+        size = len(aceso.gravity._BOUND_FUNCTION_CACHE)
+        table = np.ones(10)
+        first = aceso.GravityModel(lambda distance_array, scale: table[0] * scale, {'scale': 1.0})
+        assert len(aceso.gravity._BOUND_FUNCTION_CACHE) == size
+        assert first.decay_function.func not in aceso.gravity._PARAMETER_CACHE
+
+    def test_lru_cache(self):
+        """Test that the least recently used entry is evicted once the cache is full."""
+        cache = aceso.gravity._LRUCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestCompressedEvaluation():
+    """Test the evaluation of decay functions within their support radius alone."""
+
+    def setup(self):
+        """Initialize a random distance matrix in which few pairs are within reach."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 100.0, size=(80, 30))
+        self.distance_matrix[0, 0] = np.nan
+        self.distance_matrix[1, 1] = np.inf
+        self.demand_array = random_state.uniform(0.0, 100.0, size=80)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=30)
+
+    def test_support_radius(self):
+        """Test that the support radius is only known for registered decay functions."""
+        assert aceso.TwoStepFCA(radius=8.0).support_radius == 8.0
+        assert aceso.ThreeStepFCA('gaussian', {'sigma': 5.0}).support_radius is None
+        assert aceso.GravityModel(
+            'gaussian', {'sigma': 5.0}, decay_tolerance=1e-12
+        ).support_radius > 5.0 * 7.4
+        assert aceso.GravityModel(lambda x: np.exp(-x)).support_radius is None
+
+    def test_replaced_decay_function(self):
+        """Test that the support radius is forgotten if the decay function is replaced."""
+        model = aceso.GravityModel('raised_cosine', {'scale': 10.0})
+        model.decay_function = np.exp
+        assert model.support_radius is None
+
+    @pytest.mark.parametrize('decay_function', ['parabolic', 'raised_cosine'])
+    @pytest.mark.parametrize('huff_normalization', [False, True])
+    def test_matches_full_evaluation(self, monkeypatch, decay_function, huff_normalization):
+        """Test that compressed evaluation gives exactly the same scores as full evaluation."""
+        model = aceso.GravityModel(
+            decay_function=decay_function,
+            decay_params={'scale': 10.0},
+            huff_normalization=huff_normalization,
+            suboptimality_exponent=1.5,
+        )
+        output = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        monkeypatch.setattr(aceso.gravity, 'COMPRESSED_EVALUATION_THRESHOLD', -1.0)
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        np.testing.assert_array_equal(output, expected)
+
+    def test_decay_tolerance(self):
+        """Test that truncating the Gaussian decay has a negligible effect on the scores."""
+        expected = aceso.GravityModel('gaussian', {'sigma': 2.0}).calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        model = aceso.GravityModel('gaussian', {'sigma': 2.0}, decay_tolerance=1e-12)
+        output = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(output, expected, atol=1e-10)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestLookupTable():
+    """Test gravity models whose decay functions are evaluated through lookup tables."""
+
+    def setup(self):
+        """Initialize a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(60, 8))
+        self.distance_matrix[0, 0] = np.nan
+        self.demand_array = random_state.uniform(0.0, 100.0, size=60)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=8)
+
+    @pytest.mark.parametrize('decay_function, decay_params', [
+        ('raised_cosine', {'scale': 12.0}),
+        ('gaussian', {'sigma': 5.0}),
+        (lambda distance_array: 1.0 / (1.0 + distance_array**2), {}),
+    ])
+    def test_matches_exact_scores(self, decay_function, decay_params):
+        """Test that the scores are close to those of exact evaluation."""
+        expected = aceso.GravityModel(
+            decay_function, decay_params
+        ).calculate_accessibility_scores(self.distance_matrix, self.demand_array, self.supply_array)
+        model = aceso.GravityModel(decay_function, decay_params, lookup_tolerance=1e-8)
+        assert isinstance(model.decay_function, aceso.decay.LookupTableDecayFunction)
+        output = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(output, expected, rtol=1e-5)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestDistinctDistances():
+    """Test the evaluation of decay functions once per distinct distance."""
+
+    def setup(self):
+        """Initialize a random matrix of whole-minute travel times to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.integer_matrix = random_state.randint(0, 241, size=(60, 8)).astype(np.int16)
+        self.distance_matrix = self.integer_matrix.astype(float)
+        self.demand_array = random_state.uniform(0.0, 100.0, size=60)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=8)
+
+    @pytest.mark.parametrize('decay_function, decay_params', [
+        ('raised_cosine', {'scale': 120.0}),
+        ('gaussian', {'sigma': 60.0}),
+        (lambda distance_array: 1.0 / (1.0 + distance_array), {}),
+    ])
+    def test_integer_distances(self, decay_function, decay_params):
+        """Test that integer distance matrices give the same scores as float matrices."""
+        model = aceso.GravityModel(decay_function, decay_params, huff_normalization=True)
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        output = model.calculate_accessibility_scores(
+            self.integer_matrix, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(output, expected, rtol=1e-12)
+
+    def test_integer_indexing_decay_function(self):
+        """Test that custom decay functions receive integer distances as integers."""
+        table = 1.0 / (1.0 + np.arange(241.0))
+        model = aceso.GravityModel(lambda distance_array: table[distance_array])
+        expected = aceso.GravityModel(
+            lambda distance_array: 1.0 / (1.0 + distance_array)
+        ).calculate_accessibility_scores(self.distance_matrix, self.demand_array, self.supply_array)
+        output = model.calculate_accessibility_scores(
+            self.integer_matrix, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(output, expected, rtol=1e-12)
+
+    def test_distance_resolution(self, monkeypatch):
+        """Test that distances off the resolution grid are evaluated directly."""
+        self.distance_matrix /= 2.0
+        self.distance_matrix[0, :4] = [np.nan, np.inf, 12.25, 1000.3]
+        expected = aceso.GravityModel(
+            'raised_cosine', {'scale': 60.0}
+        ).calculate_accessibility_scores(self.distance_matrix, self.demand_array, self.supply_array)
+
+        model = aceso.GravityModel('raised_cosine', {'scale': 60.0}, distance_resolution=0.5)
+        calls = []
+        decay_function = model.decay_function
+        monkeypatch.setattr(
+            model, 'decay_function', lambda array: calls.append(array.size) or decay_function(array)
+        )
+        monkeypatch.setattr(model, '_support', (model.decay_function, 60.0))
+        output = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        np.testing.assert_allclose(output, expected, rtol=1e-12)
+        assert len(calls) == 2
+        assert calls[0] <= 241
+        assert calls[1] == 4
+
+
+class TestHuffNormalization():
+    """Test the calculation of Huff-like interaction probabilities."""
+
+    def setup(self):
+        """Initialize a distance matrix with zero distances to use in the tests."""
+        self.distance_matrix = np.array([
+            [0.0, 0.0, 5.0],
+            [1.0, 2.0, 4.0],
+            [np.nan, 2.0, 2.0],
+            [3.0, 0.0, np.inf],
+        ])
+        self.demand_array = np.array([1.0, 2.0, 3.0, 4.0])
+        self.supply_array = np.array([1.0, 2.0, 3.0])
+
+    def test_zero_distances(self):
+        """Test that zero distances split the interaction probability without warnings."""
+        model = aceso.ThreeStepFCA(decay_function='uniform', decay_params={'scale': 6.0})
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            output = model._calculate_interaction_probabilities(self.distance_matrix.copy())
+        expected = np.array([
+            [0.5, 0.5, 0.0],
+            [4.0 / 7, 2.0 / 7, 1.0 / 7],
+            [0.0, 0.5, 0.5],
+            [0.0, 1.0, 0.0],
+        ])
+        np.testing.assert_allclose(output, expected)
+
+    def test_attractiveness_function(self):
+        """Test that the interaction probabilities use the given attractiveness function."""
+        model = aceso.GravityModel(
+            decay_function='uniform',
+            decay_params={'scale': 6.0},
+            huff_normalization=True,
+            attractiveness_function='gaussian',
+            attractiveness_params={'sigma': 2.0},
+        )
+        output = model._calculate_interaction_probabilities(self.distance_matrix.copy())
+        weights = np.nan_to_num(aceso.decay.gaussian_decay(self.distance_matrix, sigma=2.0))
+        np.testing.assert_allclose(output, weights / weights.sum(axis=1)[:, np.newaxis])
+
+    def test_three_step_attractiveness_function(self):
+        """Test that ThreeStepFCA forwards the attractiveness function to the model."""
+        kwargs = {
+            'decay_function': 'uniform',
+            'decay_params': {'scale': 6.0},
+            'attractiveness_function': 'gaussian',
+            'attractiveness_params': {'sigma': 2.0},
+        }
+        output = aceso.ThreeStepFCA(**kwargs).calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        expected = aceso.GravityModel(
+            huff_normalization=True, **kwargs
+        ).calculate_accessibility_scores(self.distance_matrix, self.demand_array, self.supply_array)
+        np.testing.assert_array_equal(output, expected)
+        default = aceso.ThreeStepFCA(decay_function='uniform', decay_params={'scale': 6.0})
+        assert not np.allclose(output, default.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        ))
+
+    @pytest.mark.parametrize('suboptimality_exponent', [1.0, 2.0])
+    def test_sparse_matches_dense(self, suboptimality_exponent):
+        """Test that dense, sparse, and bound calculations agree in the presence of zeros."""
+        model = aceso.GravityModel(
+            decay_function='raised_cosine',
+            decay_params={'scale': 6.0},
+            huff_normalization=True,
+            suboptimality_exponent=suboptimality_exponent,
+        )
+        expected = model.calculate_accessibility_scores(
+            self.distance_matrix, self.demand_array, self.supply_array
+        )
+        sparse_matrix = aceso.SparseDistanceMatrix.from_dense(self.distance_matrix)
+        np.testing.assert_allclose(
+            model.calculate_accessibility_scores(
+                sparse_matrix, self.demand_array, self.supply_array
+            ),
+            expected,
+        )
+        np.testing.assert_allclose(
+            model.bind(self.distance_matrix).calculate_accessibility_scores(
+                self.demand_array, self.supply_array
+            ),
+            expected,
+        )
+        assert np.all(np.isfinite(expected))
@@ -0,0 +1,71 @@
+"""Test methods contained in the ``incremental.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestIncrementalGravityModel():
+    """Test incremental updates of access scores against full recalculations."""
+
+    def setup(self):
+        """Initialize a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(60, 8))
+        self.distance_matrix[0, 0] = np.nan
+        self.distance_matrix[1, 1] = 0.0
+        self.new_distances = random_state.uniform(0.0, 20.0, size=(60, 2))
+        self.demand_array = random_state.uniform(0.0, 100.0, size=60)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=8)
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=8.0),
+        aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0}),
+        aceso.GravityModel(
+            decay_function='raised_cosine', decay_params={'scale': 12.0}, suboptimality_exponent=2.0
+        ),
+    ])
+    def test_consistency(self, model):
+        """Test that a sequence of updates matches a full recalculation after each step."""
+        incremental = aceso.incremental.IncrementalGravityModel(
+            model, self.distance_matrix, self.demand_array, self.supply_array
+        )
+        distance_matrix = self.distance_matrix
+        supply_array = self.supply_array.copy()
+        active = np.ones(8, dtype=bool)
+
+        def check():
+            expected = model.calculate_accessibility_scores(
+                distance_matrix[:, active], self.demand_array, supply_array[active]
+            )
+            np.testing.assert_allclose(incremental.access_scores, expected, atol=1e-12)
+
+        check()
+        incremental.resize_supply(2, 7.5)
+        supply_array[2] = 7.5
+        check()
+        incremental.remove_supply(3)
+        active[3] = False
+        check()
+        for column in range(2):
+            index = incremental.add_supply(self.new_distances[:, column], supply=2.0)
+            assert index == 8 + column
+            distance_matrix = np.hstack([distance_matrix, self.new_distances[:, [column]]])
+            supply_array = np.append(supply_array, 2.0)
+            active = np.append(active, True)
+            check()
+        incremental.remove_supply(8)
+        active[8] = False
+        check()
+        np.testing.assert_allclose(incremental.recalculate(), incremental.access_scores)
+
+    def test_remove_missing(self):
+        """Test that removing a supply location twice raises an IndexError."""
+        incremental = aceso.incremental.IncrementalGravityModel(
+            aceso.TwoStepFCA(radius=8.0), self.distance_matrix
+        )
+        incremental.remove_supply(0)
+        with pytest.raises(IndexError):
+            incremental.remove_supply(0)
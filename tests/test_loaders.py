@@ -0,0 +1,58 @@
+"""Test methods contained in the ``loaders.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestLoaders():
+    """Test memory-mapped input and output of distance matrices and access scores."""
+
+    def setup(self):
+        """Initialize a distance matrix to use in the tests."""
+        self.distance_matrix = np.random.RandomState(0).uniform(0.0, 20.0, size=(40, 6))
+        self.distance_matrix = self.distance_matrix.astype(np.float32)
+
+    def test_load_npy(self, tmpdir):
+        """Test that .npy files are memory-mapped in their own dtype."""
+        path = str(tmpdir.join('distances.npy'))
+        np.save(path, self.distance_matrix)
+        output = aceso.loaders.load_distance_matrix(path)
+        assert isinstance(output, np.memmap)
+        assert output.dtype == np.float32
+        np.testing.assert_array_equal(output, self.distance_matrix)
+
+    def test_load_npy_wrong_dtype(self, tmpdir):
+        """Test that a dtype conflicting with the .npy header raises a ValueError."""
+        path = str(tmpdir.join('distances.npy'))
+        np.save(path, self.distance_matrix)
+        with pytest.raises(ValueError):
+            aceso.loaders.load_distance_matrix(path, dtype=np.float64)
+
+    def test_load_raw(self, tmpdir):
+        """Test that raw binary files are reshaped using the number of columns."""
+        path = str(tmpdir.join('distances.f32'))
+        self.distance_matrix.tofile(path)
+        output = aceso.loaders.load_distance_matrix(path, dtype=np.float32, shape=6)
+        np.testing.assert_array_equal(output, self.distance_matrix)
+
+    def test_load_raw_missing_dtype(self, tmpdir):
+        """Test that raw binary files without a dtype raise a ValueError."""
+        path = str(tmpdir.join('distances.f32'))
+        self.distance_matrix.tofile(path)
+        with pytest.raises(ValueError):
+            aceso.loaders.load_distance_matrix(path, shape=(40, 6))
+
+    def test_calculate_accessibility_scores_from_file(self, tmpdir):
+        """Test scoring a file on disk and writing the scores to a memory-mapped file."""
+        path = str(tmpdir.join('distances.f32'))
+        out_path = str(tmpdir.join('scores.npy'))
+        self.distance_matrix.tofile(path)
+        model = aceso.TwoStepFCA(radius=8.0)
+        expected = model.calculate_accessibility_scores(self.distance_matrix)
+        model.calculate_accessibility_scores_from_file(
+            path, dtype=np.float32, shape=(40, 6), block_size=50, out=out_path
+        )
+        np.testing.assert_array_equal(np.load(out_path), expected)
@@ -0,0 +1,135 @@
+"""Test methods contained in the ``metrics.py`` submodule."""
+import fractions
+import math
+
+import numpy as np
+
+import pytest
+
+from context import aceso
+from aceso import metrics
+
+
+def _pairwise_gini(scores, weights):
+    """Calculate the weighted Gini coefficient from all pairwise differences."""
+    differences = np.abs(scores[:, np.newaxis] - scores[np.newaxis, :])
+    return (
+        np.sum(np.outer(weights, weights) * differences) /
+        (2.0 * np.sum(weights) * np.sum(weights * scores))
+    )
+
+
+def _repeated_percentiles(scores, weights, percentiles):
+    """Repeat each score by its integer weight and index the sorted repetitions directly."""
+    repeated = sorted(np.repeat(scores, np.asarray(weights, dtype=int)))
+    return np.array([
+        repeated[max(int(math.ceil(fractions.Fraction(q) * len(repeated) / 100)), 1) - 1]
+        for q in percentiles
+    ])
+
+
+class TestMetrics():
+    """Test summaries of access scores against direct calculations."""
+
+    def setup(self):
+        """Initialize random scores of several scenarios, with repeated values."""
+        random_state = np.random.RandomState(0)
+        self.scores = np.round(random_state.uniform(0.0, 5.0, size=(4, 30)), 1)
+        self.demand_array = random_state.randint(0, 10, size=30).astype(float)
+        self.regions = np.array(['b', 'a', 'c'] * 10)
+
+    def test_weighted_mean(self):
+        """Test the weighted mean of each scenario and region."""
+        output = metrics.weighted_mean(self.scores, self.demand_array, self.regions)
+        assert output.shape == (4, 3)
+        for r, region in enumerate(['a', 'b', 'c']):
+            in_region = self.regions == region
+            np.testing.assert_allclose(output[:, r], np.average(
+                self.scores[:, in_region], weights=self.demand_array[in_region], axis=1
+            ))
+        assert metrics.weighted_mean(self.scores[0]) == pytest.approx(self.scores[0].mean())
+
+    def test_weighted_gini(self):
+        """Test the weighted Gini coefficient against the mean absolute difference."""
+        output = metrics.weighted_gini(self.scores, self.demand_array, self.regions)
+        for k in range(4):
+            for r, region in enumerate(['a', 'b', 'c']):
+                in_region = self.regions == region
+                assert output[k, r] == pytest.approx(_pairwise_gini(
+                    self.scores[k, in_region], self.demand_array[in_region]
+                ))
+        assert metrics.weighted_gini(np.ones(5)) == pytest.approx(0.0)
+
+    def test_weighted_percentiles(self):
+        """Test that unit weights match indexing the sorted scores directly."""
+        percentiles = [0.0, 10.0, 30.0, 50.0, 70.0, 90.0, 100.0]
+        output = metrics.weighted_percentiles(self.scores, percentiles)
+        assert output.shape == (4, 7)
+        for k in range(4):
+            np.testing.assert_array_equal(
+                output[k], _repeated_percentiles(self.scores[k], np.ones(30), percentiles)
+            )
+
+    def test_weighted_percentiles_by_region(self):
+        """Test that integer weights match repeating each score by its weight."""
+        percentiles = [10.0, 25.0, 50.0, 75.0, 100.0]
+        output = metrics.weighted_percentiles(
+            self.scores[0], percentiles, self.demand_array, self.regions
+        )
+        assert output.shape == (3, 5)
+        for r, region in enumerate(['a', 'b', 'c']):
+            in_region = self.regions == region
+            np.testing.assert_array_equal(output[r], _repeated_percentiles(
+                self.scores[0, in_region], self.demand_array[in_region], percentiles
+            ))
+
+    def test_weighted_percentiles_ties(self):
+        """Test percentiles of tied scores and scores without demand against hand calculations."""
+        scores = np.array([3.0, 1.0, 2.0, 2.0, 5.0])
+        demand_array = np.array([1.0, 0.0, 2.0, 1.0, 0.0])
+        output = metrics.weighted_percentiles(
+            scores, [1.0, 25.0, 50.0, 75.0, 76.0, 100.0], demand_array
+        )
+        np.testing.assert_array_equal(output, [2.0, 2.0, 2.0, 2.0, 3.0, 3.0])
+
+    def test_shortfall(self):
+        """Test the demand below a target and the total shortfall."""
+        demand, total = metrics.shortfall(self.scores, 2.0, self.demand_array)
+        below = self.scores < 2.0
+        np.testing.assert_allclose(demand, np.dot(below, self.demand_array))
+        np.testing.assert_allclose(
+            total, np.dot(np.maximum(2.0 - self.scores, 0.0), self.demand_array)
+        )
+
+    def test_summarize(self):
+        """Test that the summary matches the individual metrics."""
+        supply_array = np.array([3.0, 4.0])
+        summary = metrics.summarize(
+            self.scores, self.demand_array, self.regions, target=2.0, supply_array=supply_array
+        )
+        np.testing.assert_array_equal(summary['regions'], ['a', 'b', 'c'])
+        np.testing.assert_allclose(
+            summary['gini'], metrics.weighted_gini(self.scores, self.demand_array, self.regions)
+        )
+        np.testing.assert_array_equal(summary['percentiles'], metrics.weighted_percentiles(
+            self.scores, metrics.DEFAULT_PERCENTILES, self.demand_array, self.regions
+        ))
+        np.testing.assert_allclose(
+            summary['shortfall'],
+            metrics.shortfall(self.scores, 2.0, self.demand_array, self.regions)[1],
+        )
+        np.testing.assert_allclose(
+            summary['mean_to_supply_ratio'],
+            summary['mean'] * self.demand_array.sum() / supply_array.sum(),
+        )
+
+    def test_two_step_fca(self):
+        """Test that the mean 2SFCA score equals the supply per unit of demand."""
+        distance_matrix = np.random.RandomState(1).uniform(0.0, 5.0, size=(20, 3))
+        demand_array = np.arange(1.0, 21.0)
+        supply_array = np.array([1.0, 2.0, 3.0])
+        scores = aceso.TwoStepFCA(radius=10.0).calculate_accessibility_scores(
+            distance_matrix, demand_array, supply_array
+        )
+        summary = metrics.summarize(scores, demand_array, supply_array=supply_array)
+        assert summary['mean_to_supply_ratio'] == pytest.approx(1.0)
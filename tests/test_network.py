@@ -0,0 +1,127 @@
+"""Test methods contained in the ``network.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+from aceso import network
+
+
+def floyd_warshall(n_nodes, sources, targets, weights):
+    """Calculate all shortest path lengths of a small network by brute force."""
+    distances = np.full((n_nodes, n_nodes), np.inf)
+    np.fill_diagonal(distances, 0.0)
+    for source, target, weight in zip(sources, targets, weights):
+        distances[source, target] = min(distances[source, target], weight)
+    for node in range(n_nodes):
+        distances = np.minimum(distances, distances[:, [node]] + distances[[node], :])
+    return distances
+
+
+METHODS = ['numpy', pytest.param('scipy', marks=pytest.mark.skipif(
+    network.csgraph is None, reason='scipy is not installed'
+))]
+
+
+class TestNetwork():
+    """Test shortest path lengths over a network."""
+
+    def setup(self):
+        """Initialize a random directed network to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.n_nodes = 40
+        self.sources = random_state.randint(0, self.n_nodes, size=120)
+        self.targets = random_state.randint(0, self.n_nodes, size=120)
+        self.weights = random_state.uniform(0.0, 10.0, size=120)
+        self.weights[:3] = 0.0
+        self.network = aceso.Network.from_edges(
+            self.sources, self.targets, self.weights, n_nodes=self.n_nodes
+        )
+        self.all_distances = floyd_warshall(
+            self.n_nodes, self.sources, self.targets, self.weights
+        )
+        self.demand_nodes = random_state.randint(0, self.n_nodes, size=25)
+        self.supply_nodes = np.array([3, 7, 7, 21, 39, 0])
+
+    def test_from_edges(self):
+        """Test that the CSR arrays hold the edges leaving each node."""
+        assert self.network.n_nodes == self.n_nodes
+        assert self.network.n_edges == 120
+        for node in range(self.n_nodes):
+            edges = slice(self.network.indptr[node], self.network.indptr[node + 1])
+            np.testing.assert_array_equal(
+                np.sort(self.network.indices[edges]), np.sort(self.targets[self.sources == node])
+            )
+
+    def test_negative_weights(self):
+        """Test that negative edge weights raise a ValueError."""
+        with pytest.raises(ValueError):
+            aceso.Network.from_edges([0, 1], [1, 0], [1.0, -1.0])
+
+    def test_shortest_path_lengths(self):
+        """Test that the NumPy search matches a brute-force calculation."""
+        output = network.shortest_path_lengths(self.network, [0, 5, 5, 17])
+        np.testing.assert_allclose(output, self.all_distances[[0, 5, 5, 17]])
+
+    @pytest.mark.parametrize('method', METHODS)
+    @pytest.mark.parametrize('max_distance', [None, 8.0])
+    def test_distance_matrix(self, monkeypatch, method, max_distance):
+        """Test that the distance from each demand node to each supply node is correct."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 80)
+        output = network.calculate_distance_matrix(
+            self.network,
+            self.demand_nodes,
+            self.supply_nodes,
+            max_distance=max_distance,
+            method=method,
+            n_jobs=2,
+        )
+        expected = self.all_distances[self.demand_nodes][:, self.supply_nodes]
+        if max_distance is not None:
+            expected[expected > max_distance] = np.inf
+        assert output.shape == (25, 6)
+        np.testing.assert_allclose(output.toarray(), expected)
+
+    def test_undirected(self):
+        """Test that edges of an undirected network can be traveled in both directions."""
+        undirected = aceso.Network.from_edges([0, 1], [1, 2], [1.0, 2.0], directed=False)
+        output = network.calculate_distance_matrix(undirected, [0, 2], [2, 0], method='numpy')
+        np.testing.assert_allclose(output.toarray(), [[3.0, 0.0], [0.0, 3.0]])
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestScoresFromNetwork():
+    """Test the calculation of access scores directly from a network."""
+
+    def setup(self):
+        """Initialize a random undirected network to use in the tests."""
+        random_state = np.random.RandomState(1)
+        n_nodes = 60
+        sources = random_state.randint(0, n_nodes, size=200)
+        targets = random_state.randint(0, n_nodes, size=200)
+        weights = random_state.uniform(0.0, 5.0, size=200)
+        self.network = aceso.Network.from_edges(
+            sources, targets, weights, n_nodes=n_nodes, directed=False
+        )
+        self.demand_nodes = np.arange(n_nodes)
+        self.supply_nodes = random_state.choice(n_nodes, size=10, replace=False)
+        self.demand_array = random_state.uniform(1.0, 10.0, size=n_nodes)
+        self.distance_matrix = floyd_warshall(
+            n_nodes,
+            np.concatenate([sources, targets]),
+            np.concatenate([targets, sources]),
+            np.concatenate([weights, weights]),
+        )[:, self.supply_nodes]
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=4.0),
+        aceso.ThreeStepFCA('raised_cosine', {'scale': 6.0}, n_jobs=2),
+        aceso.GravityModel('gaussian', {'sigma': 2.0}),
+    ])
+    def test_matches_dense(self, model):
+        """Test that scores from the network match scores from the dense distance matrix."""
+        expected = model.calculate_accessibility_scores(self.distance_matrix, self.demand_array)
+        output = model.calculate_accessibility_scores_from_network(
+            self.network, self.demand_nodes, self.supply_nodes, self.demand_array, method='numpy'
+        )
+        np.testing.assert_allclose(output, expected, rtol=1e-9, atol=1e-12)
@@ -0,0 +1,75 @@
+"""Test methods contained in the ``optimize.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestGreedyFacilitySelector():
+    """Test greedy selection of supply locations against full recalculations."""
+
+    def setup(self):
+        """Initialize random distance matrices to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(80, 3))
+        self.candidate_distance_matrix = random_state.uniform(0.0, 20.0, size=(80, 25))
+        self.demand_array = random_state.uniform(0.0, 100.0, size=80)
+        self.candidate_supply_array = random_state.uniform(1.0, 10.0, size=25)
+        self.model = aceso.GravityModel(
+            decay_function='raised_cosine', decay_params={'scale': 8.0}, suboptimality_exponent=1.5
+        )
+
+    def _naive_greedy(self, n_select, objective, target):
+        """Select candidates by recalculating the scores for every candidate at every step."""
+        selected = []
+        for _ in range(n_select):
+            values = {}
+            for index in range(25):
+                if index in selected:
+                    continue
+                columns = selected + [index]
+                scores = self.model.calculate_accessibility_scores(
+                    np.hstack([self.distance_matrix, self.candidate_distance_matrix[:, columns]]),
+                    self.demand_array,
+                    np.concatenate([np.ones(3), self.candidate_supply_array[columns]]),
+                )
+                values[index] = np.average(objective(scores, target), weights=self.demand_array)
+            selected.append(max(values, key=values.get))
+        return selected
+
+    @pytest.mark.parametrize('lazy', [True, False])
+    @pytest.mark.parametrize('objective,target', [('mean', None), ('shortfall', 0.05)])
+    def test_matches_naive_greedy(self, monkeypatch, objective, target, lazy):
+        """Test that the selection matches a greedy search using full recalculations."""
+        monkeypatch.setattr(aceso.gravity, 'BLOCK_SIZE', 500)
+        selector = aceso.optimize.GreedyFacilitySelector(
+            self.model,
+            self.candidate_distance_matrix,
+            demand_array=self.demand_array,
+            candidate_supply_array=self.candidate_supply_array,
+            distance_matrix=self.distance_matrix,
+            objective=objective,
+            target=target,
+        )
+        selected = selector.select(3, lazy=lazy)
+        expected = self._naive_greedy(
+            3, aceso.optimize.NAME_TO_OBJECTIVE_MAP[objective], target
+        )
+        assert selected == expected
+        assert len(selector.objective_values) == 4
+        np.testing.assert_allclose(
+            selector.access_scores,
+            self.model.calculate_accessibility_scores(
+                np.hstack([self.distance_matrix, self.candidate_distance_matrix[:, selected]]),
+                self.demand_array,
+                np.concatenate([np.ones(3), self.candidate_supply_array[selected]]),
+            )
+        )
+
+    def test_huff_normalization(self):
+        """Test that models with Huff normalization raise a ValueError."""
+        model = aceso.ThreeStepFCA(decay_function='uniform', decay_params={'scale': 8.0})
+        with pytest.raises(ValueError):
+            aceso.optimize.GreedyFacilitySelector(model, self.candidate_distance_matrix)
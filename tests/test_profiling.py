@@ -0,0 +1,96 @@
+"""Test methods contained in the ``profiling.py`` submodule."""
+import threading
+
+import numpy as np
+
+import pytest
+
+from context import aceso
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestProfiling():
+    """Test the reporting of the stages of access score calculations."""
+
+    def setup(self):
+        """Initialize a model and a random distance matrix to use in the tests."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(50, 7))
+        self.model = aceso.GravityModel(
+            decay_function='gaussian',
+            decay_params={'sigma': 5.0},
+            huff_normalization=True,
+            suboptimality_exponent=2.0,
+        )
+
+    def test_profiler(self):
+        """Test that each stage is reported once without changing the scores."""
+        expected = self.model.calculate_accessibility_scores(self.distance_matrix)
+        with self.model.profile() as profiler:
+            output = self.model.calculate_accessibility_scores(self.distance_matrix)
+        np.testing.assert_array_equal(output, expected)
+
+        summary = profiler.summary()
+        assert list(summary) == [
+            'decay',
+            'interaction_probabilities',
+            'demand_potentials',
+            'inverse_demands',
+            'access_ratios',
+        ]
+        assert all(total['calls'] == 1 for total in summary.values())
+        assert summary['decay']['nbytes'] == self.distance_matrix.nbytes
+        shapes = {stats.stage: stats.shape for stats in profiler.records}
+        assert shapes['decay'] == (50, 7)
+        assert shapes['demand_potentials'] == (7,)
+        assert shapes['access_ratios'] == (50,)
+
+    def test_callback(self):
+        """Test that a callback receives the stages of sparse calculations and is then removed."""
+        records = []
+        sparse_matrix = aceso.SparseDistanceMatrix.from_dense(self.distance_matrix, 10.0)
+        with self.model.profile(records.append) as callback:
+            assert callback == records.append
+            self.model.calculate_accessibility_scores(sparse_matrix)
+        assert [stats.stage for stats in records] == [
+            'decay',
+            'interaction_probabilities',
+            'demand_potentials',
+            'inverse_demands',
+            'access_ratios',
+        ]
+        assert records[0].shape == (sparse_matrix.nnz,)
+        self.model.calculate_accessibility_scores(sparse_matrix)
+        assert len(records) == 5
+
+    def test_threads(self):
+        """Test that stages reported from several threads are all collected."""
+        model = aceso.TwoStepFCA(radius=8.0, n_jobs=2)
+        distance_matrix = np.tile(self.distance_matrix, (4, 1))
+        original_block_size = aceso.gravity.BLOCK_SIZE
+        aceso.gravity.BLOCK_SIZE = 70
+        try:
+            with model.profile() as profiler:
+                model.calculate_accessibility_scores(distance_matrix)
+        finally:
+            aceso.gravity.BLOCK_SIZE = original_block_size
+        summary = profiler.summary()
+        assert summary['decay']['calls'] == summary['access_ratios']['calls'] > 1
+        assert summary['inverse_demands']['calls'] == 1
+
+    def test_other_threads_not_reported(self):
+        """Test that calculations with the same model in other threads are not reported."""
+        worker = threading.Thread(
+            target=self.model.calculate_accessibility_scores, args=(self.distance_matrix,)
+        )
+        with self.model.profile() as profiler:
+            worker.start()
+            worker.join()
+        assert profiler.records == []
+
+    def test_bound_model(self):
+        """Test that bound models report the inversion of the demand potentials."""
+        bound_model = self.model.bind(self.distance_matrix)
+        with self.model.profile() as profiler:
+            bound_model.calculate_accessibility_scores()
+        assert profiler.summary()['inverse_demands']['calls'] == 1
@@ -0,0 +1,173 @@
+"""Test methods contained in the ``service.py`` submodule."""
+import asyncio
+import json
+
+import numpy as np
+
+import pytest
+
+from context import aceso
+from aceso import service
+
+
+def _run(coroutine):
+    """Run a coroutine to completion on a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAccessibilityService():
+    """Test that queries to the service match direct calculations."""
+
+    def setup(self):
+        """Initialize a model, a random distance matrix, and a service bound to them."""
+        random_state = np.random.RandomState(0)
+        self.distance_matrix = random_state.uniform(0.0, 20.0, size=(40, 6))
+        self.demand_array = random_state.uniform(0.0, 100.0, size=40)
+        self.supply_array = random_state.uniform(0.0, 10.0, size=6)
+        self.model = aceso.ThreeStepFCA(decay_function='gaussian', decay_params={'sigma': 5.0})
+        self.service = service.AccessibilityService(
+            self.model, self.distance_matrix, self.demand_array, self.supply_array
+        )
+
+    def expected_scores(self, supply_changes=None, demand_changes=None):
+        """Calculate the scores after the given changes without the service."""
+        demand_array = self.demand_array.copy()
+        supply_array = self.supply_array.copy()
+        for index, value in (demand_changes or {}).items():
+            demand_array[index] = value
+        for index, value in (supply_changes or {}).items():
+            supply_array[index] = value
+        return self.model.calculate_accessibility_scores(
+            self.distance_matrix, demand_array, supply_array
+        )
+
+    def test_single_query(self):
+        """Test a query without changes and a query for a subset of rows."""
+        async def query():
+            await self.service.start()
+            return (
+                await self.service.calculate_accessibility_scores(),
+                await self.service.calculate_accessibility_scores(rows=[3, 1]),
+            )
+
+        access_scores, subset = _run(query())
+        expected = self.expected_scores()
+        np.testing.assert_allclose(access_scores, expected)
+        np.testing.assert_allclose(subset, expected[[3, 1]])
+
+    @pytest.mark.parametrize('keep_nonzero', [False, True])
+    def test_concurrent_queries_are_batched(self, keep_nonzero):
+        """Test that concurrent queries are calculated together and answered correctly."""
+        self.service = service.AccessibilityService(
+            self.model, self.distance_matrix, self.demand_array, self.supply_array,
+            keep_nonzero=keep_nonzero
+        )
+        changes = [({j: 20.0}, None) for j in range(6)] + [(None, {0: 500.0}), ({1: 0.0}, {2: 0.0})]
+
+        async def query():
+            return await asyncio.gather(*[
+                self.service.calculate_accessibility_scores(
+                    supply_changes=supply_changes, demand_changes=demand_changes
+                )
+                for supply_changes, demand_changes in changes
+            ])
+
+        results = _run(query())
+        assert self.service.n_batches == 1
+        for (supply_changes, demand_changes), access_scores in zip(changes, results):
+            np.testing.assert_allclose(
+                access_scores, self.expected_scores(supply_changes, demand_changes)
+            )
+        # Changes apply only to the query that made them.
+        np.testing.assert_array_equal(self.service.supply_array, self.supply_array)
+
+    def test_max_batch_size(self):
+        """Test that batches are no larger than the maximum batch size."""
+        self.service.max_batch_size = 3
+
+        async def query():
+            return await asyncio.gather(*[
+                self.service.calculate_accessibility_scores(supply_changes={0: float(k)})
+                for k in range(7)
+            ])
+
+        results = _run(query())
+        assert self.service.n_batches == 3
+        for k, access_scores in enumerate(results):
+            np.testing.assert_allclose(access_scores, self.expected_scores({0: float(k)}))
+
+    def test_failed_query(self):
+        """Test that an error in a batch is raised by each of its queries."""
+        async def query():
+            await self.service.start()
+            self.service.supply_array = np.ones(5)
+            return await asyncio.gather(
+                self.service.calculate_accessibility_scores(),
+                self.service.calculate_accessibility_scores(),
+                return_exceptions=True,
+            )
+
+        results = _run(query())
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_server(self):
+        """Test queries sent to a local server, one JSON object per line."""
+        requests = [
+            {'supply_changes': {'2': 0.0}},
+            {'demand_changes': {'5': 10.0}, 'rows': [5, 6]},
+            {'supply_changes': {'10': 1.0}},
+            {'demand_changes': {'-1': 2.0}},
+        ]
+
+        async def query():
+            server = await service.start_server(self.service)
+            host, port = server.sockets[0].getsockname()[:2]
+            reader, writer = await asyncio.open_connection(host, port)
+            responses = []
+            for request in requests:
+                writer.write((json.dumps(request) + '\n').encode())
+                responses.append(json.loads((await reader.readline()).decode()))
+            # Wait for the server to close the connection once all requests are answered.
+            writer.write_eof()
+            assert await reader.read() == b''
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+
+        responses = _run(query())
+        np.testing.assert_allclose(responses[0]['scores'], self.expected_scores({2: 0.0}))
+        np.testing.assert_allclose(
+            responses[1]['scores'], self.expected_scores(demand_changes={5: 10.0})[[5, 6]]
+        )
+        assert responses[2]['error'].startswith('IndexError')
+        assert responses[3]['error'].startswith('IndexError')
+
+    def test_invalid_changes(self):
+        """Test that changes to locations out of range are rejected, including negative indices."""
+        for changes in ({6: 1.0}, {-1: 1.0}):
+            with pytest.raises(IndexError):
+                _run(self.service.calculate_accessibility_scores(supply_changes=changes))
+        assert self.service.n_batches == 0
+
+    def test_invalid_rows(self):
+        """Test that rows out of range are rejected without failing other queries in the batch."""
+        n_rows = len(self.service.demand_array)
+
+        async def query():
+            await self.service.start()
+            return await asyncio.gather(
+                self.service.calculate_accessibility_scores(rows=[0, n_rows]),
+                self.service.calculate_accessibility_scores(rows=[-1]),
+                self.service.calculate_accessibility_scores(rows=[n_rows - 1]),
+                return_exceptions=True,
+            )
+
+        results = _run(query())
+        assert all(isinstance(result, IndexError) for result in results[:2])
+        np.testing.assert_allclose(results[2], self.expected_scores()[[n_rows - 1]])
+        assert self.service.n_batches == 1
@@ -0,0 +1,71 @@
+"""Test methods contained in the ``sparse.py`` submodule."""
+import numpy as np
+
+import pytest
+
+from context import aceso
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+class TestSparseDistanceMatrix():
+    """Test sparse distance matrices and their use in gravity models."""
+
+    def setup(self):
+        """Initialize a distance matrix to use in the tests."""
+        self.distance_matrix = np.array([
+            [5.0, 5.0, np.inf],
+            [10., 0.0, 3.0],
+            [15., np.inf, 15.]
+        ])
+        self.sparse_matrix = aceso.SparseDistanceMatrix.from_dense(
+            self.distance_matrix, max_distance=12.0
+        )
+
+    def test_from_dense(self):
+        """Test that only pairs within the maximum distance are stored."""
+        assert self.sparse_matrix.nnz == 5
+        assert self.sparse_matrix.shape == (3, 3)
+
+    def test_toarray(self):
+        """Test that missing pairs are infinitely far apart in the dense equivalent."""
+        expected = self.distance_matrix.copy()
+        expected[2, :] = np.inf
+        np.testing.assert_array_equal(self.sparse_matrix.toarray(), expected)
+
+    def test_invalid_indices(self):
+        """Test that indices outside the matrix raise a ValueError."""
+        with pytest.raises(ValueError):
+            aceso.SparseDistanceMatrix(rows=[0, 3], cols=[0, 0], distances=[1.0, 2.0], shape=(3, 3))
+
+    def test_mismatched_lengths(self):
+        """Test that coordinate arrays of different lengths raise a ValueError."""
+        with pytest.raises(ValueError):
+            aceso.SparseDistanceMatrix(rows=[0, 1], cols=[0], distances=[1.0, 2.0], shape=(3, 3))
+
+    @pytest.mark.parametrize('model', [
+        aceso.TwoStepFCA(radius=12.0),
+        aceso.ThreeStepFCA(decay_function='raised_cosine', decay_params={'scale': 12.0}),
+        aceso.GravityModel(
+            decay_function='parabolic', decay_params={'scale': 12.0}, suboptimality_exponent=2.0
+        ),
+    ])
+    def test_calculate_accessibility_scores(self, model):
+        """Test that sparse and dense inputs lead to the same access scores."""
+        demand_array = np.array([1.0, 2.0, 3.0])
+        supply_array = np.array([2.0, 1.0, 4.0])
+        expected = model.calculate_accessibility_scores(
+            self.sparse_matrix.toarray(), demand_array, supply_array
+        )
+        output = model.calculate_accessibility_scores(
+            self.sparse_matrix, demand_array, supply_array
+        )
+        np.testing.assert_array_almost_equal(output, expected)
+
+    def test_calculate_demand_potentials(self):
+        """Test that _calculate_demand_potentials accepts sparse input."""
+        model = aceso.ThreeStepFCA(decay_function='uniform', decay_params={'scale': 12.0})
+        expected = model._calculate_demand_potentials(
+            self.sparse_matrix.toarray(), np.ones(3)
+        )
+        output = model._calculate_demand_potentials(self.sparse_matrix, np.ones(3))
+        np.testing.assert_array_almost_equal(output, expected)